@@ -0,0 +1,151 @@
+import os
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from sentiments import emotion_based_sentiments, fine_grained_sentiments
+
+# ✅ Output columns shared by every sentiment pipeline
+SENTIMENT_COLUMNS = ['emotion_sentiment', 'fine_grained_sentiment', 'thinking']
+
+
+# ✅ Map loose LLM answers ("positive.", "**Joy**") onto the label sets
+def normalize_label(value, labels):
+    cleaned = re.sub(r"[^a-z ]", "", str(value).lower()).strip()
+    for label in labels:
+        if cleaned == label.lower():
+            return label
+    return None
+
+
+# ✅ Only answers inside both label sets may be cached ("Unknown" is a failed parse)
+def valid_sentiment(row):
+    return row[0] in emotion_based_sentiments and row[1] in fine_grained_sentiments
+
+# ✅ Max number of in-flight LLM requests (override with CLASSIFY_CONCURRENCY)
+DEFAULT_CONCURRENCY = int(os.getenv("CLASSIFY_CONCURRENCY", "8"))
+
+
+# ✅ Run fn over texts on a bounded thread pool, keeping input order
+def map_concurrent(fn, texts, max_workers=None):
+    values = list(texts)
+    if not values:
+        return []
+    workers = max(1, min(max_workers or DEFAULT_CONCURRENCY, len(values)))
+    if workers == 1:
+        return [fn(value) for value in values]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, values))
+
+
+# ✅ Split a Series (or any iterable) into a value list and the index to restore
+def as_indexed(texts):
+    if isinstance(texts, pd.Series):
+        return texts.tolist(), texts.index
+    values = list(texts)
+    return values, pd.RangeIndex(len(values))
+
+
+# ✅ Prompt packing: classify several texts per LLM call
+PACKED_ITEM_TOKENS = 80      # output tokens reserved for one item's answer
+PACKED_INPUT_TOKENS = 6000   # max estimated prompt tokens of texts per pack
+PACKED_TPM_SHARE = 0.5       # share of a key's tokens-per-minute one pack may reserve (prompt + max_tokens)
+
+
+# ✅ Input budget per pack so its whole reservation fits a TPM window with room for other calls
+def packed_input_budget(tpm, max_tokens, overhead=0):
+    return max(PACKED_ITEM_TOKENS, min(PACKED_INPUT_TOKENS, int(tpm * PACKED_TPM_SHARE) - max_tokens - overhead))
+
+
+# ✅ Rough token estimate (~4 characters per token)
+def estimate_tokens(text):
+    return len(str(text)) // 4 + 1
+
+
+# ✅ Greedily group row positions so each pack fits the output and input budgets
+def plan_packs(values, max_tokens=1024, input_budget=PACKED_INPUT_TOKENS):
+    per_pack = max(1, max_tokens // PACKED_ITEM_TOKENS)
+    packs, current, used = [], [], 0
+    for position, text in enumerate(values):
+        cost = estimate_tokens(text)
+        if current and (len(current) >= per_pack or used + cost > input_budget):
+            packs.append(current)
+            current, used = [], 0
+        current.append(position)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_prompt(instructions, texts):
+    items = "\n\n".join(f"[{number}]\n{text}" for number, text in enumerate(texts, 1))
+    return f"""
+{instructions.strip()}
+
+Respond ONLY with a JSON array containing one object per numbered item:
+[{{"id": <item number>, "fine_grained": "<fine-grained sentiment>", "emotion": "<emotion sentiment>", "thinking": "<brief reasoning>"}}]
+
+Items:
+{items}
+"""
+
+
+# ✅ Map a packed JSON answer back to {position: [emotion, fine, thinking]} (valid labels only)
+def parse_packed_response(response, count):
+    match = re.search(r"\[.*\]", response or "", re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(data, list):
+        return {}
+
+    answers = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        try:
+            number = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        fine = normalize_label(item.get('fine_grained'), fine_grained_sentiments)
+        emotion = normalize_label(item.get('emotion'), emotion_based_sentiments)
+        thinking = str(item.get('thinking') or '').strip() or "No reasoning provided."
+        # Items with labels outside the sets get no answer and go through the single-text fallback
+        if 1 <= number <= count and fine and emotion:
+            answers[number - 1] = [emotion, fine, thinking]
+    return answers
+
+
+def classify_packed(texts, complete_fn, instructions, fallback_fn, max_tokens=1024, max_workers=None,
+                    input_budget=PACKED_INPUT_TOKENS):
+    """Classify texts K at a time and return SENTIMENT_COLUMNS in input order.
+
+    complete_fn(prompt, max_tokens) returns the raw completion text. A pack
+    whose answer cannot be parsed at all (usually a truncated reply) is split
+    in half and retried; any single item still missing an answer goes through
+    fallback_fn, the regular one-text-per-call classifier.
+    """
+    values, index = as_indexed(texts)
+
+    results = [None] * len(values)
+
+    def run_pack(pack):
+        if len(pack) == 1:
+            results[pack[0]] = list(fallback_fn(values[pack[0]]))
+            return
+        prompt = build_packed_prompt(instructions, [values[position] for position in pack])
+        answers = parse_packed_response(complete_fn(prompt, max_tokens), len(pack))
+        if not answers:
+            middle = len(pack) // 2
+            run_pack(pack[:middle])
+            run_pack(pack[middle:])
+            return
+        for offset, position in enumerate(pack):
+            results[position] = answers.get(offset) or list(fallback_fn(values[position]))
+
+    map_concurrent(run_pack, plan_packs(values, max_tokens, input_budget), max_workers)
+    return pd.DataFrame(results, columns=SENTIMENT_COLUMNS, index=index)
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import platform
+import subprocess
+from datetime import datetime
+from urllib.request import urlopen
+
+# ✅ Offline benchmark: fake Groq/GitHub servers + in-process Gmail stand-in, synthetic corpora
+DEFAULT_SIZES = [100, 10_000, 100_000]
+STAGES = ['fetch', 'clean', 'classify', 'persist', 'render', 'stream']
+RESULTS_DIR = os.path.join('data', 'benchmarks')
+PERSIST_CHUNK = 1000   # rows per append_table call
+RENDER_REQUESTS = 20   # warm requests per dashboard endpoint
+STREAM_MESSAGES = 20   # chat replies streamed per size
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def server_stats(url):
+    if not url:
+        return {}
+    with urlopen(f"{url}/stats", timeout=10) as response:
+        return json.load(response)
+
+
+class Timer:
+    """Collect per-call latencies of any function wrapped with timed()."""
+
+    def __init__(self):
+        self.latencies = []
+
+    def timed(self, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+        return wrapper
+
+
+def stage_result(size, stage, rows, seconds, latencies, groq_before, groq_after, **extra):
+    tokens = {key: groq_after.get(key, 0) - groq_before.get(key, 0)
+              for key in ('requests', 'prompt_tokens', 'completion_tokens', 'rate_limited')}
+    return {
+        'size': size, 'stage': stage, 'rows': rows, 'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows / seconds, 2) if seconds > 0 else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        'calls': len(latencies), 'groq': tokens, 'peak_rss_mb': peak_rss_mb(), **extra,
+    }
+
+
+# ✅ One corpus size in this process (the parent starts one child per size)
+def run_size(size, stages, config, groq_url, github_url, workdir):
+    import pandas as pd
+    import storage
+    import llm_client
+    from fake_services import SyntheticCorpus, FakeGmailService
+    from email_packages.fetch_email import get_emails
+    from email_packages.email_agents import extract_name_email, clean_email_body
+    from email_packages.email_cleaner import EmailCleaner
+    from ticket.github_issues import GitHubIssueFetcher, issues_to_dataframe
+    from batch_sentiment import SENTIMENT_COLUMNS
+    from input_budget import TOKEN_COLUMNS
+    from sentiment_service import get_service
+
+    storage.STORE_DIR = os.path.join(workdir, 'store')
+    corpus = SyntheticCorpus(config['seed'], config['duplicate_rate'])
+    results = []
+
+    def measure(stage, fn, latencies=None, **extra):
+        before = server_stats(groq_url)
+        start = time.perf_counter()
+        rows = fn()
+        seconds = time.perf_counter() - start
+        results.append(stage_result(size, stage, rows, seconds, latencies or [],
+                                    before, server_stats(groq_url), **extra))
+        print(f"  {stage:>16} {rows:>7} rows  {seconds:8.2f}s  {results[-1]['rows_per_sec']} rows/s", file=sys.stderr)
+
+    # Fetch always runs: the later stages need its rows
+    gmail = FakeGmailService(corpus, latency=config['gmail_latency'])
+    timer = Timer()
+    gmail._round_trip = timer.timed(gmail._round_trip)
+    emails = []
+    def fetch_emails():
+        emails.extend(get_emails(gmail, max_results=size))
+        return len(emails)
+    measure('fetch_emails', fetch_emails, timer.latencies)
+    results[-1]['round_trips'] = gmail.round_trips
+
+    fetcher = GitHubIssueFetcher('bench/repo', api_url=github_url, cache_file=None)
+    timer = Timer()
+    fetcher._get_page = timer.timed(fetcher._get_page)
+    issues = []
+    def fetch_tickets():
+        issues.extend(fetcher.fetch_issues(max_issues=size))
+        return len(issues)
+    measure('fetch_tickets', fetch_tickets, timer.latencies)
+
+    df_email = pd.DataFrame(emails)
+    df_email[['src_name', 'src_email']] = df_email['From'].apply(extract_name_email)
+    df_ticket = issues_to_dataframe(issues)
+
+    llm_timer = Timer()
+    llm_client._create = llm_timer.timed(llm_client._create)
+
+    if 'clean' in stages:
+        cleaner = EmailCleaner(clean_email_body)
+        timer = Timer()
+        cleaner.clean = timer.timed(cleaner.clean)
+        def clean():
+            df_email['new_body'] = cleaner.clean_many(df_email['Body'])
+            return len(df_email)
+        measure('clean', clean, timer.latencies)
+        results[-1]['cleaning'] = cleaner.stats()
+    else:
+        df_email['new_body'] = df_email['clean_body']
+
+    if 'classify' in stages:
+        for source, df, column in (('email', df_email, 'new_body'), ('ticket', df_ticket, 'Description')):
+            llm_timer.latencies = []
+            def classify(source=source, df=df, column=column):
+                df[SENTIMENT_COLUMNS + TOKEN_COLUMNS] = get_service(source).classify(df[column], with_tokens=True)
+                return len(df)
+            measure(f'classify_{source}', classify, llm_timer.latencies)
+            service = get_service(source).stats()
+            results[-1].update({'input_tokens': service['tokens'], 'tiers': service.get('tiers'),
+                                'dedup': service['dedup']})
+    else:
+        df_email[SENTIMENT_COLUMNS] = ['Joy', 'Positive', '']
+        df_ticket[SENTIMENT_COLUMNS] = ['Joy', 'Positive', '']
+
+    if 'persist' in stages:
+        for table, df in (('emails', df_email), ('tickets', df_ticket)):
+            timer = Timer()
+            append = timer.timed(storage.append_table)
+            def persist(table=table, df=df):
+                return sum(append(table, df.iloc[start:start + PERSIST_CHUNK]) for start in range(0, len(df), PERSIST_CHUNK))
+            measure(f'persist_{table}', persist, timer.latencies)
+    else:
+        storage.append_table('emails', df_email)
+        storage.append_table('tickets', df_ticket)
+
+    if 'render' in stages:
+        import email_app
+        import main
+        for name, client, paths in (
+            ('render_analyze', email_app.app.test_client(), ['/analyze'] * (RENDER_REQUESTS + 1)),
+            ('render_api', main.app.test_client(),
+             [f"/api/{table}?page={page}&per_page=50" for table in ('emails', 'tickets') for page in range(1, RENDER_REQUESTS // 2 + 1)]),
+        ):
+            timer = Timer()
+            get = timer.timed(client.get)
+            served = []
+            def render(get=get, paths=paths, served=served):
+                for path in paths:
+                    response = get(path)
+                    served.append(len(response.get_json().get('data', [])))
+                return sum(served)
+            measure(name, render, timer.latencies, requests=len(paths))
+            results[-1]['cold_ms'] = round(timer.latencies[0] * 1000, 3) if timer.latencies else None
+
+    if 'stream' in stages:
+        from chat import CustomerCareChatbot
+        bot = CustomerCareChatbot()
+        first_token = []
+        def stream():
+            count = min(size, STREAM_MESSAGES)
+            for i in range(count):
+                start = time.perf_counter()
+                for n, _ in enumerate(bot.generate_response_stream(corpus.chat_message(i))):
+                    if n == 0:
+                        first_token.append(time.perf_counter() - start)
+            return count
+        measure('stream_chat', stream, first_token, latency='time to first token')
+
+    return results
+
+
+# ✅ Parent: start fake servers, run each size in a fresh process, write one JSON file
+def run(sizes, stages, config, output):
+    from fake_services import SyntheticCorpus, FakeGroqServer, FakeGitHubServer
+
+    groq = FakeGroqServer(config['groq_latency'], config['groq_token_latency'],
+                          config['server_rpm'], config['server_tpm'], config['error_rate']).start()
+    github = FakeGitHubServer(SyntheticCorpus(config['seed'], config['duplicate_rate']),
+                              latency=config['github_latency']).start()
+    results = []
+    try:
+        for size in sizes:
+            print(f"▶️ size {size}", file=sys.stderr)
+            with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+                env = dict(os.environ,
+                           GROQ_BASE_URL=groq.url, GROQ_API_KEY='bench', GROQ_API_KEY_2='bench',
+                           GROQ_RPM=str(config['client_rpm']), GROQ_TPM=str(config['client_tpm']),
+                           LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.sqlite'),
+                           SENTIMENT_BACKEND=config['backend'])
+                result_file = os.path.join(workdir, 'result.json')
+                subprocess.run([sys.executable, __file__, '_child', str(size), ','.join(stages),
+                                json.dumps(config), groq.url, github.url, workdir, result_file],
+                               env=env, check=True)
+                with open(result_file, 'r', encoding='utf-8') as f:
+                    results.extend(json.load(f))
+    finally:
+        groq.stop()
+        github.stop()
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'sizes': sizes, 'stages': stages, 'config': config,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark results written to {output}")
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ✅ Compare two result files; exit 1 if throughput dropped by more than threshold
+def compare(baseline_file, current_file, threshold=0.1):
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+    with open(current_file, 'r', encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    print(f"{'stage':>18} {'size':>7} {'rows/s before':>14} {'rows/s after':>13} {'change':>8} {'p99 ms':>18}")
+    for result in current:
+        old = baseline.get((result['size'], result['stage']))
+        if not old or not old['rows_per_sec'] or not result['rows_per_sec']:
+            continue
+        change = result['rows_per_sec'] / old['rows_per_sec'] - 1
+        flag = ''
+        if change < -threshold:
+            regressions += 1
+            flag = ' ❌'
+        print(f"{result['stage']:>18} {result['size']:>7} {old['rows_per_sec']:>14} {result['rows_per_sec']:>13} "
+              f"{change:>+8.1%} {str(old['p99_ms']) + ' -> ' + str(result['p99_ms']):>18}{flag}")
+    return regressions
+
+
+def _option(args, name, default, cast=str):
+    if name in args:
+        return cast(args[args.index(name) + 1])
+    return default
+
+
+USAGE = """Usage:
+  python benchmark.py run [--sizes 100,10000,100000] [--stages fetch,clean,...] [--output FILE]
+                          [--backend tiered|llm|local] [--groq-latency 0.05] [--server-rpm 0]
+                          [--duplicate-rate 0.3]
+  python benchmark.py compare BASELINE.json CURRENT.json [--threshold 0.1]"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if args[:1] == ['_child']:
+        size, stages, config, groq_url, github_url, workdir, result_file = args[1:8]
+        results = run_size(int(size), stages.split(','), json.loads(config), groq_url, github_url, workdir)
+        with open(result_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f)
+    elif args[:1] == ['run']:
+        config = {
+            'seed': _option(args, '--seed', 0, int),
+            'duplicate_rate': _option(args, '--duplicate-rate', 0.0, float),
+            'backend': _option(args, '--backend', 'tiered'),
+            'groq_latency': _option(args, '--groq-latency', 0.05, float),
+            'groq_token_latency': _option(args, '--groq-token-latency', 0.0005, float),
+            'server_rpm': _option(args, '--server-rpm', 0, int),
+            'server_tpm': _option(args, '--server-tpm', 0, int),
+            'error_rate': _option(args, '--error-rate', 0.0, float),
+            'client_rpm': _option(args, '--client-rpm', 100_000, int),
+            'client_tpm': _option(args, '--client-tpm', 1_000_000_000, int),
+            'gmail_latency': _option(args, '--gmail-latency', 0.02, float),
+            'github_latency': _option(args, '--github-latency', 0.02, float),
+        }
+        sizes = [int(size) for size in _option(args, '--sizes', ','.join(map(str, DEFAULT_SIZES))).split(',')]
+        stages = _option(args, '--stages', ','.join(STAGES)).split(',')
+        output = _option(args, '--output', os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"))
+        run(sizes, stages, config, output)
+    elif args[:1] == ['compare'] and len(args) >= 3:
+        sys.exit(1 if compare(args[1], args[2], _option(args, '--threshold', 0.1, float)) else 0)
+    else:
+        print(USAGE)
@@ -1,23 +1,9 @@
-import os
 import re
-import pandas as pd
 from datetime import datetime
-from dotenv import load_dotenv
-from groq import Groq
-
-# ✅ Load environment variables
-load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY_2")
-client = Groq(api_key=groq_api_key)
-
-# ✅ Sentiment categories
-emotion_based_sentiments = [
-    "Joy", "Trust", "Fear", "Surprise", "Sadness", "Disgust", "Anger", "Anticipation"
-]
-
-fine_grained_sentiments = [
-    "Very Positive", "Positive", "Neutral", "Negative", "Very Negative"
-]
+from chat_log_writer import get_chat_log_writer
+from sentiment_service import get_service
+import llm_client
+from metrics import timed
 
 class CustomerCareChatbot:
     def __init__(self):
@@ -33,61 +19,34 @@ class CustomerCareChatbot:
             return name.strip(), email.strip()
         return "", ""
 
+    # ✅ Sentiment goes through the shared service (chat prompts)
     def classify_sentiment(self, text):
-        prompt = f"""
-Classify this message's sentiment:
-Fine-grained options: {fine_grained_sentiments}
-Emotion options: {emotion_based_sentiments}
-Respond in format:
-Fine-Grained Sentiment: <value>
-Emotion Sentiment: <value>
-Thinking: <reasoning>
-
-Only give one word value.
-
-Message: {text}
-"""
-        response = client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You accurately classify sentiments."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1024
-        )
-        result = response.choices[0].message.content.strip()
-
-        fine_match = re.search(r"Fine-Grained Sentiment:\s*(.+)", result)
-        emotion_match = re.search(r"Emotion Sentiment:\s*(.+)", result)
-        thinking_match = re.search(r"Thinking:\s*(.+)", result)
+        return get_service('chat').classify_one(text)
 
-        return (
-            emotion_match.group(1).strip() if emotion_match else "Unknown",
-            fine_match.group(1).strip() if fine_match else "Unknown",
-            thinking_match.group(1).strip() if thinking_match else ""
-        )
-
-    def generate_response(self, user_input):
+    def _response_messages(self, user_input):
         prompt = f"""
 You are a customer care assistant.
 Last user message: {user_input}
 Respond helpfully and professionally in 15 words only.
 """
-        response = client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You resolve customer issues professionally."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=1024
-        )
-        return response.choices[0].message.content.strip()
+        return [
+            {"role": "system", "content": "You resolve customer issues professionally."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @timed('chat_response')
+    def generate_response(self, user_input):
+        return llm_client.complete(self._response_messages(user_input), temperature=0.5, max_tokens=1024,
+                                   model=self.model, api_key_env="GROQ_API_KEY_2")
+
+    # ✅ Same reply as generate_response, yielded token by token as it arrives
+    def generate_response_stream(self, user_input):
+        return llm_client.stream(self._response_messages(user_input), temperature=0.5, max_tokens=1024,
+                                 model=self.model, api_key_env="GROQ_API_KEY_2")
 
     def log_conversation(self, user_input, bot_response, sentiment_data):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.conversation.append({
+        row = {
             "timestamp": timestamp,
             "user_input": user_input,
             "bot_response": bot_response,
@@ -95,35 +54,45 @@ Respond helpfully and professionally in 15 words only.
             "fine_grained_sentiment": sentiment_data[1],
             "thinking": sentiment_data[2],
             "model_used": self.model
-        })
+        }
+        self.conversation.append(row)
+        get_chat_log_writer().write(row)
 
-    def save_to_csv(self):
+    def save_logs(self):
         if not self.conversation:
             return
-        df = pd.DataFrame(self.conversation)
-        filename = r"data\chatlogs.csv"
-        df.to_csv(filename, index=False)
-        print(f"✅ Saved {len(df)} interactions to {filename}")
+        writer = get_chat_log_writer()
+        writer.flush()
+        print(f"✅ Saved {len(self.conversation)} interactions to the {writer.table} table")
 
-    def start_chat(self):
+    def start_chat(self, stream=False):
         print(f"\n🤖 Customer Care Bot (Model: {self.model})")
         print("Type 'quit' to exit\n")
 
         while True:
             user_input = input("👤 You: ").strip()
             if user_input.lower() == 'quit':
-                self.save_to_csv()
+                self.save_logs()
                 print("🤖 Session ended. Conversation saved.")
                 break
 
-            sentiment = self.classify_sentiment(user_input)
-            response = self.generate_response(user_input)
+            if stream:
+                print("\n🤖 Bot: ", end="", flush=True)
+                tokens = []
+                for token in self.generate_response_stream(user_input):
+                    tokens.append(token)
+                    print(token, end="", flush=True)
+                print("\n")
+                response = "".join(tokens).strip()
+            else:
+                response = self.generate_response(user_input)
+                print(f"\n🤖 Bot: {response}\n")
 
-            print(f"\n🤖 Bot: {response}\n")
+            sentiment = self.classify_sentiment(user_input)
             print(f"Sentiment: {sentiment[0]} | {sentiment[1]}\n")
 
             self.log_conversation(user_input, response, sentiment)
 
 if __name__ == "__main__":
     chatbot = CustomerCareChatbot()
-    chatbot.start_chat()
+    chatbot.start_chat(stream=True)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ✅ Background sentiment workers and how many finished results to keep for polling
+SENTIMENT_WORKERS = 2
+MAX_RESULTS = 1000
+TRIM_EVERY = 100  # drop the oldest jobs beyond max_results after this many writes
+# Job status lives next to the LLM cache, so any worker process can answer a poll
+JOBS_PATH = os.getenv("CHAT_JOBS_PATH", os.getenv("LLM_CACHE_PATH", os.path.join('data', 'llm_cache.sqlite')))
+
+
+# ✅ The text a chat turn is classified on, for live turns and imported transcripts alike
+def chat_text(user_input, bot_response):
+    return (user_input or '') + " " + (bot_response or '')
+
+
+class JobStore:
+    """SQLite-backed job id -> result dict, shared by every process using the file."""
+
+    def __init__(self, path=JOBS_PATH, max_results=MAX_RESULTS):
+        self.path = path
+        self.max_results = max_results
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT,
+                result TEXT,
+                updated REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_jobs_updated ON chat_jobs(updated)")
+        self._conn.commit()
+
+    def set(self, job_id, result):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO chat_jobs (id, status, result, updated) VALUES (?, ?, ?, ?)",
+                               (job_id, result['status'], json.dumps(result), time.time()))
+            self._writes += 1
+            if self._writes % TRIM_EVERY == 0:
+                self._conn.execute("""
+                    DELETE FROM chat_jobs WHERE id IN (
+                        SELECT id FROM chat_jobs ORDER BY updated DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_results,))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM chat_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chat_jobs WHERE status = 'pending'").fetchone()[0]
+
+
+class ChatSentimentQueue:
+    """Classify chat turns and persist their log rows off the request path.
+
+    submit() returns a job id immediately; get() reports the job status and,
+    once classified, the (emotion, fine-grained, thinking) sentiment. Status
+    is kept in a JobStore, so a poll served by another worker still finds it.
+    """
+
+    def __init__(self, classify_fn, writer, workers=SENTIMENT_WORKERS, max_results=MAX_RESULTS, store=None):
+        self.classify_fn = classify_fn
+        self.writer = writer
+        self.store = store or JobStore(max_results=max_results)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chat-sentiment')
+
+    def submit(self, chat_log):
+        job_id = uuid.uuid4().hex
+        self.store.set(job_id, {'status': 'pending'})
+        self._executor.submit(self._process, job_id, dict(chat_log))
+        return job_id
+
+    def _process(self, job_id, chat_log):
+        try:
+            sentiment = list(self.classify_fn(chat_text(chat_log['user_input'], chat_log['bot_response'])))
+            result = {'status': 'done', 'sentiment': sentiment}
+        except Exception as e:
+            sentiment = ["Unknown", "Unknown", ""]
+            result = {'status': 'error', 'error': str(e)}
+            print(f"❌ Chat sentiment failed: {e}")
+
+        chat_log['emotion_sentiment'] = sentiment[0]
+        chat_log['fine_grained_sentiment'] = sentiment[1]
+        chat_log['thinking'] = sentiment[2]
+        self.writer.write(chat_log)
+        self.store.set(job_id, result)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def pending(self):
+        return self.store.pending()
@@ -0,0 +1,115 @@
+import time
+import queue
+import atexit
+import threading
+import pandas as pd
+from storage import append_table, compact_table
+
+# ✅ Group size and max delay before queued chat rows are written
+FLUSH_SIZE = 50
+FLUSH_INTERVAL = 2.0  # seconds
+COMPACT_EVERY = 30    # flushes between merges of the day's small part files
+
+
+class ChatLogWriter:
+    """Append-only chat log writer backed by a queue and one flush thread.
+
+    Rows are written to the chat_logs table in groups; every flush becomes a
+    new Parquet part file renamed into place, so writers in other threads or
+    processes never interleave and readers never block them. Every
+    compact_every flushes the small parts of each day are merged into one.
+    """
+
+    def __init__(self, table='chat_logs', flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 compact_every=COMPACT_EVERY):
+        self.table = table
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.rows_written = 0
+        self.flushes = 0
+        self._queue = queue.Queue()
+        self._pending = []
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def write(self, row):
+        self._queue.put(row)
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='chat-log-writer', daemon=True)
+                self._thread.start()
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write_rows(self, rows):
+        if rows:
+            append_table(self.table, pd.DataFrame(rows))
+            self.rows_written += len(rows)
+            self.flushes += 1
+            if self.compact_every and self.flushes % self.compact_every == 0:
+                self.compact()
+
+    # ✅ Merge small part files; only one process compacts a table at a time
+    def compact(self):
+        from ingest_jobs import process_lock
+        try:
+            with process_lock(f"compact-{self.table}") as acquired:
+                return compact_table(self.table) if acquired else 0
+        except Exception as e:
+            print(f"❌ Failed to compact {self.table}: {e}")
+            return 0
+
+    # ✅ Collect a group (flush_size rows or flush_interval seconds), then write it
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                with self._flush_lock:
+                    self._pending.append(row)
+                    full = len(self._pending) >= self.flush_size
+                remaining = deadline - time.monotonic()
+                if full or remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            with self._flush_lock:
+                rows, self._pending = self._pending, []
+                try:
+                    self._write_rows(rows)
+                except Exception as e:
+                    # Keep the rows for the next group instead of dropping them
+                    self._pending = rows + self._pending
+                    print(f"❌ Failed to write chat logs: {e}")
+
+    # ✅ Write everything queued right now (used at shutdown and by the CLI bot)
+    def flush(self):
+        with self._flush_lock:
+            rows, self._pending = self._pending + self._drain(), []
+            self._write_rows(rows)
+
+
+# ✅ Shared process-wide writer
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_chat_log_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ChatLogWriter()
+        return _writer
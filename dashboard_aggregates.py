@@ -0,0 +1,86 @@
+import threading
+from collections import Counter, defaultdict
+import pandas as pd
+from storage import table_parts, part_day, table_version
+
+# ✅ Label columns counted for every dashboard
+LABEL_COLUMNS = ['emotion_sentiment', 'fine_grained_sentiment']
+
+
+class TableAggregates:
+    """Sentiment counts and daily trends of a table, maintained part by part.
+
+    Tables only grow by new part files, so refresh() reads just the label
+    columns of parts it has not seen yet. If a part disappears (the table
+    was rewritten) everything is rebuilt from the current parts.
+    """
+
+    def __init__(self, table, label_columns=LABEL_COLUMNS, trend_column='emotion_sentiment'):
+        self.table = table
+        self.label_columns = label_columns
+        self.trend_column = trend_column
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.parts = set()
+        self.total = 0
+        self.counts = {column: Counter() for column in self.label_columns}
+        self.daily = defaultdict(Counter)  # day -> trend label counts
+        self.version = 0
+
+    def _add_part(self, part):
+        df = pd.read_parquet(part, columns=self.label_columns)
+        self.total += len(df)
+        for column in self.label_columns:
+            self.counts[column].update(df[column].dropna().tolist())
+        day = part_day(part)
+        if day != 'unknown':
+            self.daily[day].update(df[self.trend_column].dropna().tolist())
+        self.parts.add(part)
+
+    def refresh(self):
+        with self._lock:
+            version = table_version(self.table)
+            if version == self.version:
+                return self
+            current = set(table_parts(self.table))
+            if not self.parts <= current:
+                self._reset()
+            for part in sorted(current - self.parts):
+                try:
+                    self._add_part(part)
+                except FileNotFoundError:
+                    continue  # removed by a concurrent rewrite; the next refresh rebuilds
+            self.version = version
+            return self
+
+    # ✅ Daily trend as a frame (one row per calendar day, missing days as 0)
+    def trend_frame(self):
+        with self._lock:
+            if not self.daily:
+                return pd.DataFrame()
+            trend = pd.DataFrame.from_dict(self.daily, orient='index').fillna(0)
+        trend.index = pd.to_datetime(trend.index)
+        trend = trend.sort_index()
+        return trend.reindex(pd.date_range(trend.index.min(), trend.index.max(), freq='D'), fill_value=0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'total': self.total,
+                'counts': {column: dict(counts.most_common()) for column, counts in self.counts.items()},
+                'version': self.version,
+            }
+
+
+# ✅ One aggregate per table, shared by every request
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+def get_aggregates(table):
+    with _aggregates_lock:
+        if table not in _aggregates:
+            _aggregates[table] = TableAggregates(table)
+        aggregates = _aggregates[table]
+    return aggregates.refresh()
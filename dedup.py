@@ -0,0 +1,118 @@
+import os
+import re
+import zlib
+import threading
+from collections import Counter
+import numpy as np
+
+# ✅ Near-duplicate clustering settings (CLASSIFY_DEDUP=0 turns the stage off)
+DEDUP = os.getenv("CLASSIFY_DEDUP", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # min estimated Jaccard to a representative
+SHINGLE_SIZE = 3    # words per shingle
+NUM_PERM = 64       # MinHash signature length
+BANDS = 16          # LSH bands of NUM_PERM // BANDS rows each
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.int64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.int64)
+
+# ✅ Template variables that differ between otherwise identical messages
+EMAIL = re.compile(r'\b[\w.+-]+@[\w-]+\.[\w.-]+\b')
+URL = re.compile(r'https?://\S+|www\.\S+')
+NUMBER = re.compile(r'\d{4,}')  # IDs and order numbers only; short numbers ("1/10", "2 days") carry meaning
+# A greeting is only stripped with a short name and its punctuation: "Hi Anna," but not "Hey this is awful"
+GREETING = re.compile(r"^\s*(?:hi|hello|hey|dear)(?:\s+[\w.'-]+){0,3}\s*[,!:\n]", re.IGNORECASE)
+
+
+def normalize_for_dedup(text):
+    text = GREETING.sub(' ', str(text if text is not None else ''))
+    text = NUMBER.sub('0', URL.sub(' url ', EMAIL.sub(' email ', text)))
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(normalized, size=SHINGLE_SIZE):
+    words = normalized.split()
+    if len(words) <= size:
+        grams = [normalized]
+    else:
+        grams = (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return np.array(sorted({zlib.crc32(gram.encode('utf-8')) & 0x7FFFFFFF for gram in grams}), dtype=np.int64)
+
+
+def minhash(hashes):
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def cluster_texts(texts, threshold=DEDUP_THRESHOLD):
+    """Return, for each text, the position of its cluster's representative.
+
+    Exact duplicates after normalization always share a cluster. Other texts
+    are compared, via LSH buckets, only with existing representatives and
+    join the first whose estimated Jaccard similarity reaches threshold, so
+    clusters never drift through chains of pairwise matches.
+    """
+    rows = NUM_PERM // BANDS
+    leaders = [None] * len(texts)
+    exact, buckets, signatures = {}, {}, {}
+    for position, text in enumerate(texts):
+        normalized = normalize_for_dedup(text)
+        if normalized in exact:
+            leaders[position] = exact[normalized]
+            continue
+        signature = minhash(shingles(normalized))
+        bands = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+        candidates = dict.fromkeys(leader for band in bands for leader in buckets.get(band, ()))
+        leader = next((candidate for candidate in candidates
+                       if np.mean(signatures[candidate] == signature) >= threshold), None)
+        if leader is None:
+            leader = position
+            signatures[position] = signature
+            for band in bands:
+                buckets.setdefault(band, []).append(position)
+        exact[normalized] = leader
+        leaders[position] = leader
+    return leaders
+
+
+class Deduplicator:
+    """Classify one representative per near-duplicate cluster and fan its labels out."""
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, enabled=DEDUP):
+        self.threshold = threshold
+        self.enabled = enabled
+        self.items = 0
+        self.clusters = 0
+        self.sizes = Counter()  # cluster size -> number of clusters
+        self._lock = threading.Lock()
+
+    def representatives(self, texts):
+        """Return (positions to classify, representative index for every text)."""
+        texts = list(texts)
+        if not self.enabled:
+            return list(range(len(texts))), list(range(len(texts)))
+        leaders = cluster_texts(texts, self.threshold)
+        unique = list(dict.fromkeys(leaders))
+        slot = {leader: number for number, leader in enumerate(unique)}
+        with self._lock:
+            self.items += len(texts)
+            self.clusters += len(unique)
+            self.sizes.update(Counter(leaders).values())
+        return unique, [slot[leader] for leader in leaders]
+
+    def stats(self, since=None):
+        """Totals, or the change since an earlier stats() result."""
+        with self._lock:
+            items, clusters, sizes = self.items, self.clusters, Counter(self.sizes)
+        if since:
+            items, clusters = items - since['items'], clusters - since['clusters']
+            sizes.subtract(since['cluster_sizes'])
+            sizes = +sizes
+        return {
+            'items': items,
+            'clusters': clusters,
+            'calls_avoided': items - clusters,
+            'avoided_rate': round(1 - clusters / items, 4) if items else 0.0,
+            'largest_cluster': max(sizes) if sizes else 0,
+            'cluster_sizes': dict(sorted(sizes.items())),
+        }
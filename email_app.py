@@ -1,97 +1,123 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 import pandas as pd
 import os
-import matplotlib.pyplot as plt
+import threading
 from io import BytesIO
 import base64
 from datetime import datetime
+from storage import query_table, to_records, table_version
+from dashboard_aggregates import get_aggregates
+from metrics import instrument_app, stage
 
 app = Flask(__name__)
+instrument_app(app)
 app.config['DATA_FOLDER'] = 'data'
-app.config['CSV_FILE'] = 'emails_cleaned.csv'
+app.config['TABLE'] = 'emails'
+
+# Columns the dashboard needs (email bodies are never loaded)
+DASHBOARD_COLUMNS = ['From', 'Subject', 'Date', 'src_name', 'src_email',
+                     'emotion_sentiment', 'fine_grained_sentiment', 'thinking']
 
 # Ensure data folder exists
 os.makedirs(app.config['DATA_FOLDER'], exist_ok=True)
 
-def get_csv_path():
-    """Get the path to our specific CSV file"""
-    csv_path = os.path.join(app.config['DATA_FOLDER'], app.config['CSV_FILE'])
-    return csv_path if os.path.exists(csv_path) else None
+# Rows per /analyze page (override with ?per_page=, capped at MAX_PER_PAGE)
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+def get_table_version():
+    """Get the version (latest write time) of the email table, 0 if empty"""
+    return table_version(app.config['TABLE'])
+
+def load_page(page, per_page):
+    """One page of dashboard rows (clamped to the last page) and the row count.
+
+    The row index is cached per table version; only the page's rows are read.
+    """
+    df, total = query_table(app.config['TABLE'], DASHBOARD_COLUMNS, page=page, per_page=per_page)
+    pages = max(1, -(-total // per_page))
+    if page > pages:
+        page = pages
+        df, total = query_table(app.config['TABLE'], DASHBOARD_COLUMNS, page=page, per_page=per_page)
+    return to_records(df), total, page
+
+# Rendered charts keyed by table version
+_charts = {'version': None, 'images': {}}
+_charts_lock = threading.Lock()
 
-def process_csv(filepath):
+def get_charts(aggregates):
+    with _charts_lock:
+        if _charts['version'] != aggregates.version:
+            with stage('render_charts', table=app.config['TABLE']):
+                _charts['images'] = generate_visualizations(aggregates)
+            _charts['version'] = aggregates.version
+        return _charts['images']
+
+def process_table(version, page=1, per_page=PER_PAGE):
     try:
-        df = pd.read_csv(filepath)
-        
-        # Convert date column if exists
-        if 'Date' in df.columns:
-            try:
-                df['Date'] = pd.to_datetime(df['Date'])
-            except:
-                pass
-        
-        # Generate visualizations
-        img_data = generate_visualizations(df)
-        
+        aggregates = get_aggregates(app.config['TABLE'])
+        snapshot = aggregates.snapshot()
+        rows, total, page = load_page(max(1, page), per_page)
+
         return {
-            'data': df.to_dict('records'),
-            'visualizations': img_data,
+            'data': rows,
+            'visualizations': get_charts(aggregates),
+            'pagination': {'page': page, 'per_page': per_page, 'pages': max(1, -(-total // per_page)), 'total': total},
             'stats': {
-                'total_emails': len(df),
-                'sentiment_counts': df['emotion_sentiment'].value_counts().to_dict(),
-                'fine_grained_counts': df['fine_grained_sentiment'].value_counts().to_dict(),
-                'last_updated': datetime.fromtimestamp(
-                    os.path.getmtime(filepath)
-                ).strftime('%Y-%m-%d %H:%M:%S'),
-                'filename': os.path.basename(filepath)
+                'total_emails': snapshot['total'],
+                'sentiment_counts': snapshot['counts']['emotion_sentiment'],
+                'fine_grained_counts': snapshot['counts']['fine_grained_sentiment'],
+                'last_updated': datetime.fromtimestamp(version).strftime('%Y-%m-%d %H:%M:%S'),
+                'filename': app.config['TABLE']
             }
         }
     except Exception as e:
-        print(f"Error processing CSV: {e}")
+        print(f"Error processing email table: {e}")
         return None
 
-def generate_visualizations(df):
+def _render(plot):
+    import matplotlib.pyplot as plt  # imported on first render to keep startup fast
+    plot(plt)
+    buf = BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight')
+    plt.close('all')
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+def generate_visualizations(aggregates):
     img_data = {}
+    emotion_counts = pd.Series(aggregates.counts['emotion_sentiment'], dtype=float)
+    fine_counts = pd.Series(aggregates.counts['fine_grained_sentiment'], dtype=float)
     
     # Sentiment Distribution Pie Chart
-    plt.figure(figsize=(8, 6))
-    df['emotion_sentiment'].value_counts().plot.pie(autopct='%1.1f%%', startangle=90)
-    plt.title('Emotion Sentiment Distribution')
-    plt.ylabel('')
-    buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    img_data['sentiment_pie'] = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
+    if not emotion_counts.empty:
+        def pie(plt):
+            plt.figure(figsize=(8, 6))
+            emotion_counts.sort_values(ascending=False).plot.pie(autopct='%1.1f%%', startangle=90)
+            plt.title('Emotion Sentiment Distribution')
+            plt.ylabel('')
+        img_data['sentiment_pie'] = _render(pie)
     
     # Fine-Grained Sentiment Bar Chart
-    plt.figure(figsize=(10, 6))
-    df['fine_grained_sentiment'].value_counts().plot.bar()
-    plt.title('Fine-Grained Sentiment Distribution')
-    plt.xlabel('Sentiment Type')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    img_data['fine_grained_bar'] = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
+    if not fine_counts.empty:
+        def bar(plt):
+            plt.figure(figsize=(10, 6))
+            fine_counts.sort_values(ascending=False).plot.bar()
+            plt.title('Fine-Grained Sentiment Distribution')
+            plt.xlabel('Sentiment Type')
+            plt.ylabel('Count')
+            plt.xticks(rotation=45)
+        img_data['fine_grained_bar'] = _render(bar)
     
-    # Sentiment Over Time (if Date column exists)
-    if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
+    # Sentiment Over Time (daily counts kept by the aggregates)
+    sentiment_counts = aggregates.trend_frame()
+    if not sentiment_counts.empty:
         try:
-            df.set_index('Date', inplace=True)
-            sentiment_counts = df.resample('D')['emotion_sentiment'].value_counts().unstack().fillna(0)
-            
-            plt.figure(figsize=(12, 6))
-            sentiment_counts.plot.area(stacked=True)
-            plt.title('Sentiment Trend Over Time')
-            plt.xlabel('Date')
-            plt.ylabel('Email Count')
-            buf = BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            buf.seek(0)
-            img_data['sentiment_trend'] = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close()
+            def trend(plt):
+                sentiment_counts.plot.area(stacked=True, figsize=(12, 6))
+                plt.title('Sentiment Trend Over Time')
+                plt.xlabel('Date')
+                plt.ylabel('Email Count')
+            img_data['sentiment_trend'] = _render(trend)
         except Exception as e:
             print(f"Error generating trend chart: {e}")
     
@@ -104,19 +130,21 @@ def index():
 @app.route('/analyze')
 def analyze_data():
     try:
-        csv_path = get_csv_path()
-        if not csv_path:
+        version = get_table_version()
+        if not version:
             return jsonify({
                 'error': True,
-                'message': f"CSV file {app.config['CSV_FILE']} not found",
-                'solution': "Please ensure emails_cleaned.csv exists in the data folder"
+                'message': f"Table {app.config['TABLE']} has no data",
+                'solution': "Run the email pipeline or `python storage.py migrate` first"
             }), 404
         
-        processed_data = process_csv(csv_path)
+        page = request.args.get('page', 1, type=int)
+        per_page = min(max(1, request.args.get('per_page', PER_PAGE, type=int)), MAX_PER_PAGE)
+        processed_data = process_table(version, page, per_page)
         if not processed_data:
             return jsonify({
                 'error': True,
-                'message': 'Error processing CSV file',
+                'message': 'Error processing email table',
                 'solution': 'Check the file format and content'
             }), 500
             
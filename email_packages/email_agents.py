@@ -1,16 +1,16 @@
 import pandas as pd
 import re
 import os
-from dotenv import load_dotenv
-from groq import Groq
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from sentiments import emotion_based_sentiments, fine_grained_sentiments
+from llm_cache import cached
+from metrics import stage
+from sentiment_service import get_service
+from email_packages.email_cleaner import EmailCleaner
+import llm_client
 
-# ✅ Load API Key
-load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
+# ✅ Bump when a prompt changes so cached results are not reused
+PROMPT_VERSION = "1"
 
 # ✅ Extract name/email from 'From' column
 def extract_name_email(from_text):
@@ -22,6 +22,8 @@ def extract_name_email(from_text):
     return pd.Series(["", ""])
 
 # ✅ Clean the email body using Groq
+@cached("clean_email_body", model="compound-beta-mini", temperature=0.2, prompt_version=PROMPT_VERSION,
+        valid=lambda body: bool(body.strip()))
 def clean_email_body(text):
     prompt = f"""
 You are a helpful email cleaner. Clean the following email body:
@@ -31,55 +33,27 @@ You are a helpful email cleaner. Clean the following email body:
 Email Body:
 {text}
 """
-    chat_completion = client.chat.completions.create(
-        model="compound-beta-mini",
-        messages=[
+    return llm_client.complete(
+        [
             {"role": "system", "content": "You clean email content without changing meaning or wording."},
             {"role": "user", "content": prompt}
         ],
         temperature=0.2,
         max_tokens=2048
     )
-    return chat_completion.choices[0].message.content.strip()
 
-# ✅ Sentiment Classification Agent
-def classify_sentiment(text):
-    prompt = f"""
-You are a sentiment analysis expert.
-Given the following email body, classify its sentiment into:
-- One of these fine-grained sentiments: {fine_grained_sentiments}
-- One of these emotion-based sentiments: {emotion_based_sentiments}
-- Provide a brief reasoning (thinking).
-
-Respond ONLY in this format:
-Fine-Grained Sentiment: <fine-grained sentiment>
-Emotion Sentiment: <emotion-based sentiment>
-Thinking: <brief reasoning>
-
-Email Body:
-{text}
-"""
-    chat_completion = client.chat.completions.create(
-        model="compound-beta-mini",
-        messages=[
-            {"role": "system", "content": "You accurately classify sentiments with clear reasoning."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3,
-        max_tokens=1024
-    )
-    response = chat_completion.choices[0].message.content.strip()
-
-    # ✅ Extract data using regex
-    fine_match = re.search(r"Fine-Grained Sentiment:\s*(.+)", response)
-    emotion_match = re.search(r"Emotion Sentiment:\s*(.+)", response)
-    thinking_match = re.search(r"Thinking:\s*(.+)", response)
+# ✅ Local cleaning first; only bodies the rules can't handle go to clean_email_body
+email_cleaner = EmailCleaner(clean_email_body)
 
-    fine_sentiment = fine_match.group(1).strip() if fine_match else "Unknown"
-    emotion_sentiment = emotion_match.group(1).strip() if emotion_match else "Unknown"
-    thinking = thinking_match.group(1).strip() if thinking_match else "No reasoning provided."
+def clean_email_bodies(texts):
+    with stage('clean_email_body') as span:
+        cleaned = pd.Series(email_cleaner.clean_many(texts), index=getattr(texts, 'index', None))
+        span['rows'] = len(cleaned)
+    return cleaned
 
-    return pd.Series([emotion_sentiment, fine_sentiment, thinking])
+# ✅ Sentiment Classification Agent (shared sentiment service, email prompts)
+def classify_sentiment(text):
+    return pd.Series(get_service('email').classify_one(text))
 
 # # ✅ Load Data
 # df = pd.read_csv("emails_cleaned.csv")
@@ -0,0 +1,125 @@
+import re
+import threading
+import unicodedata
+from email_packages.fetch_email import html_to_text
+from batch_sentiment import map_concurrent
+
+# ✅ Quoted replies and signatures: everything from the first match on is dropped
+REPLY_MARKERS = [
+    r'^On .{0,200}wrote:\s*$',
+    r'^-{2,}\s*Original Message\s*-{2,}',
+    r'^-{2,}\s*Forwarded message\s*-{2,}',
+    r'^From: .+\n(?:Sent|Date): ',
+    r'^-- ?$',
+    r'^Sent from my (?:iPhone|iPad|Android|mobile)',
+    r'^Get Outlook for ',
+]
+REPLY_PATTERN = re.compile('|'.join(REPLY_MARKERS), re.MULTILINE | re.IGNORECASE)
+
+# ✅ Footer lines that carry no content (only stripped from the trailing footer block)
+BOILERPLATE_PATTERN = re.compile(
+    r'unsubscribe|view (?:this email )?in (?:your )?browser|manage (?:your )?(?:email )?preferences|'
+    r'privacy policy|all rights reserved|©|you (?:are )?receiv(?:ed|ing) this (?:email|message)|'
+    r'update your preferences|do not reply to this (?:email|message)',
+    re.IGNORECASE
+)
+BOILERPLATE_MAX_CHARS = 200  # longer lines are kept even if they mention these phrases
+
+# ✅ Leftovers that mean the local pass could not produce readable text
+RESIDUE_PATTERN = re.compile(r'<[a-zA-Z/!][^>]*>|&[a-zA-Z]+;|&#\d+;|\{[^{}]*:[^{}]*;[^{}]*\}|[A-Za-z0-9+/=_-]{80,}')
+MAX_NOISE_RATIO = 0.05   # share of symbol/control characters tolerated in clean text
+LIST_ITEM = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s')
+
+
+def strip_link_targets(text):
+    text = re.sub(r'\s*<https?://[^>\s]+>', '', text)          # plain-text renderings of links
+    return re.sub(r'https?://\S{60,}', '', text)                 # long tracking URLs
+
+
+def trim_reply_and_signature(text):
+    match = REPLY_PATTERN.search(text)
+    kept = text[:match.start()] if match and match.start() > 0 else text
+    return '\n'.join(line for line in kept.split('\n') if not line.lstrip().startswith('>'))
+
+
+def is_boilerplate(line):
+    return len(line) <= BOILERPLATE_MAX_CHARS and bool(BOILERPLATE_PATTERN.search(line))
+
+
+# ✅ Only the footer is dropped: "please unsubscribe me" in the body is the customer's message
+def strip_boilerplate(text):
+    lines = text.split('\n')
+    end = len(lines)
+    while end and (not lines[end - 1].strip() or is_boilerplate(lines[end - 1])):
+        end -= 1
+    return '\n'.join(lines[:end]) if end else text  # a message that is all "footer" is the message
+
+
+# ✅ Re-join hard-wrapped lines into paragraphs (list items stay on their own line)
+def reflow(text):
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        lines = [line.strip() for line in block.split('\n') if line.strip()]
+        if not lines:
+            continue
+        merged = [lines[0]]
+        for line in lines[1:]:
+            if LIST_ITEM.match(line) or LIST_ITEM.match(merged[-1]):
+                merged.append(line)
+            else:
+                merged[-1] += ' ' + line
+        paragraphs.append('\n'.join(merged))
+    return '\n\n'.join(paragraphs)
+
+
+def noise_ratio(text):
+    if not text:
+        return 0.0
+    noisy = sum(1 for char in text if unicodedata.category(char)[0] in 'SC' and char not in '\n\t')
+    return noisy / len(text)
+
+
+def local_clean(text):
+    """Return (cleaned text, needs_llm) using only deterministic rules."""
+    text = html_to_text(str(text or ''))
+    text = strip_link_targets(text)
+    text = trim_reply_and_signature(text)
+    text = reflow(strip_boilerplate(text))
+    needs_llm = bool(RESIDUE_PATTERN.search(text)) or noise_ratio(text) > MAX_NOISE_RATIO
+    return text, needs_llm
+
+
+class EmailCleaner:
+    """Clean email bodies locally and send only messy leftovers to the LLM cleaner."""
+
+    def __init__(self, llm_clean_fn):
+        self.llm_clean_fn = llm_clean_fn
+        self.local = 0
+        self.llm = 0
+        self._lock = threading.Lock()
+
+    def clean(self, text):
+        cleaned, needs_llm = local_clean(text)
+        with self._lock:
+            if needs_llm:
+                self.llm += 1
+            else:
+                self.local += 1
+        return self.llm_clean_fn(cleaned) if needs_llm else cleaned
+
+    def clean_many(self, texts, max_workers=None):
+        return map_concurrent(self.clean, texts, max_workers)
+
+    def stats(self, since=None):
+        """Totals, or the change since an earlier stats() result."""
+        with self._lock:
+            local, llm = self.local, self.llm
+        if since:
+            local, llm = local - since['local'], llm - since['llm']
+        total = local + llm
+        return {
+            'local': local,
+            'llm': llm,
+            'llm_calls_avoided': local,
+            'avoided_rate': round(local / total, 3) if total else 0.0,
+        }
@@ -1,17 +1,25 @@
 import os
+import json
+import time
+import random
 import base64
 import re
-import pandas as pd
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import html
+from html.parser import HTMLParser
+from metrics import outbound, timed
 
 # ✅ Gmail API scope
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
 # ✅ Function to authenticate Gmail
+@timed('gmail_auth')
 def authenticate_gmail():
+    # Google client libraries are imported here so importing this module stays cheap
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from google.auth.transport.requests import Request
+
     creds = None
     if os.path.exists('token.json'):
         creds = Credentials.from_authorized_user_file('token.json', SCOPES)
@@ -26,11 +34,60 @@ def authenticate_gmail():
             token.write(creds.to_json())
     return build('gmail', 'v1', credentials=creds)
 
-# ✅ Function to remove HTML tags using regex
+# ✅ HTML to plain text: drop scripts/styles/comments, keep block structure as newlines
+BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'ul', 'ol', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'section', 'article', 'header', 'footer', 'hr'}
+SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript'}
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+        if tag == 'li':
+            self.parts.append('- ')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS and tag not in ('li', 'tr'):
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+def looks_like_html(text):
+    return bool(re.search(r'<(?:html|body|div|p|br|table|span|a|td|img|!DOCTYPE)\b', text or '', re.IGNORECASE))
+
+def html_to_text(text):
+    if not text:
+        return ''
+    if not looks_like_html(text):
+        return html.unescape(text)
+    parser = _TextExtractor()
+    parser.feed(text)
+    parser.close()
+    text = ''.join(parser.parts).replace('\xa0', ' ')
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+# ✅ Function to remove HTML tags (flattened to a single line)
 def remove_html_tags(text):
     if not text:
         return ''
-    text = re.sub(r'<[^>]+>', '', text)   # remove all tags
+    text = re.sub(r'<[^>]+>', '', html_to_text(text))   # drop any stray tags
     text = re.sub(r'\s+', ' ', text)      # clean up multiple spaces
     return text.strip()
 
@@ -59,44 +116,195 @@ def get_email_body(payload):
         return decode_data(body)
     return '(No body found)'
 
-# ✅ Fetch emails and clean them
-def get_emails(service, max_results=10):
-    messages = service.users().messages().list(userId='me', maxResults=max_results).execute().get('messages', [])
+# ✅ Turn a full Gmail message into our email row
+def parse_message(msg_data):
+    headers = msg_data['payload']['headers']
+    payload = msg_data['payload']
+
+    email_info = {'From': '', 'Subject': '', 'Date': '', 'Body': '', 'clean_body': ''}
+
+    for header in headers:
+        name = header.get('name')
+        if name == 'From':
+            email_info['From'] = header.get('value')
+        elif name == 'Subject':
+            email_info['Subject'] = header.get('value')
+        elif name == 'Date':
+            email_info['Date'] = header.get('value')
+
+    raw_body = get_email_body(payload)
+    email_info['Body'] = raw_body
+    email_info['clean_body'] = remove_html_tags(raw_body)
+    return email_info
+
+# ✅ Batch fetch settings (Gmail allows up to 100 calls per batch, 50 is the safe default)
+BATCH_SIZE = 50
+MAX_RETRIES = 5
+LIST_PAGE_SIZE = 500
 
-    email_list = []
-    for msg in messages:
-        msg_data = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-        headers = msg_data['payload']['headers']
-        payload = msg_data['payload']
+# ✅ Page through messages().list until max_results IDs are collected
+def list_message_ids(service, max_results=10, query=None):
+    message_ids, page_token = [], None
+    while len(message_ids) < max_results:
+        with outbound('gmail', 'messages.list'):
+            response = service.users().messages().list(
+                userId='me', q=query, pageToken=page_token,
+                maxResults=min(LIST_PAGE_SIZE, max_results - len(message_ids))
+            ).execute()
+        message_ids.extend(msg['id'] for msg in response.get('messages', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    return message_ids[:max_results]
 
-        email_info = {'From': '', 'Subject': '', 'Date': '', 'Body': '', 'clean_body': ''}
+def _is_retryable(error):
+    from googleapiclient.errors import HttpError
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status in (429, 500, 503) or (status == 403 and b'ateLimitExceeded' in (error.content or b''))
 
-        for header in headers:
-            name = header.get('name')
-            if name == 'From':
-                email_info['From'] = header.get('value')
-            elif name == 'Subject':
-                email_info['Subject'] = header.get('value')
-            elif name == 'Date':
-                email_info['Date'] = header.get('value')
+# ✅ Fetch full messages with batch HTTP requests, retrying rate-limited calls
+def iter_messages_batched(service, message_ids, batch_size=BATCH_SIZE, max_retries=MAX_RETRIES, missing=None):
+    """Yield full message payloads in the order of message_ids, one batch at a time.
 
-        raw_body = get_email_body(payload)
-        email_info['Body'] = raw_body
-        email_info['clean_body'] = remove_html_tags(raw_body)
+    IDs are grouped into batch requests of batch_size gets; gets that come
+    back rate limited (429/403 rateLimitExceeded) or 5xx are retried with
+    jittered exponential backoff. Messages deleted since they were listed
+    (404) are skipped and their IDs appended to missing; any other error is
+    raised. Only one batch of payloads is held at a time.
+    """
+    from googleapiclient.errors import HttpError
+    message_ids = list(dict.fromkeys(message_ids))
 
-        email_list.append(email_info)
+    for start in range(0, len(message_ids), batch_size):
+        chunk = message_ids[start:start + batch_size]
+        results = {}
+        pending = chunk
+        attempt = 0
+
+        while pending:
+            retry, errors = [], []
+
+            def callback(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = response
+                elif isinstance(exception, HttpError) and exception.resp.status == 404:
+                    if missing is not None:
+                        missing.append(request_id)
+                elif _is_retryable(exception):
+                    retry.append(request_id)
+                else:
+                    errors.append(exception)
+
+            batch = service.new_batch_http_request(callback=callback)
+            for message_id in pending:
+                batch.add(service.users().messages().get(userId='me', id=message_id, format='full'),
+                          request_id=message_id)
+            try:
+                with outbound('gmail', 'messages.batch_get') as span:
+                    span['rows'] = len(pending)
+                    batch.execute()
+            except HttpError as e:
+                if not _is_retryable(e):
+                    raise
+                retry = [message_id for message_id in pending if message_id not in results]
+
+            if errors:
+                raise errors[0]
+            if retry:
+                attempt += 1
+                if attempt > max_retries:
+                    raise RuntimeError(f"Gmail rate limit: {len(retry)} messages still failing after {max_retries} retries")
+                time.sleep(min(60, 2 ** attempt) + random.random())
+            pending = retry
+
+        for message_id in chunk:
+            if message_id in results:
+                yield results.pop(message_id)
+
+def fetch_messages_batched(service, message_ids, batch_size=BATCH_SIZE, max_retries=MAX_RETRIES):
+    """Return full message payloads in the order of message_ids."""
+    return list(iter_messages_batched(service, message_ids, batch_size, max_retries))
+
+# ✅ Stream parsed emails; memory is bounded by batch_size, not by max_results
+def iter_emails(service, max_results=10, batch_size=BATCH_SIZE):
+    message_ids = list_message_ids(service, max_results)
+    for msg_data in iter_messages_batched(service, message_ids, batch_size):
+        yield parse_message(msg_data)
+
+# ✅ Fetch emails and clean them
+@timed('get_emails', rows=len)
+def get_emails(service, max_results=10, batch_size=BATCH_SIZE):
+    email_list = list(iter_emails(service, max_results, batch_size))
 
     print(f"✅ Fetched {len(email_list)} emails.")
     return email_list
 
-# ✅ Save to CSV
-def save_emails_to_csv(email_list, filename=r'data\emails_cleaned.csv'):
-    df = pd.DataFrame(email_list)
-    df.to_csv(filename, index=False)
-    print(f"✅ Saved cleaned emails to {filename}")
-
-# # ✅ Main
-# if __name__ == '__main__':
-#     service = authenticate_gmail()
-#     emails = get_emails(service, max_results=1)
-#     save_emails_to_csv(emails)
+# ✅ Incremental sync state (Gmail historyId cursor + already processed message IDs)
+SYNC_STATE_FILE = os.path.join('data', 'gmail_sync_state.json')
+MAX_TRACKED_IDS = 5000
+
+def load_sync_state(state_file=SYNC_STATE_FILE):
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'history_id': None, 'processed_ids': []}
+
+def save_sync_state(state, state_file=SYNC_STATE_FILE):
+    state['processed_ids'] = state['processed_ids'][-MAX_TRACKED_IDS:]
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+# ✅ Message IDs added since start_history_id (None if the cursor is too old)
+def list_added_message_ids(service, start_history_id):
+    from googleapiclient.errors import HttpError
+    message_ids, page_token, history_id = [], None, start_history_id
+    while True:
+        try:
+            with outbound('gmail', 'history.list'):
+                response = service.users().history().list(
+                    userId='me', startHistoryId=start_history_id,
+                    historyTypes='messageAdded', pageToken=page_token
+                ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None, None
+            raise
+        for record in response.get('history', []):
+            for added in record.get('messagesAdded', []):
+                message_ids.append(added['message']['id'])
+        history_id = response.get('historyId', history_id)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return message_ids, history_id
+
+# ✅ Stream mail added since the last sync, recording progress in state as rows are yielded
+def iter_sync_emails(service, state, max_results=10, batch_size=BATCH_SIZE):
+    """Yield rows for messages not seen by a previous sync.
+
+    The first run (or a run whose historyId has expired) falls back to the
+    newest max_results messages; later runs walk history().list from the
+    stored cursor, so the cost follows the amount of new mail. Each yielded
+    message is added to state['processed_ids'] and the cursor moves once
+    the stream is exhausted, so saving state after every persisted batch
+    checkpoints a long sync.
+    """
+    message_ids = None
+    if state['history_id']:
+        message_ids, history_id = list_added_message_ids(service, state['history_id'])
+    if message_ids is None:
+        with outbound('gmail', 'get_profile'):
+            history_id = service.users().getProfile(userId='me').execute()['historyId']
+        message_ids = list_message_ids(service, max_results)
+
+    seen = set(state['processed_ids'])
+    new_ids = [message_id for message_id in dict.fromkeys(message_ids) if message_id not in seen]
+    # Deleted messages go straight into processed_ids so they are not asked for again
+    for msg_data in iter_messages_batched(service, new_ids, batch_size, missing=state['processed_ids']):
+        state['processed_ids'].append(msg_data['id'])
+        yield parse_message(msg_data)
+
+    state['history_id'] = history_id
@@ -0,0 +1,428 @@
+import os
+import re
+import json
+import time
+import zlib
+import base64
+import random
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+import pandas as pd
+from local_sentiment import LEXICON
+from sentiments import emotion_based_sentiments, fine_grained_sentiments
+
+# ✅ Local stand-ins for Groq, GitHub and Gmail used by the benchmark (no network, no keys)
+CORPUS_SOURCES = {
+    'email': (os.path.join('data', 'emails_cleaned.csv'), 'Body'),
+    'ticket': (os.path.join('data', 'github_issues_with_sentiment.csv'), 'Description'),
+    'chat': (os.path.join('data', 'chat_logs.csv'), 'user_input'),
+}
+FALLBACK_WORDS = "the a we you it is was on for with this that account order update team please thanks".split()
+TEMPLATES = 20  # distinct templates behind the near-duplicate items
+
+
+class SyntheticCorpus:
+    """Deterministic synthetic emails, issues and chat messages shaped like data/*.csv.
+
+    Vocabulary and word-count distributions come from the CSV text columns
+    (mixed with lexicon words so sentiment is present); item i is always
+    the same text for a given seed, so every process sees the same corpus.
+    A duplicate_rate share of items are copies of a few templates that only
+    differ in the greeting name and an order number.
+    """
+
+    def __init__(self, seed=0, duplicate_rate=0.0):
+        self.seed = seed
+        self.duplicate_rate = duplicate_rate
+        self.vocab, self.lengths = {}, {}
+        for kind, (path, column) in CORPUS_SOURCES.items():
+            texts = []
+            if os.path.exists(path):
+                texts = pd.read_csv(path)[column].dropna().astype(str).tolist()
+            words = [word for text in texts for word in re.findall(r"[^\W\d_]{2,}", text)]
+            self.vocab[kind] = sorted(set(words)) or FALLBACK_WORDS
+            self.lengths[kind] = [len(text.split()) for text in texts] or [40]
+        self.sentiment_words = sorted(LEXICON)
+
+    def _rng(self, kind, i):
+        return random.Random(zlib.crc32(f"{self.seed}:{kind}:{i}".encode()))
+
+    def _sentences(self, kind, i):
+        rng = self._rng(kind, i)
+        if i >= 0 and rng.random() < self.duplicate_rate:
+            _, sentences = self._sentences(kind, -1 - rng.randrange(TEMPLATES))
+            greeting = f"Hi {rng.choice(self.vocab[kind]).capitalize()}, order #{rng.randint(1000, 99999)}."
+            return rng, [greeting] + sentences
+        length = max(3, int(rng.choice(self.lengths[kind]) * rng.uniform(0.3, 1.5)))
+        words = [rng.choice(self.sentiment_words) if rng.random() < 0.08 else rng.choice(self.vocab[kind])
+                 for _ in range(length)]
+        sentences, start = [], 0
+        while start < len(words):
+            size = rng.randint(6, 18)
+            sentences.append(' '.join(words[start:start + size]).capitalize() + rng.choice('..!?'))
+            start += size
+        return rng, sentences
+
+    def email_body(self, i):
+        rng, sentences = self._sentences('email', i)
+        if rng.random() < 0.4:
+            paragraphs = ''.join(f"<p>{sentence}</p>" for sentence in sentences)
+            return f"<html><head><style>p{{margin:0}}</style></head><body>{paragraphs}" \
+                   f"<p>Unsubscribe | Privacy Policy</p></body></html>"
+        body = '\n\n'.join(' '.join(sentences[k:k + 3]) for k in range(0, len(sentences), 3))
+        if rng.random() < 0.3:
+            body += "\n\nOn Mon, Jul 7, 2025 at 9:00 AM Someone <someone@example.com> wrote:\n> earlier message"
+        return body
+
+    def email_message(self, i):
+        rng = self._rng('email-headers', i)
+        day = 1 + i % 28
+        headers = [
+            {'name': 'From', 'value': f"Sender {i % 97} <sender{i % 97}@example.com>"},
+            {'name': 'Subject', 'value': f"Update {i}: {rng.choice(self.vocab['email'])}"},
+            {'name': 'Date', 'value': f"Mon, {day:02d} Jul 2025 {i % 24:02d}:{i % 60:02d}:00 +0000"},
+        ]
+        data = base64.urlsafe_b64encode(self.email_body(i).encode('utf-8')).decode('ascii')
+        return {'id': f"m{i}", 'payload': {'headers': headers, 'body': {'data': data}}}
+
+    def issue(self, i):
+        rng, sentences = self._sentences('ticket', i)
+        body = '\n\n'.join(sentences)
+        if rng.random() < 0.3:
+            body += "\n\n```\nError: something failed\n    at run (main.js:10:5)\n```"
+        if rng.random() < 0.2:
+            body = "<!-- Please fill in the template -->\n" + body
+        return {
+            'id': 4_000_000_000 + i, 'number': i + 1, 'title': ' '.join(sentences[0].split()[:8]),
+            'body': body, 'created_at': f"2025-07-{1 + i % 28:02d}T{i % 24:02d}:00:00Z", 'state': rng.choice(['open', 'closed']),
+            'html_url': f"https://github.com/example/repo/issues/{i + 1}",
+        }
+
+    def chat_message(self, i):
+        _, sentences = self._sentences('chat', i)
+        return ' '.join(sentences[:2])
+
+
+# ✅ Sliding one-minute request/token window shared by the fake servers
+class _Window:
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm, self.tpm = rpm, tpm
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def admit(self, tokens):
+        """Return 0 if the call is admitted, else seconds until it would be."""
+        now = time.monotonic()
+        with self.lock:
+            while self.calls and now - self.calls[0][0] >= 60:
+                self.calls.popleft()
+            used = sum(entry[1] for entry in self.calls)
+            if (self.rpm and len(self.calls) >= self.rpm) or (self.tpm and self.calls and used + tokens > self.tpm):
+                return max(0.05, self.calls[0][0] + 60 - now)
+            self.calls.append((now, tokens))
+            return 0
+
+
+class _Server:
+    """ThreadingHTTPServer on a free local port, served from a daemon thread."""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name='fake-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.fake.lock:
+                return self._json(200, dict(self.server.fake.counters))
+        self.handle_get()
+
+    def handle_get(self):
+        self._json(404, {'message': 'Not Found'})
+
+
+class _GroqHandler(_Handler):
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            return self._json(404, {'error': {'message': 'Not Found'}})
+
+        prompt = ' '.join(str(message.get('content', '')) for message in request.get('messages', []))
+        prompt_tokens = len(prompt) // 4 + 1
+        wait = fake.window.admit(prompt_tokens + int(request.get('max_tokens') or 0))
+        if wait:
+            fake.count(rate_limited=1)
+            return self._json(429, {'error': {'message': 'Rate limit reached', 'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                              {'retry-after': f"{wait:.2f}"})
+        if fake.error_rate and random.random() < fake.error_rate:
+            fake.count(server_errors=1)
+            return self._json(503, {'error': {'message': 'Service Unavailable'}})
+
+        reply = fake.reply(request.get('messages', []))
+        completion_tokens = len(reply) // 4 + 1
+        fake.count(requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        if request.get('stream'):
+            return self._stream(request, reply, usage)
+        time.sleep(fake.latency + fake.token_latency * completion_tokens)
+        self._json(200, {
+            'id': f"chatcmpl-{random.getrandbits(48):x}", 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': usage,
+        })
+
+    def _stream(self, request, reply, usage):
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(fake.latency)
+        for token in re.findall(r'\S+\s*', reply):
+            chunk = {'id': 'chatcmpl-stream', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': request.get('model', 'fake'),
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(fake.token_latency * (len(token) // 4 + 1))
+        # Like Groq, the final chunk carries the stream's usage
+        final = {'id': 'chatcmpl-stream', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                 'model': request.get('model', 'fake'), 'x_groq': {'usage': usage},
+                 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeGroqServer(_Server):
+    """OpenAI-style chat completions with latency, rate limits, 5xx and SSE streaming.
+
+    Point the Groq client at it with GROQ_BASE_URL=server.url. Answers are
+    shaped for the prompt: packed JSON arrays, single-item sentiment lines,
+    echoed email bodies for the cleaner, and short chat replies.
+    """
+
+    def __init__(self, latency=0.05, token_latency=0.0005, rpm=0, tpm=0, error_rate=0.0):
+        super().__init__(_GroqHandler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.window = _Window(rpm, tpm)
+
+    @staticmethod
+    def _labels(text):
+        digest = zlib.crc32(text.encode('utf-8'))
+        return (emotion_based_sentiments[digest % len(emotion_based_sentiments)],
+                fine_grained_sentiments[(digest >> 8) % len(fine_grained_sentiments)])
+
+    def reply(self, messages):
+        prompt = str(messages[-1].get('content', '')) if messages else ''
+        if 'Respond ONLY with a JSON array' in prompt:
+            items = re.split(r'^\[(\d+)\]\n', prompt.split('Items:', 1)[-1], flags=re.MULTILINE)[1:]
+            answers = []
+            for number, text in zip(items[::2], items[1::2]):
+                emotion, fine = self._labels(text)
+                answers.append({'id': int(number), 'fine_grained': fine, 'emotion': emotion, 'thinking': 'Synthetic label.'})
+            return json.dumps(answers)
+        if 'Fine-Grained Sentiment:' in prompt:
+            emotion, fine = self._labels(prompt)
+            return f"Fine-Grained Sentiment: {fine}\nEmotion Sentiment: {emotion}\nThinking: Synthetic label."
+        if 'Email Body:' in prompt:
+            return prompt.split('Email Body:', 1)[1].strip()
+        return "Thanks for reaching out, we are looking into this and will update you shortly."
+
+
+class _GitHubHandler(_Handler):
+    def handle_get(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        if not re.fullmatch(r'/repos/[^/]+/[^/]+/issues', url.path):
+            return self._json(404, {'message': 'Not Found'})
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        per_page = min(100, int(query.get('per_page', 30)))
+        page = int(query.get('page', 1))
+        start = (page - 1) * per_page
+        numbers = range(start, min(start + per_page, fake.total))
+
+        with fake.lock:
+            exhausted = fake.rate_limited > 0
+            fake.rate_limited -= exhausted
+        if exhausted:
+            fake.count(rate_limited=1)
+            return self._json(403, {'message': 'API rate limit exceeded'},
+                              {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + fake.reset_after)})
+
+        etag = f'"{fake.corpus.seed}-{page}-{per_page}"'
+        headers = {'ETag': etag, 'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': str(int(time.time()) + 3600)}
+        if start + per_page < fake.total:
+            headers['Link'] = f'<{fake.url}{url.path}?{urlencode({**query, "page": page + 1})}>; rel="next"'
+        time.sleep(fake.latency)
+        if self.headers.get('If-None-Match') == etag:
+            fake.count(not_modified=1)
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+        fake.count(pages=1, issues=len(numbers))
+        self._json(200, [fake.corpus.issue(i) for i in numbers], headers)
+
+
+class FakeGitHubServer(_Server):
+    """Paginated /repos/<owner>/<repo>/issues with Link, ETag and rate-limit headers.
+
+    The first rate_limited requests answer 403 with X-RateLimit-Remaining 0
+    and a reset reset_after seconds ahead.
+    """
+
+    def __init__(self, corpus, total=1_000_000, latency=0.02, rate_limited=0, reset_after=2):
+        super().__init__(_GitHubHandler)
+        self.corpus = corpus
+        self.total = total
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.reset_after = reset_after
+
+
+class FakeGmailService:
+    """In-process stand-in for the Gmail API client (googleapiclient resource).
+
+    Supports the calls the pipeline makes: messages().list with paging,
+    batched messages().get through new_batch_http_request, getProfile and
+    history().list. latency is slept once per list page and per batch,
+    like one HTTP round trip. deleted IDs answer 404, the first
+    rate_limited gets answer 429, and history lists added IDs.
+    """
+
+    def __init__(self, corpus, total=1_000_000, latency=0.02, deleted=(), rate_limited=0, history=()):
+        self.corpus = corpus
+        self.total = total
+        self.latency = latency
+        self.deleted = set(deleted)
+        self.rate_limited = rate_limited
+        self.history_ids = list(history)
+        self.round_trips = 0
+        self.gets = 0
+
+    class _Call:
+        def __init__(self, fn):
+            self.fn = fn
+
+        def execute(self):
+            return self.fn()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _FakeHistory(self)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        time.sleep(self.latency)
+
+    def list(self, userId='me', q=None, pageToken=None, maxResults=100):
+        def run():
+            self._round_trip()
+            start = int(pageToken or 0)
+            end = min(start + maxResults, self.total)
+            response = {'messages': [{'id': f"m{i}"} for i in range(start, end)]}
+            if end < self.total:
+                response['nextPageToken'] = str(end)
+            return response
+        return self._Call(run)
+
+    def get(self, userId='me', id=None, format='full'):
+        def run():
+            self.gets += 1
+            if id in self.deleted:
+                raise _http_error(404)
+            if self.rate_limited > 0:
+                self.rate_limited -= 1
+                raise _http_error(429)
+            return self.corpus.email_message(int(id[1:]))
+        return self._Call(run)
+
+    def getProfile(self, userId='me'):
+        return self._Call(lambda: {'historyId': '1'})
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
+
+
+def _http_error(status):
+    import httplib2
+    from googleapiclient.errors import HttpError
+    return HttpError(httplib2.Response({'status': status}), b'{"error": {"code": %d}}' % status)
+
+
+class _FakeHistory:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **kwargs):
+        added = [{'messagesAdded': [{'message': {'id': message_id}}]} for message_id in self.service.history_ids]
+        return FakeGmailService._Call(lambda: {'history': added, 'historyId': '2'})
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, call, request_id=None):
+        self.calls.append((request_id, call))
+
+    def execute(self):
+        from googleapiclient.errors import HttpError
+        self.service._round_trip()
+        for request_id, call in self.calls:
+            try:
+                response = call.execute()
+            except HttpError as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
@@ -0,0 +1,37 @@
+import os
+import re
+import sys
+import subprocess
+
+# ✅ Startup budget for `import main` and the heavy modules it must not pull in eagerly
+IMPORT_BUDGET_SECONDS = 0.5
+LAZY_MODULES = ('groq', 'googleapiclient', 'google_auth_oauthlib', 'pyarrow', 'matplotlib', 'pandas')
+
+
+def measure(module='main'):
+    """Return (total seconds, imported top-level packages) for importing module."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total, packages = 0, set()
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|(\s*)(\S+)', line)
+        if not match:
+            continue
+        packages.add(match.group(3).split('.')[0])
+        if len(match.group(2)) == 1:  # top-level entries only
+            total += int(match.group(1))
+    return total / 1e6, packages
+
+
+if __name__ == "__main__":
+    seconds, packages = measure()
+    eager = sorted(set(LAZY_MODULES) & packages)
+    print(f"⏱️ import main: {seconds:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)")
+    if eager:
+        print(f"❌ Imported eagerly: {', '.join(eager)}")
+    if seconds > IMPORT_BUDGET_SECONDS or eager:
+        sys.exit(1)
+    print("✅ Startup within budget")
@@ -0,0 +1,190 @@
+import os
+import time
+import threading
+import traceback
+from contextlib import contextmanager
+from functools import lru_cache
+from metrics import stage
+
+# ✅ Seconds between scheduled refreshes per source (0 disables the schedule; manual triggers still work)
+REFRESH_INTERVALS = {
+    'emails': float(os.getenv("EMAIL_REFRESH_INTERVAL", "300")),
+    'tickets': float(os.getenv("TICKET_REFRESH_INTERVAL", "600")),
+}
+EMAIL_BATCH = int(os.getenv("EMAIL_REFRESH_BATCH", "10"))
+TICKET_BATCH = int(os.getenv("TICKET_REFRESH_BATCH", "10"))
+GITHUB_REPO = os.getenv("GITHUB_REPO", "microsoft/vscode")
+LOCK_DIR = os.getenv("INGEST_LOCK_DIR", os.path.join('data', 'locks'))  # shared by every worker process
+
+
+# ✅ Non-blocking exclusive file lock across processes (e.g. gunicorn workers); yields whether it was acquired
+@contextmanager
+def process_lock(name, lock_dir=LOCK_DIR):
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{name}.lock"), 'a') as handle:
+        try:
+            import fcntl
+        except ImportError:  # no flock (Windows): single-flight stays per process
+            yield True
+            return
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def get_github_fetcher():
+    # Shared GitHub client (pooled session + ETag cache across refreshes)
+    from ticket.github_issues import GitHubIssueFetcher
+    return GitHubIssueFetcher(GITHUB_REPO)
+
+
+# ✅ Fetch new mail since the last sync, clean, classify and append it
+def refresh_emails():
+    from pipeline import GmailSource, run_source
+    return run_source(GmailSource(), EMAIL_BATCH, lock=False)  # RefreshJob holds the lock
+
+
+# ✅ Fetch the latest issues (cheap 304s when nothing changed), classify and replace the table
+def refresh_tickets():
+    from pipeline import GitHubSource, run_source
+    return run_source(GitHubSource(), TICKET_BATCH, lock=False)  # RefreshJob holds the lock
+
+
+class RefreshJob:
+    """Single-flight wrapper around one source's refresh function.
+
+    trigger() starts a run in a background thread unless one is already in
+    flight, in which case the trigger is counted and folded into that run.
+    A lock file extends this to other processes: a run that finds another
+    worker refreshing the same source is skipped and counted the same way.
+    """
+
+    def __init__(self, name, fn, interval=0, lock_dir=LOCK_DIR):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.lock_dir = lock_dir
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = 'idle'
+        self.runs = 0
+        self.failures = 0
+        self.deduplicated = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_duration = None
+        self.last_result = None
+        self.last_error = None
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self):
+        """Start a refresh; returns False if one was already running."""
+        with self._lock:
+            if self.running():
+                self.deduplicated += 1
+                return False
+            self.state = 'running'
+            self.last_started = time.time()
+            self._thread = threading.Thread(target=self._run, name=f'refresh-{self.name}', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        with process_lock(f"refresh-{self.name}", self.lock_dir) as acquired:
+            if acquired:
+                return self._refresh()
+        with self._lock:
+            self.deduplicated += 1
+            self.state = 'failed' if self.last_error else 'idle'
+
+    def _refresh(self):
+        start = time.monotonic()
+        try:
+            with stage('refresh', source=self.name) as span:
+                result, error = self.fn(), None
+                span['rows'] = result.get('rows') if isinstance(result, dict) else None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+            print(f"❌ {self.name} refresh failed: {error}")
+            traceback.print_exc()
+        with self._lock:
+            self.runs += 1
+            self.last_finished = time.time()
+            self.last_duration = round(time.monotonic() - start, 3)
+            if error:
+                self.failures += 1
+                self.last_error = error
+                self.state = 'failed'
+            else:
+                self.last_result = result
+                self.last_error = None
+                self.state = 'idle'
+
+    def due(self, now):
+        return self.interval > 0 and not self.running() and (
+            self.last_started is None or now - self.last_started >= self.interval)
+
+    def status(self):
+        with self._lock:
+            return {
+                'name': self.name, 'state': 'running' if self.running() else self.state,
+                'interval': self.interval, 'runs': self.runs, 'failures': self.failures,
+                'deduplicated_triggers': self.deduplicated,
+                'last_started': self.last_started, 'last_finished': self.last_finished,
+                'last_duration': self.last_duration, 'last_result': self.last_result,
+                'last_error': self.last_error,
+            }
+
+
+class IngestScheduler:
+    """Runs every job whose interval has elapsed; one daemon thread for all sources."""
+
+    TICK = 1.0  # seconds between due checks
+
+    def __init__(self, jobs):
+        self.jobs = {job.name: job for job in jobs}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name='ingest-scheduler', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.time()
+            for job in self.jobs.values():
+                if job.due(now):
+                    job.trigger()
+            self._stop.wait(self.TICK)
+
+    def trigger(self, name):
+        return self.jobs[name].trigger()
+
+    def status(self):
+        return {name: job.status() for name, job in self.jobs.items()}
+
+
+@lru_cache(maxsize=None)
+def get_ingest_scheduler():
+    return IngestScheduler([
+        RefreshJob('emails', refresh_emails, REFRESH_INTERVALS['emails']),
+        RefreshJob('tickets', refresh_tickets, REFRESH_INTERVALS['tickets']),
+    ])
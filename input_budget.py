@@ -0,0 +1,107 @@
+import os
+import re
+from collections import Counter
+from batch_sentiment import estimate_tokens
+from local_sentiment import LEXICON, NEGATORS, TOKEN_RE
+from sentiments import fine_grained_sentiments
+
+# ✅ Max estimated tokens of text sent per item (override with CLASSIFY_INPUT_TOKENS)
+INPUT_TOKEN_BUDGET = int(os.getenv("CLASSIFY_INPUT_TOKENS", "512"))
+# ✅ Map-reduce: classify up to MAX_CHUNKS budget-sized chunks per item and aggregate the labels
+MAP_REDUCE = os.getenv("CLASSIFY_MAP_REDUCE", "0") == "1"
+MAX_CHUNKS = int(os.getenv("CLASSIFY_MAX_CHUNKS", "4"))
+
+# ✅ Per-item token counts recorded next to the sentiment columns
+TOKEN_COLUMNS = ['input_tokens', 'prompt_tokens']
+
+# ✅ Issue-body noise that carries no sentiment
+FENCED_CODE = re.compile(r'```.*?(?:```|\Z)|~~~.*?(?:~~~|\Z)', re.DOTALL)
+HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+NOISE_LINE = re.compile(
+    r'^\s*(?:>.*'                                               # quoted history
+    r'|(?: {4}|\t).*'                                          # indented code
+    r'|at [\w$.<>]+ ?\(.*\)\s*'                                # JS/Java stack frames
+    r'|File ".+", line \d+.*|Traceback \(most recent call last\):.*'
+    r'|\[?\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}.*'                  # timestamped log lines
+    r'|\[?(?:DEBUG|INFO|WARN|WARNING|ERROR|TRACE)\]?[: ].*)$'
+)
+
+
+def strip_noise(text):
+    text = FENCED_CODE.sub('\n', HTML_COMMENT.sub('', text))
+    lines = [line for line in text.split('\n') if not NOISE_LINE.match(line)]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def split_segments(text):
+    segments = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        segments.extend(s.strip() for s in re.split(r'(?<=[.!?])\s+|\n', paragraph) if s.strip())
+    return segments
+
+
+# ✅ How much a segment says about sentiment: lexicon valence, negation and emphasis
+def segment_score(segment):
+    tokens = TOKEN_RE.findall(segment.lower())
+    score = sum(abs(LEXICON[token][0]) for token in tokens if token in LEXICON)
+    score += sum(1 for token in tokens if token in NEGATORS) + segment.count('!')
+    return score / (1 + len(tokens) ** 0.5)
+
+
+def fit_to_budget(text, budget=INPUT_TOKEN_BUDGET):
+    """Keep the opening segment plus the most sentiment-bearing ones, in original order."""
+    if estimate_tokens(text) <= budget:
+        return text
+    segments = split_segments(text)
+    if not segments:
+        return text[:budget * 4]
+
+    ranked = [0] + sorted(range(1, len(segments)), key=lambda i: segment_score(segments[i]), reverse=True)
+    keep, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(segments[i])
+        if used + cost > budget:
+            continue
+        keep.add(i)
+        used += cost
+    if not keep:
+        return segments[0][:budget * 4]
+    return ' '.join(segments[i] for i in sorted(keep))
+
+
+# ✅ Consecutive segments grouped into chunks of at most budget tokens
+def chunk_text(text, budget=INPUT_TOKEN_BUDGET, max_chunks=MAX_CHUNKS):
+    chunks, current, used = [], [], 0
+    for segment in split_segments(text):
+        segment = segment[:budget * 4]
+        cost = estimate_tokens(segment)
+        if current and used + cost > budget:
+            chunks.append(' '.join(current))
+            current, used = [], 0
+        current.append(segment)
+        used += cost
+    if current:
+        chunks.append(' '.join(current))
+    if len(chunks) > max_chunks:
+        chunks = sorted(chunks, key=segment_score, reverse=True)[:max_chunks]
+    return chunks or [text]
+
+
+def prepare_text(text, budget=INPUT_TOKEN_BUDGET, strip=False, map_reduce=False):
+    """Return the list of texts to classify for one item (one unless map_reduce)."""
+    text = str(text if text is not None else '')
+    if strip:
+        text = strip_noise(text) or text
+    return chunk_text(text, budget) if map_reduce else [fit_to_budget(text, budget)]
+
+
+# ✅ Reduce chunk labels to one [emotion, fine-grained, thinking]
+def aggregate_labels(rows):
+    if len(rows) == 1:
+        return list(rows[0])
+    scale = {label: rank for rank, label in enumerate(fine_grained_sentiments)}
+    ranks = sorted(scale[row[1]] for row in rows if row[1] in scale)
+    fine = fine_grained_sentiments[ranks[(len(ranks) - 1) // 2]] if ranks else rows[0][1]
+    emotion = Counter(row[0] for row in rows).most_common(1)[0][0]
+    thinking = next((row[2] for row in rows if row[1] == fine), rows[0][2])
+    return [emotion, fine, thinking]
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import wraps
+from metrics import inc
+
+# ✅ Cache location and eviction limits (override via environment)
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join('data', 'llm_cache.sqlite'))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+EVICT_EVERY = 500  # run eviction after this many writes
+
+
+# ✅ Whitespace-insensitive form of the text used for hashing
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', str(text)).strip()
+
+
+def make_key(kind, text, model, prompt_version, temperature):
+    payload = json.dumps([kind, normalize_text(text), model, str(prompt_version), float(temperature)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed, content-addressed store of LLM results."""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT,
+                value TEXT,
+                created REAL,
+                accessed REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                inc('cache_misses_total', cache='llm')
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        inc('cache_hits_total', cache='llm')
+        return json.loads(row[0])
+
+    def put(self, key, value, kind=''):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value), now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    # ✅ Drop expired entries, then the least recently used beyond max_entries
+    def evict(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.max_age,))
+            self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries
+        }
+
+
+# ✅ Shared process-wide cache, opened on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cached(kind, model, temperature, prompt_version="1", wrap=None, valid=None):
+    """Cache a fn(text) LLM agent by content hash.
+
+    Results are stored as JSON (a str, or a list for Series/tuple results)
+    and passed through wrap on the way out, e.g. wrap=pd.Series. Results
+    failing valid(result), e.g. unparseable answers, are returned uncached.
+    """
+    spec = {'kind': kind, 'model': model, 'temperature': temperature, 'prompt_version': prompt_version}
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(text):
+            cache = get_cache()
+            key = make_key(kind, text, model, prompt_version, temperature)
+            value = cache.get(key)
+            if value is None:
+                result = fn(text)
+                value = result if isinstance(result, str) else list(result)
+                if valid is None or valid(value):
+                    cache.put(key, value, kind)
+                return result
+            return wrap(value) if wrap else value
+
+        wrapper.cache_spec = spec
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+import os
+import threading
+from dotenv import load_dotenv
+from llm_scheduler import get_scheduler, estimate_message_tokens
+from metrics import outbound, inc
+
+# ✅ Load API keys once for every agent
+load_dotenv()
+DEFAULT_MODEL = "compound-beta-mini"
+
+# ✅ One shared client (and HTTP connection pool) per API key, built on first use
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key_env="GROQ_API_KEY"):
+    with _clients_lock:
+        if api_key_env not in _clients:
+            from groq import Groq
+            # Retries are owned by the scheduler so they share the key's budget
+            _clients[api_key_env] = Groq(api_key=os.getenv(api_key_env), max_retries=0)
+        return _clients[api_key_env]
+
+
+# ✅ None for errors that must be raised, else the server's Retry-After (0 if absent)
+def retry_delay(error):
+    from groq import APIConnectionError
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        return 0 if isinstance(error, APIConnectionError) else None
+    if status != 429 and status < 500:
+        return None
+    try:
+        return float(error.response.headers.get('retry-after', 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def _create(api_key_env, messages, max_tokens, **kwargs):
+    operation = 'chat.completions.stream' if kwargs.get('stream') else 'chat.completions'
+
+    def send():
+        # One span per attempt, so retried calls show up as separate latencies and errors
+        with outbound('groq', operation):
+            response = get_client(api_key_env).chat.completions.create(
+                messages=messages, max_tokens=max_tokens, **kwargs)
+        usage = getattr(response, 'usage', None)
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if getattr(usage, kind, None):
+                inc('llm_tokens_total', getattr(usage, kind), type=kind.split('_')[0], model=kwargs.get('model'))
+        return response
+
+    return get_scheduler(api_key_env).run(send, estimate_message_tokens(messages) + max_tokens, retry_delay,
+                                          reservation=bool(kwargs.get('stream')))
+
+
+# ✅ Chat completion returning the stripped reply text
+def complete(messages, temperature, max_tokens, model=DEFAULT_MODEL, api_key_env="GROQ_API_KEY"):
+    response = _create(api_key_env, messages, max_tokens, model=model, temperature=temperature)
+    return response.choices[0].message.content.strip()
+
+
+# ✅ Streaming chat completion yielding text deltas as they arrive
+def stream(messages, temperature, max_tokens, model=DEFAULT_MODEL, api_key_env="GROQ_API_KEY"):
+    chunks, entry = _create(api_key_env, messages, max_tokens, model=model, temperature=temperature, stream=True)
+    used, streamed = None, 0
+    try:
+        for chunk in chunks:
+            # Groq reports the stream's usage in the final chunk
+            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or getattr(chunk, 'usage', None)
+            used = getattr(usage, 'total_tokens', None) or used
+            if chunk.choices and chunk.choices[0].delta.content:
+                streamed += len(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        # Without reported usage (e.g. an interrupted stream) count what was actually streamed
+        get_scheduler(api_key_env).settle(entry, used or estimate_message_tokens(messages) + streamed // 4 + 1)
@@ -0,0 +1,160 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from metrics import add_collector
+
+# ✅ Per-key Groq budgets (override via environment to match your plan's limits)
+REQUESTS_PER_MINUTE = int(os.getenv("GROQ_RPM", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("GROQ_TPM", "6000"))
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "6"))
+MAX_BACKOFF = 60.0  # seconds
+WINDOW = 60.0       # seconds
+
+
+# ✅ Rough prompt token estimate (~4 characters per token)
+def estimate_message_tokens(messages):
+    return sum(len(str(message.get('content', ''))) // 4 + 4 for message in messages)
+
+
+class RateLimitScheduler:
+    """Pace calls to one API key under sliding-window RPM and TPM budgets.
+
+    Each call reserves its estimated tokens (prompt estimate + max_tokens)
+    before it is sent and is corrected to the real usage afterwards (a failed
+    attempt keeps its request slot but releases its tokens), so concurrent
+    callers queue instead of tripping 429s. Retryable failures
+    back off with jitter, and a server Retry-After pauses every caller.
+    """
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._window = deque()  # [sent_at, tokens] per call in the last WINDOW seconds
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self.waiting = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _used_tokens(self):
+        return sum(entry[1] for entry in self._window)
+
+    # ✅ Block until the call fits both budgets, then reserve it
+    def acquire(self, tokens):
+        start = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    while self._window and now - self._window[0][0] >= WINDOW:
+                        self._window.popleft()
+                    delay = self._paused_until - now
+                    if delay <= 0:
+                        fits_tokens = not self._window or self._used_tokens() + tokens <= self.tpm
+                        if len(self._window) < self.rpm and fits_tokens:
+                            break
+                        delay = self._window[0][0] + WINDOW - now
+                    self._cond.wait(timeout=max(delay, 0.01))
+
+                entry = [now, tokens]
+                self._window.append(entry)
+                self.requests += 1
+                self.total_wait += now - start
+                self.max_wait = max(self.max_wait, now - start)
+                return entry
+            finally:
+                self.waiting -= 1
+
+    # ✅ Replace a reservation's estimate with the tokens the API reported
+    def settle(self, entry, tokens):
+        with self._cond:
+            entry[1] = tokens
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def run(self, fn, tokens, retry_delay, reservation=False):
+        """Call fn() inside the budget, retrying while retry_delay(error) is not None.
+
+        retry_delay returns None for errors that must be raised, otherwise
+        the server-suggested wait in seconds (0 if none was given). A
+        response with a usage.total_tokens attribute settles the reservation;
+        with reservation=True, (response, entry) is returned instead and the
+        caller settles the entry itself (e.g. once a stream has finished).
+        """
+        attempt = 0
+        while True:
+            entry = self.acquire(tokens)
+            try:
+                response = fn()
+            except Exception as e:
+                self.settle(entry, 0)
+                hint = retry_delay(e)
+                if hint is None or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                self.pause(max(hint, min(MAX_BACKOFF, 2 ** attempt) * (0.5 + random.random())))
+                continue
+
+            if reservation:
+                return response, entry
+            usage = getattr(response, 'usage', None)
+            if getattr(usage, 'total_tokens', None):
+                self.settle(entry, usage.total_tokens)
+            return response
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': self.waiting,
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'tokens_in_window': self._used_tokens(),
+                'avg_wait': round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+                'max_wait': round(self.max_wait, 3),
+            }
+
+
+# ✅ One scheduler per API key (each key has its own limits)
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(api_key_env="GROQ_API_KEY"):
+    with _schedulers_lock:
+        if api_key_env not in _schedulers:
+            _schedulers[api_key_env] = RateLimitScheduler()
+        return _schedulers[api_key_env]
+
+
+def scheduler_stats():
+    with _schedulers_lock:
+        return {key: scheduler.stats() for key, scheduler in _schedulers.items()}
+
+
+# ✅ Scheduler state on /metrics: queue depth and waits as gauges, call outcomes as counters
+def _metric_samples():
+    samples = []
+    for key, stats in scheduler_stats().items():
+        labels = {'key': key}
+        samples += [('llm_scheduler_queue_depth', 'gauge', labels, stats['queue_depth']),
+                    ('llm_scheduler_tokens_in_window', 'gauge', labels, stats['tokens_in_window']),
+                    ('llm_scheduler_avg_wait_seconds', 'gauge', labels, stats['avg_wait']),
+                    ('llm_scheduler_max_wait_seconds', 'gauge', labels, stats['max_wait']),
+                    ('llm_requests_total', 'counter', labels, stats['requests']),
+                    ('llm_retries_total', 'counter', labels, stats['retries']),
+                    ('llm_failures_total', 'counter', labels, stats['failures'])]
+    return samples
+
+add_collector(_metric_samples)
@@ -0,0 +1,392 @@
+import os
+import re
+import sys
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+from batch_sentiment import SENTIMENT_COLUMNS, as_indexed, normalize_label
+from sentiments import emotion_based_sentiments, fine_grained_sentiments
+
+# ✅ Items scored at or above this confidence are labelled locally (override with LOCAL_SENTIMENT_THRESHOLD)
+CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_SENTIMENT_THRESHOLD", "0.8"))
+CHUNK_ROWS = 5000  # rows scored per matrix block
+
+TOKEN_RE = re.compile(r"[\w']+")  # any script, so non-Latin text is not mistaken for empty
+NEGATORS = {"not", "no", "never", "don't", "doesn't", "didn't", "isn't", "wasn't", "can't", "cannot", "won't", "nothing"}
+NEGATION_WINDOW = 3  # tokens after a negator whose valence is flipped
+GREETINGS = {"hi", "hello", "hey", "thanks", "thank", "you", "ok", "okay", "good", "morning", "evening", "bye"}
+
+# ✅ word -> (valence from -3 to 3, emotion or None)
+LEXICON = {
+    # Joy
+    "happy": (2, "Joy"), "glad": (2, "Joy"), "great": (2, "Joy"), "awesome": (3, "Joy"),
+    "excellent": (3, "Joy"), "amazing": (3, "Joy"), "love": (3, "Joy"), "loved": (3, "Joy"),
+    "wonderful": (3, "Joy"), "fantastic": (3, "Joy"), "delighted": (3, "Joy"), "enjoy": (2, "Joy"),
+    "enjoyed": (2, "Joy"), "pleased": (2, "Joy"), "congratulations": (2, "Joy"), "perfect": (3, "Joy"),
+    "nice": (1, "Joy"), "fun": (2, "Joy"), "celebrate": (2, "Joy"), "works": (1, "Joy"),
+    # Trust
+    "thanks": (1, "Trust"), "thank": (1, "Trust"), "appreciate": (2, "Trust"), "appreciated": (2, "Trust"),
+    "helpful": (2, "Trust"), "reliable": (2, "Trust"), "trust": (2, "Trust"), "confident": (2, "Trust"),
+    "support": (1, "Trust"), "welcome": (1, "Trust"), "secure": (1, "Trust"), "verified": (1, "Trust"),
+    "recommend": (2, "Trust"), "resolved": (2, "Trust"), "fixed": (1, "Trust"), "agree": (1, "Trust"),
+    # Fear
+    "worried": (-2, "Fear"), "worry": (-2, "Fear"), "afraid": (-2, "Fear"), "scared": (-2, "Fear"),
+    "anxious": (-2, "Fear"), "panic": (-3, "Fear"), "risk": (-1, "Fear"), "breach": (-3, "Fear"),
+    "unsafe": (-2, "Fear"), "danger": (-2, "Fear"), "threat": (-2, "Fear"), "suspicious": (-2, "Fear"),
+    "vulnerability": (-2, "Fear"), "urgent": (-1, "Fear"), "concern": (-1, "Fear"), "concerned": (-1, "Fear"),
+    # Surprise
+    "wow": (1, "Surprise"), "unexpected": (-1, "Surprise"), "unexpectedly": (-1, "Surprise"),
+    "surprised": (0, "Surprise"), "surprising": (0, "Surprise"), "suddenly": (-1, "Surprise"),
+    "strange": (-1, "Surprise"), "weird": (-1, "Surprise"), "shocked": (-2, "Surprise"), "shocking": (-2, "Surprise"),
+    # Sadness
+    "sad": (-2, "Sadness"), "unfortunately": (-1, "Sadness"), "disappointed": (-2, "Sadness"),
+    "disappointing": (-2, "Sadness"), "sorry": (-1, "Sadness"), "regret": (-2, "Sadness"), "unhappy": (-2, "Sadness"),
+    "lost": (-1, "Sadness"), "miss": (-1, "Sadness"), "missing": (-1, "Sadness"), "fail": (-2, "Sadness"),
+    "failed": (-2, "Sadness"), "failing": (-2, "Sadness"), "failure": (-2, "Sadness"), "sadly": (-2, "Sadness"),
+    # Disgust
+    "terrible": (-3, "Disgust"), "awful": (-3, "Disgust"), "horrible": (-3, "Disgust"), "disgusting": (-3, "Disgust"),
+    "gross": (-2, "Disgust"), "worst": (-3, "Disgust"), "ridiculous": (-2, "Disgust"), "useless": (-3, "Disgust"),
+    "garbage": (-3, "Disgust"), "spam": (-2, "Disgust"), "scam": (-3, "Disgust"), "junk": (-2, "Disgust"),
+    # Anger
+    "angry": (-3, "Anger"), "furious": (-3, "Anger"), "annoyed": (-2, "Anger"), "annoying": (-2, "Anger"),
+    "frustrated": (-2, "Anger"), "frustrating": (-2, "Anger"), "hate": (-3, "Anger"), "unacceptable": (-3, "Anger"),
+    "outraged": (-3, "Anger"), "mad": (-2, "Anger"), "broken": (-2, "Anger"), "crash": (-2, "Anger"),
+    "crashes": (-2, "Anger"), "crashing": (-2, "Anger"), "bug": (-1, "Anger"), "error": (-1, "Anger"),
+    # Anticipation
+    "soon": (1, "Anticipation"), "upcoming": (1, "Anticipation"), "forward": (1, "Anticipation"),
+    "expect": (0, "Anticipation"), "expecting": (0, "Anticipation"), "plan": (0, "Anticipation"),
+    "launch": (1, "Anticipation"), "new": (1, "Anticipation"), "offer": (1, "Anticipation"),
+    "feature": (1, "Anticipation"), "request": (0, "Anticipation"), "waiting": (-1, "Anticipation"),
+    "hope": (1, "Anticipation"), "hoping": (1, "Anticipation"), "tips": (1, "Anticipation"), "grow": (1, "Anticipation"),
+    # Valence only
+    "good": (1, None), "better": (1, None), "best": (2, None), "bad": (-2, None), "worse": (-2, None),
+    "problem": (-1, None), "issue": (-1, None), "wrong": (-2, None), "poor": (-2, None), "slow": (-1, None),
+}
+
+# ✅ Score thresholds (mean valence per matched word) for the fine-grained labels
+FINE_BINS = [(2.0, "Very Positive"), (0.5, "Positive"), (-0.5, "Neutral"), (-2.0, "Negative")]
+
+
+def fine_labels(scores):
+    return np.select([scores >= floor for floor, _ in FINE_BINS], [label for _, label in FINE_BINS],
+                     default="Very Negative")
+
+
+# ✅ Greetings/acknowledgements and really empty inputs (blank or one character) are easy without any model
+GREETING_ROW = ["Trust", "Neutral", "Local lexicon: greeting or acknowledgement.", 1.0]
+EMPTY_ROW = ["Surprise", "Neutral", "Local lexicon: no meaningful content.", 1.0]
+
+
+def apply_shortcuts(frame, texts, token_lists=None):
+    """Overwrite the rows of a positionally indexed prediction frame that a shortcut rule answers."""
+    if token_lists is None:
+        token_lists = [TOKEN_RE.findall(str(text).lower()) for text in texts]
+    empty = np.array([len(str(text).strip()) <= 1 for text in texts], dtype=bool)
+    greeting = np.array([bool(tokens) and set(tokens) <= GREETINGS for tokens in token_lists], dtype=bool)
+    columns = ['emotion_sentiment', 'fine_grained_sentiment', 'thinking', 'confidence']
+    frame.loc[greeting, columns] = GREETING_ROW
+    frame.loc[empty & ~greeting, columns] = EMPTY_ROW
+    return frame
+
+
+class LexiconClassifier:
+    """CPU-only lexicon scorer; returns SENTIMENT_COLUMNS plus a confidence."""
+
+    def __init__(self, lexicon=LEXICON):
+        self.vocab = list(lexicon)
+        self.index = {word: position for position, word in enumerate(self.vocab)}
+        self.valence = np.array([lexicon[word][0] for word in self.vocab], dtype=np.float32)
+        self.emotions = np.zeros((len(self.vocab), len(emotion_based_sentiments)), dtype=np.float32)
+        for word, (_, emotion) in lexicon.items():
+            if emotion:
+                self.emotions[self.index[word], emotion_based_sentiments.index(emotion)] = 1
+
+    # ✅ Signed word counts (negated words count -1) as a dense block
+    def _counts(self, token_lists):
+        rows, cols, signs = [], [], []
+        for row, tokens in enumerate(token_lists):
+            negated = 0
+            for token in tokens:
+                if token in NEGATORS:
+                    negated = NEGATION_WINDOW
+                    continue
+                column = self.index.get(token)
+                if column is not None:
+                    rows.append(row)
+                    cols.append(column)
+                    signs.append(-1.0 if negated else 1.0)
+                negated = max(0, negated - 1)
+        counts = np.zeros((len(token_lists), len(self.vocab)), dtype=np.float32)
+        np.add.at(counts, (rows, cols), signs)
+        return counts
+
+    def _score_block(self, token_lists, texts):
+        counts = self._counts(token_lists)
+        contrib = counts * self.valence
+        positive = contrib.clip(min=0).sum(axis=1)
+        negative = -contrib.clip(max=0).sum(axis=1)
+        hits = np.abs(counts).sum(axis=1)
+        score = (positive - negative) / np.maximum(hits, 1)
+        agreement = np.abs(positive - negative) / np.maximum(positive + negative, 1e-9)
+        coverage = np.minimum(1.0, hits / 3)
+
+        emotion_scores = counts.clip(min=0) @ self.emotions
+        emotion_total = emotion_scores.sum(axis=1)
+        emotion_share = emotion_scores.max(axis=1) / np.maximum(emotion_total, 1e-9)
+        emotion_index = emotion_scores.argmax(axis=1)
+
+        frame = pd.DataFrame({
+            'emotion_sentiment': np.array(emotion_based_sentiments)[emotion_index],
+            'fine_grained_sentiment': fine_labels(score),
+            'thinking': [f"Local lexicon: {int(count)} sentiment words, mean valence {value:.2f}."
+                         for count, value in zip(hits, score)],
+            'confidence': coverage * (0.5 * agreement + 0.5 * emotion_share)
+        })
+        # Nothing the lexicon knows (other languages, emoji-only text): always escalate
+        frame.loc[(emotion_total == 0) | (hits == 0), 'confidence'] = 0.0
+        return apply_shortcuts(frame, texts, token_lists)
+
+    def predict(self, texts):
+        values, index = as_indexed(texts)
+        token_lists = [TOKEN_RE.findall(str(text).lower()) for text in values]
+        blocks = [self._score_block(token_lists[start:start + CHUNK_ROWS], values[start:start + CHUNK_ROWS])
+                  for start in range(0, len(token_lists), CHUNK_ROWS)]
+        if not blocks:
+            return pd.DataFrame(columns=SENTIMENT_COLUMNS + ['confidence'], index=index)
+        frame = pd.concat(blocks, ignore_index=True)
+        frame.index = index
+        return frame
+
+
+# ✅ Distilled model settings (trained from accumulated LLM labels)
+MODEL_PATH = os.getenv("LOCAL_SENTIMENT_MODEL", os.path.join('data', 'local_sentiment_model.npz'))
+HASH_DIM = 2 ** 17
+MIN_AGREEMENT = float(os.getenv("LOCAL_MODEL_MIN_AGREEMENT", "0.7"))  # holdout agreement a model needs to be used
+MIN_TRAINING_ROWS = 50  # fewer rows leave too small a holdout to judge the model by
+
+
+# ✅ Hashed unigram + bigram features as (rows, cols, values), rows L2-normalised
+def hash_features(values, dim=HASH_DIM):
+    rows, cols, weights = [], [], []
+    for row, text in enumerate(values):
+        tokens = TOKEN_RE.findall(str(text).lower())
+        grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        if not grams:
+            continue
+        weight = 1.0 / np.sqrt(len(grams))
+        for gram in grams:
+            rows.append(row)
+            cols.append(zlib.crc32(gram.encode('utf-8')) % dim)
+            weights.append(weight)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(weights, dtype=np.float32)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class HashedLinearModel:
+    """Softmax regression over hashed n-grams with a fine-grained and an emotion head."""
+
+    heads = {'fine_grained_sentiment': fine_grained_sentiments, 'emotion_sentiment': emotion_based_sentiments}
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.agreement = 0.0  # worst holdout agreement with the LLM labels, set by train()
+        self.weights = {head: np.zeros((dim, len(labels)), dtype=np.float32) for head, labels in self.heads.items()}
+        self.bias = {head: np.zeros(len(labels), dtype=np.float32) for head, labels in self.heads.items()}
+
+    def _scores(self, head, features, n):
+        rows, cols, weights = features
+        matrix = self.weights[head]
+        scores = np.tile(self.bias[head], (n, 1))
+        for label in range(matrix.shape[1]):
+            scores[:, label] += np.bincount(rows, weights=matrix[cols, label] * weights, minlength=n)
+        return scores
+
+    def fit(self, texts, fine_labels, emotion_labels, epochs=15, learning_rate=0.5, l2=1e-5, batch_size=256, seed=0):
+        values = list(texts)
+        targets = {
+            'fine_grained_sentiment': np.array([fine_grained_sentiments.index(label) for label in fine_labels]),
+            'emotion_sentiment': np.array([emotion_based_sentiments.index(label) for label in emotion_labels])
+        }
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(values))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                features = hash_features([values[i] for i in batch], self.dim)
+                rows, cols, weights = features
+                for head, labels in self.heads.items():
+                    probs = _softmax(self._scores(head, features, len(batch)))
+                    probs[np.arange(len(batch)), targets[head][batch]] -= 1
+                    probs /= len(batch)
+                    gradient = weights[:, None] * probs[rows]
+                    self.weights[head] *= (1 - learning_rate * l2)
+                    np.add.at(self.weights[head], cols, -learning_rate * gradient)
+                    self.bias[head] -= learning_rate * probs.sum(axis=0)
+        return self
+
+    def predict(self, texts):
+        values, index = as_indexed(texts)
+        frame = pd.DataFrame(index=range(len(values)), columns=SENTIMENT_COLUMNS + ['confidence'])
+        confidence = np.ones(len(values))
+        for start in range(0, len(values), CHUNK_ROWS):
+            block = values[start:start + CHUNK_ROWS]
+            features = hash_features(block, self.dim)
+            for head, labels in self.heads.items():
+                probs = _softmax(self._scores(head, features, len(block)))
+                frame.loc[start:start + len(block) - 1, head] = np.array(labels)[probs.argmax(axis=1)]
+                confidence[start:start + len(block)] = np.minimum(confidence[start:start + len(block)],
+                                                                  probs.max(axis=1))
+        frame['thinking'] = "Local distilled model prediction."
+        frame['confidence'] = confidence
+        apply_shortcuts(frame, values)
+        frame.index = index
+        return frame
+
+    def save(self, path=MODEL_PATH):
+        arrays = {f"w_{head}": weights for head, weights in self.weights.items()}
+        arrays.update({f"b_{head}": bias for head, bias in self.bias.items()})
+        np.savez_compressed(path, dim=self.dim, agreement=self.agreement, **arrays)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        data = np.load(path)
+        model = cls(int(data['dim']))
+        model.agreement = float(data['agreement']) if 'agreement' in data.files else 0.0
+        for head in cls.heads:
+            model.weights[head] = data[f"w_{head}"]
+            model.bias[head] = data[f"b_{head}"]
+        return model
+
+
+# ✅ Distilled model when one has been trained and validated, the lexicon otherwise
+def load_local_classifier(path=MODEL_PATH, min_agreement=MIN_AGREEMENT):
+    if os.path.exists(path):
+        model = HashedLinearModel.load(path)
+        if model.agreement >= min_agreement:
+            return model
+        print(f"⚠️ Ignoring {path}: holdout agreement {model.agreement:.2f} is below {min_agreement}")
+    return LexiconClassifier()
+
+
+class TieredClassifier:
+    """Label confident items locally and escalate the rest to an LLM batch classifier.
+
+    llm_batch_fn takes a Series of texts and returns SENTIMENT_COLUMNS for it
+    (e.g. LLMBackend.classify). With threshold 0 nothing is escalated,
+    so the pipelines run fully offline on the local model.
+    """
+
+    def __init__(self, llm_batch_fn, threshold=None, local=None):
+        self.llm_batch_fn = llm_batch_fn
+        self.threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+        self.local = local or load_local_classifier()
+        self.total = 0
+        self.escalated = 0
+        self._lock = threading.Lock()
+
+    def classify(self, texts):
+        values, index = as_indexed(texts)
+        local = self.local.predict(values)
+        result = local[SENTIMENT_COLUMNS].copy()
+        escalate = (local['confidence'] < self.threshold).to_numpy()
+        if escalate.any():
+            pending = pd.Series(values)[escalate]
+            result.loc[escalate, SENTIMENT_COLUMNS] = self.llm_batch_fn(pending).to_numpy()
+        with self._lock:
+            self.total += len(values)
+            self.escalated += int(escalate.sum())
+        result.index = index
+        return result
+
+    def classify_one(self, text):
+        return tuple(self.classify([text]).iloc[0])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'total': self.total,
+                'local': self.total - self.escalated,
+                'escalated': self.escalated,
+                'escalation_rate': self.escalated / self.total if self.total else 0.0,
+                'threshold': self.threshold
+            }
+
+
+# ✅ LLM-labelled rows we already have: (storage table, text column(s))
+TRAINING_SOURCES = [
+    ('emails', ['new_body']),
+    ('tickets', ['Description']),
+    ('chat_logs', ['user_input', 'bot_response'])
+]
+
+
+def load_training_data(sources=TRAINING_SOURCES):
+    from storage import read_table
+    frames = []
+    for table, text_columns in sources:
+        df = read_table(table, columns=text_columns + SENTIMENT_COLUMNS)
+        # Rows labelled locally would only teach the model its own (or the lexicon's) answers
+        df = df[~df['thinking'].fillna('').astype(str).str.startswith('Local ')]
+        if df.empty:
+            continue
+        frames.append(pd.DataFrame({
+            'text': df[text_columns].fillna('').astype(str).agg(' '.join, axis=1),
+            'fine_grained_sentiment': df['fine_grained_sentiment'].map(lambda v: normalize_label(v, fine_grained_sentiments)),
+            'emotion_sentiment': df['emotion_sentiment'].map(lambda v: normalize_label(v, emotion_based_sentiments))
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['text', 'fine_grained_sentiment', 'emotion_sentiment'])
+    data = pd.concat(frames, ignore_index=True).dropna().drop_duplicates('text')
+    return data.reset_index(drop=True)
+
+
+def agreement(model, data):
+    if data.empty:
+        return {}
+    predicted = model.predict(data['text'])
+    return {head: float((predicted[head].to_numpy() == data[head].to_numpy()).mean())
+            for head in HashedLinearModel.heads}
+
+
+# ✅ Offline training command: python local_sentiment.py train [--epochs N]
+def train(path=MODEL_PATH, epochs=15, holdout=0.2, seed=0, min_agreement=MIN_AGREEMENT):
+    data = load_training_data()
+    if len(data) < MIN_TRAINING_ROWS:
+        print(f"❌ Only {len(data)} LLM-labelled rows found, need at least {MIN_TRAINING_ROWS} to train on")
+        return None
+    shuffled = data.sample(frac=1, random_state=seed).reset_index(drop=True)
+    split = int(len(shuffled) * (1 - holdout))
+    train_rows, test_rows = shuffled.iloc[:split], shuffled.iloc[split:]
+
+    model = HashedLinearModel().fit(train_rows['text'], train_rows['fine_grained_sentiment'],
+                                    train_rows['emotion_sentiment'], epochs=epochs, seed=seed)
+    print(f"✅ Trained on {len(train_rows)} rows, held out {len(test_rows)}")
+    print(f"Agreement with LLM labels (train): {agreement(model, train_rows)}")
+    holdout_agreement = agreement(model, test_rows)
+    print(f"Agreement with LLM labels (holdout): {holdout_agreement}")
+    worst = min(holdout_agreement.values())
+    if worst < min_agreement:
+        print(f"❌ Not saving: holdout agreement {worst:.2f} is below {min_agreement}")
+        return None
+
+    # Refit on everything before saving
+    model = HashedLinearModel().fit(data['text'], data['fine_grained_sentiment'],
+                                    data['emotion_sentiment'], epochs=epochs, seed=seed)
+    model.agreement = worst
+    model.save(path)
+    print(f"✅ Saved model to {path}")
+    return model
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'train':
+        epochs = int(sys.argv[sys.argv.index('--epochs') + 1]) if '--epochs' in sys.argv else 15
+        train(epochs=epochs)
+    else:
+        print("Usage: python local_sentiment.py train [--epochs N]")
@@ -1,21 +1,85 @@
 # app.py (updated)
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import pandas as pd
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 import os
+import json
 from datetime import datetime
-from email_packages.fetch_email import authenticate_gmail, get_emails, save_emails_to_csv
-from email_packages.email_agents import extract_name_email, clean_email_body, classify_sentiment
-from chat import CustomerCareChatbot
-import requests
+from functools import lru_cache
+from metrics import instrument_app
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
+# Request/template latency and GET /metrics (Prometheus text format)
+instrument_app(app)
 
 # Ensure data directory exists
 os.makedirs('data', exist_ok=True)
 
-# Initialize chatbot (but don't start it yet)
-chatbot = CustomerCareChatbot()
+# Heavy modules (pandas, Gmail, Groq, Parquet) and clients are built on first use,
+# so workers start fast and routes that don't need them never import them.
+
+@lru_cache(maxsize=None)
+def get_chatbot():
+    from chat import CustomerCareChatbot
+    return CustomerCareChatbot()
+
+@lru_cache(maxsize=None)
+def get_chat_sentiment_queue():
+    # Background sentiment classification + chat log persistence
+    from chat_jobs import ChatSentimentQueue
+    from chat_log_writer import get_chat_log_writer
+    from sentiment_service import get_service
+    return ChatSentimentQueue(get_service('chat').classify_one, get_chat_log_writer())
+
+def get_ingest_scheduler():
+    # Background Gmail/GitHub refresh jobs, started with the first request that needs them
+    import ingest_jobs
+    return ingest_jobs.get_ingest_scheduler().start()
+
+# Dashboard tables by URL name, and page size limits for their endpoints
+DASHBOARD_TABLES = {'emails': 'emails', 'tickets': 'tickets', 'chatlogs': 'chat_logs'}
+PER_PAGE = 50
+MAX_PER_PAGE = 500
+SENTIMENT_FILTERS = {'emotion': 'emotion_sentiment', 'sentiment': 'fine_grained_sentiment'}
+
+def dashboard_query(table):
+    """Read one page of a table as the query string asks; returns (rows, pagination).
+
+    ?page=&per_page=, ?emotion=Joy,Trust and ?sentiment=Negative filters,
+    ?date_from=/?date_to= (YYYY-MM-DD), ?sort=<column>&order=asc|desc
+    (default newest first) and ?columns=a,b to project.
+    """
+    from storage import TABLES, query_table, to_records
+    args = request.args
+    page = max(1, args.get('page', 1, type=int))
+    per_page = min(max(1, args.get('per_page', PER_PAGE, type=int)), MAX_PER_PAGE)
+    where = {}
+    for param, column in SENTIMENT_FILTERS.items():
+        values = [value for raw in args.getlist(param) for value in raw.split(',') if value]
+        if values:
+            where[column] = values
+    for param in ('date_from', 'date_to'):
+        if args.get(param):
+            datetime.strptime(args[param], '%Y-%m-%d')  # ValueError -> 400
+    sort = args.get('sort') or TABLES[table]['date_column']
+    descending = args.get('order', 'desc') != 'asc'
+    columns = [column for column in args.get('columns', '').split(',') if column] or None
+
+    df, total = query_table(table, columns, where, args.get('date_from'), args.get('date_to'),
+                            sort, descending, page, per_page)
+    return to_records(df), {
+        'page': page, 'per_page': per_page, 'total': total, 'pages': max(1, -(-total // per_page)),
+        'sort': sort, 'order': 'desc' if descending else 'asc'
+    }
+
+@app.route('/api/<name>')
+def dashboard_api(name):
+    if name not in DASHBOARD_TABLES:
+        return jsonify({'error': f'Unknown table {name}'}), 404
+    try:
+        rows, pagination = dashboard_query(DASHBOARD_TABLES[name])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'data': rows, 'pagination': pagination})
 
 @app.route('/')
 def dashboard():
@@ -23,104 +87,110 @@ def dashboard():
 
 @app.route('/emails')
 def email_dashboard():
+    # Ingestion runs in the background; the page only reads processed rows
+    job = get_ingest_scheduler().jobs['emails'].status()
     try:
-        # Fetch and process emails
-        service = authenticate_gmail()
-        emails = get_emails(service, max_results=10)
-        save_emails_to_csv(emails)
-        
-        df = pd.read_csv(r"data\emails_cleaned.csv")
-        if 'From' in df.columns:
-            df[['src_name', 'src_email']] = df['From'].apply(extract_name_email)
-        if 'Body' in df.columns:
-            df['new_body'] = df['Body'].apply(clean_email_body)
-        if 'new_body' in df.columns:
-            df[['emotion_sentiment', 'fine_grained_sentiment', 'thinking']] = df['new_body'].apply(classify_sentiment)
-        df.to_csv(r"data\emails_cleaned.csv", index=False)
-        
-        email_data = pd.read_csv(r"data\emails_cleaned.csv").to_dict('records')
-        return render_template('email_dashboard.html', emails=email_data)
+        email_data, pagination = dashboard_query('emails')
+        return render_template('email_dashboard.html', emails=email_data, pagination=pagination, job=job)
     except Exception as e:
-        return render_template('email_dashboard.html', error=str(e))
+        return render_template('email_dashboard.html', error=str(e), job=job)
 
 @app.route('/tickets')
 def ticket_dashboard():
+    job = get_ingest_scheduler().jobs['tickets'].status()
     try:
-        # Fetch GitHub issues
-        repo = "microsoft/vscode"
-        per_page = 10
-        url = f"https://api.github.com/repos/{repo}/issues?state=all&per_page={per_page}"
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            issues = response.json()
-            issues = [issue for issue in issues if 'pull_request' not in issue]
-
-            df = pd.DataFrame([
-                {
-                    'Issue ID': issue['id'],
-                    'Title': issue['title'],
-                    'Description': issue.get('body', ''),
-                    'Created At': issue['created_at'],
-                    'State': issue['state'],
-                    'Issue URL': issue['html_url']
-                }
-                for issue in issues
-            ])
-
-            df[['emotion_sentiment', 'fine_grained_sentiment', 'thinking']] = df['Description'].apply(classify_sentiment)
-            df.to_csv(r"data\github_issues_with_sentiment.csv", index=False)
-        
-        ticket_data = pd.read_csv(r"data\github_issues_with_sentiment.csv").to_dict('records')
-        return render_template('ticket_dashboard.html', tickets=ticket_data)
+        ticket_data, pagination = dashboard_query('tickets')
+        return render_template('ticket_dashboard.html', tickets=ticket_data, pagination=pagination, job=job)
     except Exception as e:
-        return render_template('ticket_dashboard.html', error=str(e))
+        return render_template('ticket_dashboard.html', error=str(e), job=job)
+
+@app.route('/jobs')
+def job_statuses():
+    return jsonify(get_ingest_scheduler().status())
+
+@app.route('/jobs/<name>', methods=['GET', 'POST'])
+def refresh_job(name):
+    scheduler = get_ingest_scheduler()
+    if name not in scheduler.jobs:
+        return jsonify({'error': f'Unknown job {name}'}), 404
+    if request.method == 'POST':
+        # Concurrent triggers share the run already in flight
+        started = scheduler.trigger(name)
+        return jsonify({'started': started, **scheduler.jobs[name].status()}), 202
+    return jsonify(scheduler.jobs[name].status())
+
+@app.route('/llm/stats')
+def llm_stats():
+    # Queue depth, waits and retries of the Groq rate-limit schedulers
+    from llm_scheduler import scheduler_stats
+    return jsonify(scheduler_stats())
 
 @app.route('/chatbot', methods=['GET', 'POST'])
 def chat_interface():
     if request.method == 'POST':
         user_input = request.form.get('user_input')
         if user_input:
-            bot_response = chatbot.generate_response(user_input)
-            
-            # Classify sentiment of the conversation
-            sentiment = classify_sentiment(user_input + " " + bot_response)
-            
-            # Save to chat log
-            chat_log = {
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'user_input': user_input,
-                'bot_response': bot_response,
-                'emotion_sentiment': sentiment[0],
-                'fine_grained_sentiment': sentiment[1],
-                'thinking': sentiment[2],
-                'model_used': 'Groq'  # Assuming you're using Groq based on your imports
-            }
-            
-            # Append to CSV
-            chat_df = pd.DataFrame([chat_log])
-            if not os.path.exists(r"data\chat_logs.csv"):
-                chat_df.to_csv(r"data\chat_logs.csv", index=False)
-            else:
-                chat_df.to_csv(r"data\chat_logs.csv", mode='a', header=False, index=False)
+            bot_response = get_chatbot().generate_response(user_input)
             
-            return jsonify({
-                'bot_response': bot_response,
-                'sentiment': sentiment
-            })
+            return jsonify(queue_chat_sentiment(user_input, bot_response))
     
     return render_template('chat_interface.html')
 
+def queue_chat_sentiment(user_input, bot_response):
+    # Sentiment and log persistence run in the background
+    chat_log = {
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'user_input': user_input,
+        'bot_response': bot_response,
+        'model_used': 'Groq'  # Assuming you're using Groq based on your imports
+    }
+    sentiment_id = get_chat_sentiment_queue().submit(chat_log)
+    return {
+        'bot_response': bot_response,
+        'sentiment': None,
+        'sentiment_id': sentiment_id,
+        'sentiment_url': url_for('chat_sentiment', sentiment_id=sentiment_id)
+    }
+
+@app.route('/chatbot/stream', methods=['POST'])
+def chat_stream():
+    # Server-sent events: one "data" event per token, then a "done" event (or an "error" event if it fails)
+    user_input = request.form.get('user_input')
+    if not user_input:
+        return jsonify({'error': 'user_input is required'}), 400
+
+    def events():
+        tokens = []
+        try:
+            for token in get_chatbot().generate_response_stream(user_input):
+                tokens.append(token)
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            done = queue_chat_sentiment(user_input, "".join(tokens).strip())
+        except Exception as e:
+            print(f"❌ Chat stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/chatbot/sentiment/<sentiment_id>')
+def chat_sentiment(sentiment_id):
+    result = get_chat_sentiment_queue().get(sentiment_id)
+    if result is None:
+        return jsonify({'status': 'unknown'}), 404
+    return jsonify(result)
+
 @app.route('/chatlogs')
 def chat_dashboard():
     try:
-        if os.path.exists(r"data\chat_logs.csv"):
-            chat_data = pd.read_csv(r"data\chat_logs.csv").to_dict('records')
-        else:
-            chat_data = []
-        return render_template('chat_dashboard.html', chats=chat_data)
+        chat_data, pagination = dashboard_query('chat_logs')
+        return render_template('chat_dashboard.html', chats=chat_data, pagination=pagination)
     except Exception as e:
         return render_template('chat_dashboard.html', error=str(e))
 
 if __name__ == '__main__':
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_ingest_scheduler()  # reloader child: start refreshing before the first page view
     app.run(debug=True)
\ No newline at end of file
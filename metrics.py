@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import bisect
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# ✅ Histogram buckets in seconds, and an optional JSON-lines trace of every finished span
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TRACE_LOG = os.getenv("TRACE_LOG")  # e.g. data/trace.jsonl (unset disables tracing)
+
+HELP = {
+    'stage_seconds': 'Duration of pipeline stages',
+    'stage_errors_total': 'Pipeline stages that raised',
+    'rows_total': 'Rows processed per pipeline stage',
+    'outbound_seconds': 'Duration of outbound Groq, Gmail and GitHub calls',
+    'outbound_errors_total': 'Outbound calls that raised',
+    'http_request_seconds': 'Duration of Flask requests',
+    'llm_tokens_total': 'Tokens reported by the Groq API',
+    'cache_hits_total': 'Cache lookups answered without recomputing',
+    'cache_misses_total': 'Cache lookups that had to recompute',
+}
+
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms with Prometheus text output.
+
+    Collectors are callables returning [(name, type, labels, value)] that are
+    evaluated at scrape time, for state other modules already track (queue
+    depth, cache sizes).
+    """
+
+    def __init__(self, buckets=BUCKETS, trace_path=TRACE_LOG):
+        self.buckets = tuple(buckets)
+        self.trace_path = trace_path
+        self._counters = {}    # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.setdefault(_key(labels), [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def add_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+
+    # ✅ One trace record per finished span; parent links nested spans on the same thread
+    def trace(self, record):
+        if not self.trace_path:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._trace_file is None:
+                if os.path.dirname(self.trace_path):
+                    os.makedirs(os.path.dirname(self.trace_path), exist_ok=True)
+                self._trace_file = open(self.trace_path, 'a', encoding='utf-8', buffering=1)
+            self._trace_file.write(line + '\n')
+
+    @contextmanager
+    def span(self, metric, errors=None, **labels):
+        """Time the block into the histogram metric.
+
+        Yields a dict of extra trace fields; a 'rows' entry also adds to
+        rows_total under the same labels.
+        """
+        stack = self._local.__dict__.setdefault('stack', [])
+        fields = {}
+        parent = stack[-1] if stack else None
+        stack.append(labels.get('stage') or labels.get('operation') or metric)
+        start, started_at, status = time.perf_counter(), time.time(), 'ok'
+        try:
+            yield fields
+        except BaseException as e:
+            status = type(e).__name__
+            if errors:
+                self.inc(errors, **labels)
+            raise
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - start
+            self.observe(metric, elapsed, **labels)
+            if fields.get('rows') is not None:
+                self.inc('rows_total', fields['rows'], **labels)
+            self.trace({'ts': started_at, 'metric': metric, **labels, 'parent': parent,
+                        'seconds': round(elapsed, 6), 'status': status,
+                        'thread': threading.current_thread().name, **fields})
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(state) for key, state in series.items()}
+                          for name, series in self._histograms.items()}
+            collectors = list(self._collectors)
+
+        gauges = {}
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            for name, kind, labels, value in samples:
+                target = counters if kind == 'counter' else gauges
+                target.setdefault(name, {})[_key(labels)] = value
+
+        lines = []
+        for kind, metrics in (('counter', counters), ('gauge', gauges)):
+            for name in sorted(metrics):
+                if name in HELP:
+                    lines.append(f'# HELP {name} {HELP[name]}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in sorted(metrics[name].items()):
+                    lines.append(f'{name}{_format_labels(key)} {value}')
+        for name in sorted(histograms):
+            if name in HELP:
+                lines.append(f'# HELP {name} {HELP[name]}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, state in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(key, [("le", str(bound))])} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {state[-1]}')
+                lines.append(f'{name}_sum{_format_labels(key)} {round(state[-2], 6)}')
+                lines.append(f'{name}_count{_format_labels(key)} {state[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+# ✅ Process-wide registry shared by every module and Flask app
+registry = MetricsRegistry()
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def add_collector(fn):
+    registry.add_collector(fn)
+
+
+def stage(name, **labels):
+    """Time a pipeline stage: `with stage('classify') as span:`; set span['rows'] to count rows."""
+    return registry.span('stage_seconds', errors='stage_errors_total', stage=name, **labels)
+
+
+def timed(name, rows=None, **labels):
+    """Decorator form of stage(); rows(result) gives the number of rows produced."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name, **labels) as span:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    span['rows'] = rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def outbound(service, operation):
+    """Time one outbound API call: `with outbound('gmail', 'messages.list'):`."""
+    return registry.span('outbound_seconds', errors='outbound_errors_total', service=service, operation=operation)
+
+
+def render():
+    return registry.render()
+
+
+# ✅ Request latency, template render time and GET /metrics for a Flask app
+def instrument_app(app, path='/metrics'):
+    from flask import Response, g, request, template_rendered, before_render_template
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            registry.observe('http_request_seconds', time.perf_counter() - start, method=request.method,
+                             endpoint=request.endpoint or 'unknown', status=response.status_code)
+        return response
+
+    def _template_started(sender, template, context, **extra):
+        g._template_start = time.perf_counter()
+
+    def _template_finished(sender, template, context, **extra):
+        start = g.pop('_template_start', None)
+        if start is not None:
+            registry.observe('stage_seconds', time.perf_counter() - start, stage='render_template')
+
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    # Signal receivers are held weakly; keep them alive with the app
+    app.extensions['metrics'] = (_template_started, _template_finished)
+
+    @app.route(path)
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    return app
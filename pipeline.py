@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import stage
+
+# ✅ Every source yields records with these fields; 'row' keeps the source's own table columns
+RECORD_FIELDS = ['source', 'id', 'timestamp', 'author', 'title', 'text', 'row']
+BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "100"))
+CHAT_LOG_FILE = os.getenv("CHAT_LOG_FILE", os.path.join('data', 'chat_logs.csv'))
+CHAT_IMPORT_STATE_FILE = os.path.join('data', 'chat_import_state.json')  # CSV rows imported so far, per file
+
+
+def make_record(source, id, timestamp, author, title, text, row):
+    return {'source': source, 'id': id, 'timestamp': timestamp, 'author': author,
+            'title': title, 'text': text, 'row': row}
+
+
+class GmailSource:
+    """New mail since the last sync, streamed; sync state is saved after every stored batch."""
+
+    name, table, service, clean, replace = 'emails', 'emails', 'email', True, False
+
+    def __init__(self, service=None):
+        self.gmail = service
+        self._sync_state = None
+
+    def fetch(self, limit=None):
+        from email_packages.fetch_email import authenticate_gmail, iter_sync_emails, load_sync_state
+        from email_packages.email_agents import extract_name_email
+        from ingest_jobs import EMAIL_BATCH
+        self.gmail = self.gmail or authenticate_gmail()
+        self._sync_state = load_sync_state()
+        for email in iter_sync_emails(self.gmail, self._sync_state, max_results=limit or EMAIL_BATCH):
+            name, address = extract_name_email(email['From'])
+            email = {**email, 'src_name': name, 'src_email': address}
+            yield make_record('emails', None, email['Date'], address, email['Subject'], email['Body'], email)
+
+    def commit(self):
+        from email_packages.fetch_email import save_sync_state
+        if self._sync_state is not None:
+            save_sync_state(self._sync_state)
+
+    def stats(self, since=None):
+        from email_packages.email_agents import email_cleaner
+        return {'cleaning': email_cleaner.stats(since and since['cleaning'])}
+
+
+class GitHubSource:
+    """The latest issues of the configured repository; they replace the tickets table."""
+
+    name, table, service, clean, replace = 'tickets', 'tickets', 'ticket', False, True
+
+    def __init__(self, fetcher=None):
+        self.fetcher = fetcher
+
+    def fetch(self, limit=None):
+        from ingest_jobs import get_github_fetcher, TICKET_BATCH
+        from ticket.github_issues import issue_to_row
+        for issue in (self.fetcher or get_github_fetcher()).iter_issues(max_issues=limit or TICKET_BATCH):
+            row = issue_to_row(issue)
+            yield make_record('tickets', row['Issue ID'], row['Created At'], None, row['Title'],
+                              row['Description'] or '', row)
+
+    def commit(self):
+        pass
+
+    def stats(self, since=None):
+        return {}
+
+
+class ChatLogSource:
+    """Chat transcripts appended to a CSV export since the last import.
+
+    The watermark is the number of CSV rows already imported; it is saved
+    per file after every stored batch, so reruns never re-read old rows.
+    """
+
+    name, table, service, clean, replace = 'chat', 'chat_logs', 'chat', False, False
+
+    def __init__(self, path=CHAT_LOG_FILE, state_file=CHAT_IMPORT_STATE_FILE):
+        self.path = path
+        self.state_file = state_file
+        self._state = None
+
+    def _initial_watermark(self):
+        import pandas as pd
+        from storage import TABLES, table_parts
+        # The table's legacy CSV is loaded by migrate_csvs; only rows appended later are new
+        if os.path.abspath(self.path) == os.path.abspath(TABLES[self.table]['csv']) and table_parts(self.table):
+            return len(pd.read_csv(self.path, usecols=[0]))
+        return 0
+
+    def fetch(self, limit=None):
+        """New transcripts, or the first limit of them."""
+        import pandas as pd
+        from chat_jobs import chat_text
+        if not os.path.exists(self.path):
+            return
+        key = os.path.abspath(self.path)
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+        else:
+            self._state = {}
+        position = self._state.setdefault(key, self._initial_watermark())
+        columns = ['timestamp', 'user_input', 'bot_response', 'model_used']
+        count = 0
+        for chunk in pd.read_csv(self.path, chunksize=BATCH_SIZE, skiprows=range(1, position + 1)):
+            for row in chunk.reindex(columns=columns).to_dict('records'):
+                row = {column: None if pd.isna(value) else str(value) for column, value in row.items()}
+                position += 1
+                if not row['user_input']:
+                    continue
+                self._state[key] = position
+                yield make_record('chat', None, row['timestamp'], None, None,
+                                  chat_text(row['user_input'], row['bot_response']), row)
+                count += 1
+                if limit and count >= limit:
+                    return
+        self._state[key] = position
+
+    def commit(self):
+        if self._state is None:
+            return
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def stats(self, since=None):
+        return {}
+
+
+SOURCES = {'emails': GmailSource, 'tickets': GitHubSource, 'chat': ChatLogSource}
+
+
+# ✅ Shared downstream stages: clean (email bodies), classify, persist
+def process_batch(source, records, staged=None):
+    """Clean, classify and store one batch of a source's records; returns rows written.
+
+    Replacing sources pass the StagedTable their run writes into.
+    """
+    import pandas as pd
+    from batch_sentiment import SENTIMENT_COLUMNS
+    from input_budget import TOKEN_COLUMNS
+    from sentiment_service import get_service
+    from storage import append_table
+
+    df = pd.DataFrame([record['row'] for record in records])
+    texts = pd.Series([record['text'] for record in records], index=df.index)
+    if source.clean:
+        from email_packages.email_agents import clean_email_bodies
+        texts = df['new_body'] = clean_email_bodies(texts)
+    df[SENTIMENT_COLUMNS + TOKEN_COLUMNS] = get_service(source.service).classify(texts, with_tokens=True)
+    return staged.append(df) if staged is not None else append_table(source.table, df)
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _run_batches(source, batches, staged, report):
+    while True:
+        fetch_start = time.perf_counter()
+        batch = next(batches, None)
+        report['fetch_seconds'] += time.perf_counter() - fetch_start
+        if not batch:
+            return
+        process_start = time.perf_counter()
+        report['records'] += len(batch)
+        report['rows'] += process_batch(source, batch, staged)
+        if staged is None:
+            source.commit()  # checkpoint: everything yielded so far is stored
+        report['process_seconds'] += time.perf_counter() - process_start
+
+
+def run_source(source, limit=None, batch_size=BATCH_SIZE, lock=True):
+    """Stream one source through the shared stages; returns its throughput report.
+
+    Takes the source's refresh lock, so the CLI, the apps and the background
+    RefreshJob never append the same records twice; RefreshJob already holds
+    it and passes lock=False.
+    """
+    if lock:
+        from ingest_jobs import process_lock
+        with process_lock(f"refresh-{source.name}") as acquired:
+            if not acquired:
+                raise RuntimeError(f"{source.name} is already being refreshed by another process")
+            return run_source(source, limit, batch_size, lock=False)
+
+    from sentiment_service import get_service
+    dedup = get_service(source.service).dedup
+    # Cleaner and dedup counters are process-wide; the report shows this run's share
+    before = {'source': source.stats(), 'dedup': dedup.stats()}
+    report = {'source': source.name, 'records': 0, 'rows': 0, 'fetch_seconds': 0.0, 'process_seconds': 0.0}
+    start = time.perf_counter()
+    # A replacing source only swaps its table in once every batch is stored
+    staged = None
+    if source.replace:
+        from storage import StagedTable
+        staged = StagedTable(source.table)
+    with stage('pipeline_source', source=source.name) as span:
+        try:
+            _run_batches(source, _batches(source.fetch(limit), batch_size), staged, report)
+        except BaseException:
+            if staged is not None:
+                staged.discard()
+            raise
+        if staged is not None:
+            # An empty fetch leaves the current table alone
+            staged.publish() if staged.rows else staged.discard()
+        source.commit()
+        span['rows'] = report['rows']
+    report['seconds'] = time.perf_counter() - start
+    report['rows_per_sec'] = round(report['rows'] / report['seconds'], 2) if report['seconds'] else 0.0
+    for key in ('seconds', 'fetch_seconds', 'process_seconds'):
+        report[key] = round(report[key], 3)
+    report.update(source.stats(since=before['source']))
+    report['dedup'] = dedup.stats(since=before['dedup'])
+    return report
+
+
+def run_pipeline(sources, limit=None, batch_size=BATCH_SIZE):
+    """Run every source in its own thread; a failing source does not stop the others."""
+    reports = {}
+    lock = threading.Lock()
+
+    def run(source):
+        try:
+            report = run_source(source, limit, batch_size)
+        except Exception as e:
+            report = {'source': source.name, 'error': f"{type(e).__name__}: {e}"}
+            print(f"❌ {source.name} failed: {report['error']}")
+        with lock:
+            reports[source.name] = report
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix='pipeline') as pool:
+        list(pool.map(run, sources))
+    return [reports[source.name] for source in sources]
+
+
+def print_reports(reports):
+    print(f"{'source':>8} {'records':>8} {'rows':>8} {'fetch s':>8} {'process s':>10} {'total s':>8} {'rows/s':>9}")
+    for report in reports:
+        if 'error' in report:
+            print(f"{report['source']:>8}  ❌ {report['error']}")
+            continue
+        print(f"{report['source']:>8} {report['records']:>8} {report['rows']:>8} {report['fetch_seconds']:>8.2f} "
+              f"{report['process_seconds']:>10.2f} {report['seconds']:>8.2f} {report['rows_per_sec']:>9}")
+
+
+def _option(args, name, default, cast=str):
+    if name in args:
+        return cast(args[args.index(name) + 1])
+    return default
+
+
+USAGE = """Usage:
+  python pipeline.py [--sources emails,tickets,chat] [--limit N] [--batch-size 100]
+                     [--chat-file data/chat_logs.csv] [--json]"""
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    names = _option(args, '--sources', ','.join(SOURCES)).split(',')
+    if '--help' in args or any(name not in SOURCES for name in names):
+        print(USAGE)
+        sys.exit(0 if '--help' in args else 2)
+    sources = [ChatLogSource(_option(args, '--chat-file', CHAT_LOG_FILE)) if name == 'chat' else SOURCES[name]()
+               for name in names]
+    reports = run_pipeline(sources, _option(args, '--limit', None, int), _option(args, '--batch-size', BATCH_SIZE, int))
+    if '--json' in args:
+        print(json.dumps(reports, indent=2, default=str))
+    else:
+        print_reports(reports)
+    sys.exit(1 if any('error' in report for report in reports) else 0)
@@ -0,0 +1,296 @@
+import os
+import re
+import threading
+import pandas as pd
+from sentiments import emotion_based_sentiments, fine_grained_sentiments
+from batch_sentiment import (SENTIMENT_COLUMNS, as_indexed, classify_packed, estimate_tokens, normalize_label,
+                             packed_input_budget, valid_sentiment)
+from llm_cache import get_cache, make_key
+from llm_scheduler import get_scheduler, estimate_message_tokens
+from input_budget import INPUT_TOKEN_BUDGET, MAP_REDUCE, TOKEN_COLUMNS, aggregate_labels, prepare_text
+from local_sentiment import TieredClassifier, load_local_classifier
+from metrics import stage, inc
+from dedup import Deduplicator
+import llm_client
+
+# ✅ Bump when a prompt changes so cached results are not reused
+PROMPT_VERSION = "1"
+
+# ✅ Which backend get_service builds: tiered (local first, then LLM), llm, or local
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "tiered")
+
+# ✅ Per-source prompt templates
+PROMPTS = {
+    'email': {
+        'api_key_env': "GROQ_API_KEY",
+        'system': "You accurately classify sentiments with clear reasoning.",
+        'default_thinking': "No reasoning provided.",
+        'single': f"""
+You are a sentiment analysis expert.
+Given the following email body, classify its sentiment into:
+- One of these fine-grained sentiments: {fine_grained_sentiments}
+- One of these emotion-based sentiments: {emotion_based_sentiments}
+- Provide a brief reasoning (thinking).
+
+Respond ONLY in this format:
+Fine-Grained Sentiment: <fine-grained sentiment>
+Emotion Sentiment: <emotion-based sentiment>
+Thinking: <brief reasoning>
+
+Email Body:
+{{text}}
+""",
+        'packed': f"""
+You are a sentiment analysis expert.
+For each numbered email body below, classify its sentiment into:
+- One of these fine-grained sentiments: {fine_grained_sentiments}
+- One of these emotion-based sentiments: {emotion_based_sentiments}
+- Provide a brief reasoning (thinking).
+"""
+    },
+    'ticket': {
+        'api_key_env': "GROQ_API_KEY",
+        'system': "You classify GitHub issue sentiments accurately.",
+        'default_thinking': "No reasoning provided.",
+        'single': f"""
+You are a helpful assistant classifying GitHub issue descriptions.
+
+Classify into:
+- Fine-Grained Sentiment: choose from {fine_grained_sentiments}
+- Emotion-Based Sentiment: choose from {emotion_based_sentiments}
+- Thinking: short explanation why you assigned these sentiments
+
+Respond STRICTLY in this format:
+Fine-Grained Sentiment: <fine sentiment>
+Emotion Sentiment: <emotion sentiment>
+Thinking: <brief reasoning>
+
+Description:
+{{text}}
+""",
+        'packed': f"""
+You are a helpful assistant classifying GitHub issue descriptions.
+
+Classify each numbered description below into:
+- Fine-Grained Sentiment: choose from {fine_grained_sentiments}
+- Emotion-Based Sentiment: choose from {emotion_based_sentiments}
+- Thinking: short explanation why you assigned these sentiments
+"""
+    },
+    'chat': {
+        'api_key_env': "GROQ_API_KEY_2",
+        'system': "You accurately classify sentiments.",
+        'default_thinking': "",
+        'single': f"""
+Classify this message's sentiment:
+Fine-grained options: {fine_grained_sentiments}
+Emotion options: {emotion_based_sentiments}
+Respond in format:
+Fine-Grained Sentiment: <value>
+Emotion Sentiment: <value>
+Thinking: <reasoning>
+
+Only give one word value.
+
+Message: {{text}}
+""",
+        'packed': f"""
+Classify each numbered message's sentiment:
+Fine-grained options: {fine_grained_sentiments}
+Emotion options: {emotion_based_sentiments}
+Only give one word values.
+"""
+    }
+}
+
+
+# ✅ Extract [emotion, fine-grained, thinking] from a single-item answer
+def parse_sentiment(response, default_thinking="No reasoning provided."):
+    fine_match = re.search(r"Fine-Grained Sentiment:\s*(.+)", response)
+    emotion_match = re.search(r"Emotion Sentiment:\s*(.+)", response)
+    thinking_match = re.search(r"Thinking:\s*(.+)", response)
+    return [
+        emotion_match and normalize_label(emotion_match.group(1), emotion_based_sentiments) or "Unknown",
+        fine_match and normalize_label(fine_match.group(1), fine_grained_sentiments) or "Unknown",
+        thinking_match.group(1).strip() if thinking_match else default_thinking
+    ]
+
+
+class LLMBackend:
+    """Groq classifier for one source: packed batches, single-text fallback."""
+
+    def __init__(self, source, model=llm_client.DEFAULT_MODEL, temperature=0.3, max_tokens=1024, max_workers=None):
+        self.source = source
+        self.prompts = PROMPTS[source]
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_workers = max_workers
+
+    def _complete(self, prompt, max_tokens):
+        return llm_client.complete(
+            [{"role": "system", "content": self.prompts['system']}, {"role": "user", "content": prompt}],
+            temperature=self.temperature, max_tokens=max_tokens,
+            model=self.model, api_key_env=self.prompts['api_key_env']
+        )
+
+    def classify_one(self, text):
+        response = self._complete(self.prompts['single'].format(text=text), self.max_tokens)
+        return parse_sentiment(response, self.prompts['default_thinking'])
+
+    def classify(self, texts):
+        # Packs are sized against this key's TPM, or a 6000 TPM key would never fit one
+        overhead = estimate_message_tokens([{'content': self.prompts['system']}, {'content': self.prompts['packed']}])
+        budget = packed_input_budget(get_scheduler(self.prompts['api_key_env']).tpm, self.max_tokens, overhead)
+        return classify_packed(texts, self._complete, self.prompts['packed'], self.classify_one,
+                               max_tokens=self.max_tokens, max_workers=self.max_workers, input_budget=budget)
+
+
+class CachedBackend:
+    """Answer from the LLM cache and send only misses to the wrapped backend."""
+
+    def __init__(self, backend, prompt_version=PROMPT_VERSION):
+        self.backend = backend
+        self.kind = f"classify_{backend.source}"
+        self.prompt_version = prompt_version
+
+    def _key(self, text):
+        return make_key(self.kind, text, self.backend.model, self.prompt_version, self.backend.temperature)
+
+    def classify_one(self, text):
+        return list(self.classify([text]).iloc[0])
+
+    def classify(self, texts):
+        values, index = as_indexed(texts)
+        cache = get_cache()
+        keys = [self._key(text) for text in values]
+        rows = [cache.get(key) for key in keys]
+        misses = [position for position, row in enumerate(rows) if row is None]
+        if misses:
+            answers = self.backend.classify([values[position] for position in misses])
+            for position, answer in zip(misses, answers[SENTIMENT_COLUMNS].values.tolist()):
+                rows[position] = answer
+                # Failed parses ("Unknown") are retried next time instead of being cached for days
+                if valid_sentiment(answer):
+                    cache.put(keys[position], answer, self.kind)
+        return pd.DataFrame(rows, columns=SENTIMENT_COLUMNS, index=index)
+
+
+class LocalBackend:
+    """Offline backend: distilled model if trained, lexicon otherwise."""
+
+    def __init__(self, local=None):
+        self.local = local or load_local_classifier()
+
+    def classify_one(self, text):
+        return list(self.classify([text]).iloc[0])
+
+    def classify(self, texts):
+        return self.local.predict(texts)[SENTIMENT_COLUMNS]
+
+
+class TieredBackend:
+    """Local tier for confident items, the wrapped backend for the rest."""
+
+    def __init__(self, backend, threshold=None):
+        self.backend = backend
+        self.tiers = TieredClassifier(backend.classify, threshold=threshold)
+
+    def classify_one(self, text):
+        return list(self.tiers.classify_one(text))
+
+    def classify(self, texts):
+        return self.tiers.classify(texts)
+
+
+class SentimentService:
+    """Single entry point for sentiment classification of any source.
+
+    Inputs are cut to a token budget first (issue bodies also lose code,
+    logs and quoted history); with map_reduce, long inputs are classified
+    chunk by chunk and the chunk labels aggregated. Exact and near-duplicate
+    texts are clustered and only one representative per cluster is sent.
+    """
+
+    def __init__(self, source, backend, budget=INPUT_TOKEN_BUDGET, map_reduce=MAP_REDUCE, dedup=None):
+        self.source = source
+        self.backend = backend
+        self.budget = budget
+        self.map_reduce = map_reduce
+        self.dedup = dedup or Deduplicator()
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def classify(self, texts, with_tokens=False):
+        """Classify a Series/iterable; returns SENTIMENT_COLUMNS aligned to the input.
+
+        with_tokens adds TOKEN_COLUMNS: estimated tokens of each raw input
+        and of the text actually sent for it.
+        """
+        values, index = as_indexed(texts)
+        pieces = [prepare_text(text, self.budget, self.source == 'ticket', self.map_reduce) for text in values]
+        before = [estimate_tokens(text) for text in values]
+        after = [sum(estimate_tokens(piece) for piece in item) for item in pieces]
+        with self._lock:
+            self.tokens_before += sum(before)
+            self.tokens_after += sum(after)
+
+        flat = [piece for item in pieces for piece in item]
+        with stage('dedup', source=self.source) as span:
+            unique, slots = self.dedup.representatives(flat)
+            span['rows'] = len(flat)
+        inc('dedup_duplicates_total', len(flat) - len(unique), source=self.source)
+        labels = []
+        with stage('classify_sentiment', source=self.source) as span:
+            if unique:
+                answers = self.backend.classify([flat[position] for position in unique])[SENTIMENT_COLUMNS]
+                answers = answers.values.tolist()
+                labels = [answers[slot] for slot in slots]
+            span['rows'] = len(unique)
+        rows, start = [], 0
+        for item in pieces:
+            rows.append(aggregate_labels(labels[start:start + len(item)]))
+            start += len(item)
+
+        result = pd.DataFrame(rows, columns=SENTIMENT_COLUMNS, index=index)
+        if with_tokens:
+            result[TOKEN_COLUMNS[0]] = before
+            result[TOKEN_COLUMNS[1]] = after
+        return result
+
+    def classify_one(self, text):
+        return tuple(self.classify([text]).iloc[0])
+
+    def stats(self):
+        stats = {'source': self.source, 'backend': type(self.backend).__name__, 'cache': get_cache().stats(),
+                 'scheduler': get_scheduler(PROMPTS[self.source]['api_key_env']).stats(),
+                 'tokens': {'before': self.tokens_before, 'after': self.tokens_after},
+                 'dedup': self.dedup.stats()}
+        if isinstance(self.backend, TieredBackend):
+            stats['tiers'] = self.backend.tiers.stats()
+        return stats
+
+
+def build_backend(source, kind=SENTIMENT_BACKEND):
+    if kind == 'local':
+        return LocalBackend()
+    llm = CachedBackend(LLMBackend(source))
+    if kind == 'llm':
+        return llm
+    return TieredBackend(llm)
+
+
+# ✅ Shared service per source
+_services = {}
+_services_lock = threading.Lock()
+
+def get_service(source):
+    with _services_lock:
+        if source not in _services:
+            _services[source] = SentimentService(source, build_backend(source))
+        return _services[source]
+
+
+def classify_texts(texts, source):
+    return get_service(source).classify(texts)
@@ -0,0 +1,369 @@
+import os
+import sys
+import glob
+import time
+import uuid
+import shutil
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from metrics import stage
+
+# ✅ Columnar store: data/store/<table>/day=YYYY-MM-DD/part-*.parquet
+DATA_DIR = 'data'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+PARTITION_COLUMN = 'day'
+UNKNOWN_DAY = 'unknown'  # partition of rows without a parseable date
+COMPRESSION = 'zstd'
+COMPACT_MIN_PARTS = int(os.getenv("STORE_COMPACT_MIN_PARTS", "8"))  # a day with this many part files gets merged
+
+# ✅ Typed schema per table, the column used for date partitioning and the legacy CSV
+TABLES = {
+    'emails': {
+        'csv': os.path.join(DATA_DIR, 'emails_cleaned.csv'),
+        'date_column': 'Date',
+        'columns': {
+            'From': 'string', 'Subject': 'string', 'Date': 'string', 'Body': 'string',
+            'clean_body': 'string', 'src_name': 'string', 'src_email': 'string', 'new_body': 'string',
+            'emotion_sentiment': 'string', 'fine_grained_sentiment': 'string', 'thinking': 'string',
+            'input_tokens': 'Int64', 'prompt_tokens': 'Int64'
+        }
+    },
+    'tickets': {
+        'csv': os.path.join(DATA_DIR, 'github_issues_with_sentiment.csv'),
+        'date_column': 'Created At',
+        'columns': {
+            'Issue ID': 'Int64', 'Title': 'string', 'Description': 'string', 'Created At': 'string',
+            'State': 'string', 'Issue URL': 'string',
+            'emotion_sentiment': 'string', 'fine_grained_sentiment': 'string', 'thinking': 'string',
+            'input_tokens': 'Int64', 'prompt_tokens': 'Int64'
+        }
+    },
+    'chat_logs': {
+        'csv': os.path.join(DATA_DIR, 'chat_logs.csv'),
+        'date_column': 'timestamp',
+        'columns': {
+            'timestamp': 'string', 'user_input': 'string', 'bot_response': 'string',
+            'emotion_sentiment': 'string', 'fine_grained_sentiment': 'string', 'thinking': 'string',
+            'model_used': 'string'
+        }
+    }
+}
+
+
+def table_path(name):
+    return os.path.join(STORE_DIR, name)
+
+
+# ✅ Reorder/cast a frame to the table schema (unknown columns are dropped)
+def conform(name, df):
+    columns = TABLES[name]['columns']
+    df = df.reindex(columns=list(columns))
+    for column, dtype in columns.items():
+        if dtype == 'string':
+            df[column] = df[column].astype('string')
+        else:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    return df
+
+
+# ✅ Arrow schema of the whole table, so part files written before a column was added still read (as nulls)
+def arrow_schema(name):
+    import pyarrow as pa
+    types = {'string': pa.large_string(), 'Int64': pa.int64()}
+    fields = [pa.field(column, types[dtype]) for column, dtype in TABLES[name]['columns'].items()]
+    return pa.schema(fields + [pa.field(PARTITION_COLUMN, pa.string())])
+
+
+def _partition_keys(name, df):
+    dates = pd.to_datetime(df[TABLES[name]['date_column']], errors='coerce', utc=True, format='mixed')
+    return dates.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_DAY)
+
+
+# ✅ One new part file in a day directory (tmp file + rename, so readers never see partial files)
+def _write_part(part_dir, table, stamp=None):
+    """stamp is the write time in the file name (parts are read in name order); defaults to now."""
+    import pyarrow.parquet as pq
+    os.makedirs(part_dir, exist_ok=True)
+    filename = f"part-{stamp or time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp_path = os.path.join(part_dir, '.' + filename)
+    pq.write_table(table, tmp_path, compression=COMPRESSION)
+    os.replace(tmp_path, os.path.join(part_dir, filename))
+    return os.path.join(part_dir, filename)
+
+
+# ✅ Write each day's rows as a new part file
+def _write_parts(name, df, root):
+    import pyarrow as pa
+    df = conform(name, df)
+    written = 0
+    for day, part in df.groupby(_partition_keys(name, df), sort=False):
+        _write_part(os.path.join(root, f"{PARTITION_COLUMN}={day}"), pa.Table.from_pandas(part, preserve_index=False))
+        written += len(part)
+    return written
+
+
+def append_table(name, df):
+    """Append rows to a table without rewriting existing data."""
+    if df is None or df.empty:
+        return 0
+    with stage('storage_write', table=name) as span:
+        span['rows'] = _write_parts(name, df, table_path(name))
+    return span['rows']
+
+
+class StagedTable:
+    """Replacement of a table built batch by batch in a staging directory.
+
+    Readers keep seeing the old table until publish() swaps the staging
+    directory in; discard() (or an exception inside a with block) drops it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.path = f"{table_path(name)}.staging-{uuid.uuid4().hex[:8]}"
+        self.rows = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def append(self, df):
+        if df is None or df.empty:
+            return 0
+        with stage('storage_write', table=self.name) as span:
+            span['rows'] = _write_parts(self.name, df, self.path)
+        self.rows += span['rows']
+        return span['rows']
+
+    def publish(self):
+        path = table_path(self.name)
+        if os.path.exists(path):
+            retired = f"{path}.old-{uuid.uuid4().hex[:8]}"
+            os.replace(path, retired)
+            os.replace(self.path, path)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.replace(self.path, path)
+        return self.rows
+
+    def discard(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+
+
+def write_table(name, df):
+    """Replace the whole table with df."""
+    with StagedTable(name) as staged:
+        staged.append(df)
+    return len(df)
+
+
+# ✅ Merge the small part files appends leave behind, one file per day (readers pay per file)
+def compact_table(name, min_parts=COMPACT_MIN_PARTS):
+    """Rewrite every day holding at least min_parts part files as one part; returns part files removed.
+
+    Parts appended meanwhile are left alone. The merged file takes the name
+    stamp of the oldest part it replaces, so it still sorts before them; it
+    is renamed in before its sources are deleted, then touched so
+    table_version moves past the deletes. Callers in several processes must
+    serialize compaction.
+    """
+    import pyarrow.dataset as ds
+    days = {}
+    for part in table_parts(name):
+        days.setdefault(part_day(part), []).append(part)
+    schema = arrow_schema(name)
+    file_schema = schema.remove(schema.get_field_index(PARTITION_COLUMN))
+    removed = 0
+    with stage('storage_compact', table=name) as span:
+        for day, parts in days.items():
+            if len(parts) < min_parts:
+                continue
+            parts.sort()  # part names start with their write time, so rows keep their order
+            merged = ds.dataset(parts, format='parquet', schema=file_schema).to_table()
+            stamp = os.path.basename(parts[0]).split('-')[1]
+            merged_path = _write_part(os.path.dirname(parts[0]), merged, stamp)
+            for part in parts:
+                try:
+                    os.remove(part)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            os.utime(merged_path)
+        span['rows'] = removed
+    return removed
+
+
+def _typed(name, df):
+    dtypes = TABLES[name]['columns']
+    return df.astype({column: dtypes[column] for column in df.columns if column in dtypes})
+
+
+def read_table(name, columns=None, filters=None):
+    """Read a table, loading only the requested columns.
+
+    filters use pyarrow's format, e.g. [('day', '>=', '2025-07-01')] to
+    prune whole date partitions.
+    """
+    path = table_path(name)
+    wanted = list(columns) if columns else list(TABLES[name]['columns'])
+    if not table_parts(name):
+        return conform(name, pd.DataFrame()).reindex(columns=wanted)
+    with stage('storage_read', table=name) as span:
+        df = pd.read_parquet(path, engine='pyarrow', columns=wanted, filters=filters, schema=arrow_schema(name))
+        span['rows'] = len(df)
+    return _typed(name, df).reset_index(drop=True)
+
+
+def _dataset(name):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+    return ds.dataset(table_path(name), format='parquet', partitioning=partitioning, schema=arrow_schema(name))
+
+
+# ✅ Sorted row index of one table version: cached, so paging through a view only reads page rows
+@lru_cache(maxsize=32)
+def _row_index(name, version, where, date_from, date_to, sort, descending):
+    """Return (fragments, fragment number per row, row number per row) in sort order.
+
+    where is a tuple of (column, allowed values); day bounds prune whole
+    partitions, the remaining filters and the sort key are evaluated on just
+    those columns.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = _dataset(name)
+    bounds = None
+    if date_from:
+        bounds = ds.field(PARTITION_COLUMN) >= str(date_from)
+    if date_to:
+        upper = ds.field(PARTITION_COLUMN) <= str(date_to)
+        bounds = upper if bounds is None else bounds & upper
+    if bounds is not None:
+        # 'unknown' sorts after every date string; undated rows never match a date range
+        bounds = bounds & (ds.field(PARTITION_COLUMN) != UNKNOWN_DAY)
+
+    key_columns = list(dict.fromkeys([column for column, _ in where] + ([sort] if sort else [])))
+    fragments = list(dataset.get_fragments(filter=bounds))
+    numbers = {fragment.path: number for number, fragment in enumerate(fragments)}
+    rows = dataset.to_table(columns=key_columns + ['__filename'], filter=bounds).to_pandas()
+    # Scans keep each file's row order, so a running count per file is the row's position in it
+    rows['fragment'] = rows.pop('__filename').map(numbers)
+    rows['row'] = rows.groupby('fragment', sort=False).cumcount()
+    for column, values in where:
+        rows = rows[rows[column].isin(values)]
+    if sort and len(rows):
+        keys = rows[sort]
+        if sort == TABLES[name]['date_column']:
+            keys = pd.to_datetime(keys, errors='coerce', utc=True, format='mixed')
+        rows = rows.iloc[keys.reset_index(drop=True).sort_values(
+            ascending=not descending, na_position='last', kind='stable').index]
+    return fragments, rows['fragment'].to_numpy(dtype=np.int64), rows['row'].to_numpy(dtype=np.int64)
+
+
+# ✅ One page of a table: filter and sort through the cached index, then read only the page's rows
+def query_table(name, columns=None, where=None, date_from=None, date_to=None,
+                sort=None, descending=False, page=1, per_page=50):
+    """Return (page DataFrame, number of matching rows).
+
+    where maps a column to a value or list of allowed values; date_from and
+    date_to (YYYY-MM-DD, inclusive) prune date partitions. sort may be any
+    table column; the date column sorts chronologically. The filter and sort
+    columns are indexed once per table version; the requested columns are
+    read only from the part files holding the page's rows.
+    """
+    schema = TABLES[name]['columns']
+    wanted = list(columns) if columns else list(schema)
+    for column in wanted + list(where or {}) + ([sort] if sort else []):
+        if column not in schema:
+            raise ValueError(f"Unknown column for {name}: {column}")
+    empty = conform(name, pd.DataFrame()).reindex(columns=wanted)
+    version = table_version(name)
+    if not version:
+        return empty, 0
+
+    key = []
+    for column, values in sorted((where or {}).items()):
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        cast = str if schema[column] == 'string' else int
+        key.append((column, tuple(sorted(cast(value) for value in values))))
+    try:
+        return _query_page(name, wanted, version, tuple(key), date_from, date_to, sort, descending, page, per_page)
+    except FileNotFoundError:
+        # A compaction removed part files a cached index still points to: rebuild it once
+        _row_index.cache_clear()
+        return _query_page(name, wanted, table_version(name), tuple(key), date_from, date_to, sort, descending,
+                           page, per_page)
+
+
+def _query_page(name, wanted, version, key, date_from, date_to, sort, descending, page, per_page):
+    with stage('storage_index', table=name):
+        fragments, fragment_ids, row_ids = _row_index(name, version, key, date_from or None,
+                                                      date_to or None, sort or None, bool(descending))
+
+    start = max(0, (page - 1) * per_page)
+    page_fragments, page_rows = fragment_ids[start:start + per_page], row_ids[start:start + per_page]
+    if not len(page_rows):
+        return conform(name, pd.DataFrame()).reindex(columns=wanted), len(row_ids)
+
+    schema_arrow = arrow_schema(name)
+    parts = {}
+    with stage('storage_read', table=name) as span:
+        for fragment_id in np.unique(page_fragments):
+            rows = page_rows[page_fragments == fragment_id]
+            table = fragments[fragment_id].to_table(schema=schema_arrow, columns=wanted).take(rows)
+            parts[fragment_id] = dict(zip(rows.tolist(), table.to_pandas().to_dict('records')))
+        span['rows'] = len(page_rows)
+    df = pd.DataFrame([parts[fragment_id][row] for fragment_id, row in zip(page_fragments, page_rows.tolist())],
+                      columns=wanted)
+    return _typed(name, df).reset_index(drop=True), len(row_ids)
+
+
+# ✅ Rows as plain dicts (missing values become None for templates/JSON)
+def to_records(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+# ✅ Part files of a table (hidden in-progress .tmp files are never matched)
+def table_parts(name):
+    return glob.glob(os.path.join(table_path(name), '*', '*.parquet'))
+
+
+def part_day(part):
+    return os.path.basename(os.path.dirname(part)).split('=', 1)[-1]
+
+
+# ✅ Data version for cache keys: newest part file mtime (0 if the table is empty)
+def table_version(name):
+    return max((os.path.getmtime(part) for part in table_parts(name)), default=0)
+
+
+# ✅ One-shot migration of the legacy CSV files into the store
+def migrate_csvs(overwrite=False):
+    for name, table in TABLES.items():
+        if not os.path.exists(table['csv']):
+            print(f"⚠️ Skipping {name}: {table['csv']} not found")
+            continue
+        if table_version(name) and not overwrite:
+            print(f"⚠️ Skipping {name}: table already has data (use --overwrite)")
+            continue
+        df = pd.read_csv(table['csv'])
+        write_table(name, df)
+        print(f"✅ Migrated {len(df)} rows from {table['csv']} to {table_path(name)}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        migrate_csvs(overwrite='--overwrite' in sys.argv)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'compact':
+        for name in sys.argv[2:] or TABLES:
+            print(f"✅ {name}: merged away {compact_table(name, min_parts=2)} part files")
+    else:
+        print("Usage: python storage.py migrate [--overwrite]\n       python storage.py compact [table ...]")
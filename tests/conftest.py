@@ -0,0 +1,37 @@
+import os
+import sys
+import pytest
+
+# ✅ The modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_services import SyntheticCorpus, FakeGroqServer
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory so data/ files (caches, sync state, tables) stay out of the repo."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def corpus():
+    return SyntheticCorpus(seed=1)
+
+
+@pytest.fixture
+def groq_server(workdir, monkeypatch):
+    """A local Groq stand-in with fresh clients and schedulers generous enough never to queue."""
+    import llm_client
+    import llm_scheduler
+    server = FakeGroqServer(latency=0.02, token_latency=0.01).start()
+    monkeypatch.setenv('GROQ_BASE_URL', server.url)
+    keys = ('GROQ_API_KEY', 'GROQ_API_KEY_2')
+    for key in keys:
+        monkeypatch.setenv(key, 'test')
+    monkeypatch.setattr(llm_client, '_clients', {})
+    monkeypatch.setattr(llm_scheduler, '_schedulers',
+                        {key: llm_scheduler.RateLimitScheduler(rpm=10_000, tpm=10_000_000) for key in keys})
+    yield server
+    server.stop()
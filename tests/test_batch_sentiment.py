@@ -0,0 +1,91 @@
+import re
+import time
+import threading
+import pandas as pd
+from batch_sentiment import as_indexed, classify_packed, map_concurrent, parse_packed_response, plan_packs
+from fake_services import FakeGroqServer
+from sentiment_service import PROMPTS, LLMBackend
+from sentiments import emotion_based_sentiments, fine_grained_sentiments
+
+
+def test_map_concurrent_keeps_input_order():
+    result = map_concurrent(lambda n: time.sleep(0.01 * (5 - n)) or n * n, range(5), max_workers=5)
+    assert result == [0, 1, 4, 9, 16]
+
+
+def test_map_concurrent_respects_the_worker_limit():
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def work(_):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    map_concurrent(work, range(12), max_workers=3)
+    assert peak[0] == 3
+
+
+def test_as_indexed_restores_series_index():
+    values, index = as_indexed(pd.Series(['a', 'b'], index=[7, 9]))
+    assert values == ['a', 'b'] and list(index) == [7, 9]
+    assert list(as_indexed(iter(['x']))[1]) == [0]
+
+
+def test_single_text_calls_run_concurrently_in_input_order(groq_server):
+    backend = LLMBackend('chat')
+    texts = [f"Message {i}: the app keeps crashing" for i in range(8)]
+    backend.classify_one(texts[0])  # builds the client
+    start = time.perf_counter()
+    backend.classify_one(texts[0])
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = map_concurrent(backend.classify_one, texts, max_workers=8)
+    assert time.perf_counter() - start < 8 * single / 2
+    expected = [FakeGroqServer._labels(PROMPTS['chat']['single'].format(text=text)) for text in texts]
+    assert [tuple(row[:2]) for row in rows] == expected
+
+
+def test_plan_packs_respects_item_and_input_budgets():
+    assert [len(pack) for pack in plan_packs(['short'] * 30, max_tokens=800)] == [10, 10, 10]
+    assert [len(pack) for pack in plan_packs(['x' * 400] * 6, max_tokens=800, input_budget=250)] == [2, 2, 2]
+    assert plan_packs(['x' * 10_000], input_budget=100) == [[0]]  # an oversized text still gets a pack
+
+
+def test_parse_packed_response_maps_ids_to_positions():
+    response = 'Sure: [{"id": 2, "fine_grained": "Negative", "emotion": "Anger", "thinking": "upset"},' \
+               ' {"id": 1, "fine_grained": "positive", "emotion": "joy"}, {"id": 9, "fine_grained": "Neutral", "emotion": "Joy"}]'
+    assert parse_packed_response(response, 2) == {
+        0: ['Joy', 'Positive', 'No reasoning provided.'],
+        1: ['Anger', 'Negative', 'upset'],
+    }
+    assert parse_packed_response('[{"id": 1', 2) == {}
+
+
+def test_classify_packed_splits_unparseable_packs_and_falls_back():
+    calls = []
+
+    def complete(prompt, max_tokens):
+        calls.append(len(re.findall(r'^\[\d+\]$', prompt, re.MULTILINE)))
+        return 'truncated [{"id": 1,' if calls[-1] > 2 else \
+            '[' + ','.join(f'{{"id": {n}, "fine_grained": "Neutral", "emotion": "Trust"}}'
+                           for n in range(1, calls[-1] + 1)) + ']'
+
+    result = classify_packed([f"text {i}" for i in range(5)], complete, 'Classify.',
+                             lambda text: ['Fear', 'Negative', 'single'], max_workers=1)
+    # 5 -> [2, 3] -> [2, 1, 2]: the lone middle item goes through the single-text fallback
+    assert list(result['emotion_sentiment']) == ['Trust', 'Trust', 'Fear', 'Trust', 'Trust']
+    assert calls == [5, 2, 3, 2]
+
+
+def test_packed_classification_needs_fewer_calls(groq_server):
+    texts = [f"Ticket {i}: export fails with an error" for i in range(30)]
+    result = LLMBackend('chat').classify(texts)
+
+    assert len(result) == 30
+    assert result['emotion_sentiment'].isin(emotion_based_sentiments).all()
+    assert result['fine_grained_sentiment'].isin(fine_grained_sentiments).all()
+    assert groq_server.counters['requests'] < len(texts)
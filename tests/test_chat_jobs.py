@@ -0,0 +1,55 @@
+import time
+import chat_jobs
+from chat_jobs import ChatSentimentQueue, JobStore, chat_text
+
+
+class Writer:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+
+def wait_for_job(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)['status'] == 'pending' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_turns_are_classified_and_logged_off_the_request(workdir):
+    texts, writer = [], Writer()
+    queue = ChatSentimentQueue(lambda text: texts.append(text) or ('Joy', 'Positive', 'ok'), writer,
+                               store=JobStore('jobs.sqlite'))
+    job_id = queue.submit({'user_input': 'thanks', 'bot_response': 'you are welcome'})
+    assert wait_for_job(queue, job_id) == {'status': 'done', 'sentiment': ['Joy', 'Positive', 'ok']}
+    assert texts == [chat_text('thanks', 'you are welcome')]
+    assert writer.rows[0]['emotion_sentiment'] == 'Joy' and writer.rows[0]['thinking'] == 'ok'
+
+
+def test_failed_classification_still_logs_the_turn(workdir):
+    def fail(text):
+        raise RuntimeError('groq down')
+
+    writer = Writer()
+    queue = ChatSentimentQueue(fail, writer, store=JobStore('jobs.sqlite'))
+    job_id = queue.submit({'user_input': 'hi', 'bot_response': 'hello'})
+    assert wait_for_job(queue, job_id) == {'status': 'error', 'error': 'groq down'}
+    assert writer.rows[0]['fine_grained_sentiment'] == 'Unknown'
+
+
+def test_job_status_is_shared_across_stores(workdir):
+    JobStore('jobs.sqlite').set('job-1', {'status': 'done', 'sentiment': ['Joy', 'Positive', '']})
+    other = JobStore('jobs.sqlite')  # e.g. the worker process that serves the poll
+    assert other.get('job-1')['status'] == 'done'
+    assert other.get('missing') is None
+
+
+def test_old_jobs_are_trimmed(workdir, monkeypatch):
+    monkeypatch.setattr(chat_jobs, 'TRIM_EVERY', 5)
+    store = JobStore('jobs.sqlite', max_results=3)
+    for n in range(10):
+        store.set(f"job-{n}", {'status': 'pending'})
+    assert store.pending() == 3
+    assert store.get('job-9') and store.get('job-0') is None
@@ -0,0 +1,40 @@
+import time
+import storage
+from chat_log_writer import ChatLogWriter
+
+
+def row(n):
+    return {'timestamp': f"2024-05-01 10:00:{n:02d}", 'user_input': f"q{n}", 'bot_response': f"a{n}"}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_rows_are_written_in_groups(workdir):
+    writer = ChatLogWriter(flush_size=5, flush_interval=10, compact_every=0)
+    for n in range(10):
+        writer.write(row(n))
+    assert wait_for(lambda: writer.rows_written == 10)
+    assert writer.flushes == 2
+    assert sorted(storage.read_table('chat_logs')['user_input']) == sorted(f"q{n}" for n in range(10))
+
+
+def test_flush_writes_whatever_is_queued(workdir):
+    writer = ChatLogWriter(flush_size=100, flush_interval=10, compact_every=0)
+    writer.write(row(0))
+    writer.write(row(1))
+    writer.flush()
+    assert wait_for(lambda: writer.rows_written == 2)
+
+
+def test_every_few_flushes_the_days_parts_are_merged(workdir, monkeypatch):
+    monkeypatch.setattr('chat_log_writer.compact_table', lambda name: storage.compact_table(name, min_parts=2))
+    writer = ChatLogWriter(flush_size=1, flush_interval=10, compact_every=3)
+    for n in range(3):
+        writer.write(row(n))
+    assert wait_for(lambda: writer.flushes == 3 and len(storage.table_parts('chat_logs')) == 1)
+    assert list(storage.read_table('chat_logs')['user_input']) == ['q0', 'q1', 'q2']
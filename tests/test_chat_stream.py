@@ -0,0 +1,65 @@
+import json
+import time
+import pytest
+import llm_client
+
+
+def parse_events(body):
+    events = []
+    for frame in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.splitlines())
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+@pytest.fixture
+def client(groq_server, monkeypatch):
+    import main
+
+    class Queue:
+        def submit(self, chat_log):
+            return 'job-1'
+
+    monkeypatch.setattr(main, 'get_chat_sentiment_queue', lambda: Queue())
+    return main.app.test_client()
+
+
+def test_stream_first_token_arrives_before_the_reply_completes(groq_server):
+    messages = [{'role': 'user', 'content': 'Where is my order?'}]
+    llm_client.get_client()  # client construction is not part of the request latency
+    start = time.perf_counter()
+    first_token, tokens = None, []
+    for token in llm_client.stream(messages, temperature=0.5, max_tokens=256):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        tokens.append(token)
+    total = time.perf_counter() - start
+
+    assert ''.join(tokens) == groq_server.reply(messages)
+    assert len(tokens) > 1
+    assert first_token < total / 3
+
+
+def test_chat_stream_sends_tokens_then_done(client, groq_server):
+    response = client.post('/chatbot/stream', data={'user_input': 'Where is my order?'})
+    events = parse_events(response.get_data(as_text=True))
+
+    assert response.mimetype == 'text/event-stream'
+    tokens = [data['token'] for name, data in events if name == 'message']
+    assert len(tokens) > 1
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['bot_response'] == ''.join(tokens).strip()
+    assert events[-1][1]['sentiment_id'] == 'job-1'
+
+
+def test_chat_stream_ends_with_an_error_event_when_generation_fails(client, monkeypatch):
+    import main
+
+    class Bot:
+        def generate_response_stream(self, user_input):
+            yield 'Hello'
+            raise RuntimeError('upstream closed the connection')
+
+    monkeypatch.setattr(main, 'get_chatbot', lambda: Bot())
+    events = parse_events(client.post('/chatbot/stream', data={'user_input': 'hi'}).get_data(as_text=True))
+    assert events == [('message', {'token': 'Hello'}), ('error', {'error': 'upstream closed the connection'})]
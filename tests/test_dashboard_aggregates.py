@@ -0,0 +1,58 @@
+import time
+import pandas as pd
+import pytest
+import dashboard_aggregates
+import storage
+from dashboard_aggregates import TableAggregates
+
+
+def emails(count, day='2024-05-01', emotion='Joy'):
+    return pd.DataFrame({'Subject': [f"s{n}" for n in range(count)], 'Date': [f"{day} 10:00:00"] * count,
+                         'emotion_sentiment': [emotion] * count, 'fine_grained_sentiment': ['Positive'] * count})
+
+
+@pytest.fixture(autouse=True)
+def fresh_aggregates(workdir, monkeypatch):
+    monkeypatch.setattr(dashboard_aggregates, '_aggregates', {})
+
+
+def test_refresh_reads_only_new_parts(monkeypatch):
+    storage.append_table('emails', emails(3))
+    aggregates = TableAggregates('emails').refresh()
+    read = []
+    original = aggregates._add_part
+    monkeypatch.setattr(aggregates, '_add_part', lambda part: read.append(part) or original(part))
+
+    time.sleep(0.01)
+    storage.append_table('emails', emails(2, day='2024-05-03', emotion='Anger'))
+    snapshot = aggregates.refresh().snapshot()
+    assert len(read) == 1
+    assert snapshot['total'] == 5
+    assert snapshot['counts']['emotion_sentiment'] == {'Joy': 3, 'Anger': 2}
+    trend = aggregates.trend_frame()
+    assert [str(day.date()) for day in trend.index] == ['2024-05-01', '2024-05-02', '2024-05-03']
+    assert trend.loc['2024-05-02'].sum() == 0
+
+
+def test_rewritten_tables_are_rebuilt():
+    storage.append_table('emails', emails(3))
+    aggregates = TableAggregates('emails').refresh()
+    time.sleep(0.01)
+    storage.write_table('emails', emails(1, emotion='Fear'))
+    assert aggregates.refresh().snapshot()['counts']['emotion_sentiment'] == {'Fear': 1}
+
+
+def test_analyze_serves_a_page_with_stats():
+    import email_app
+    storage.append_table('emails', emails(7))
+    client = email_app.app.test_client()
+    body = client.get('/analyze?page=9&per_page=5').get_json()
+    assert body['pagination'] == {'page': 2, 'per_page': 5, 'pages': 2, 'total': 7}
+    assert len(body['data']) == 2
+    assert body['stats']['total_emails'] == 7
+    assert set(body['visualizations']) == {'sentiment_pie', 'fine_grained_bar', 'sentiment_trend'}
+
+
+def test_analyze_without_data_is_a_404():
+    import email_app
+    assert email_app.app.test_client().get('/analyze').status_code == 404
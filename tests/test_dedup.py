@@ -0,0 +1,38 @@
+from dedup import Deduplicator, cluster_texts, normalize_for_dedup
+
+
+def test_greeting_without_punctuation_keeps_the_message():
+    texts = ["Hello I love this product so much", "Hey this is the worst support ever",
+             "Hello I love this product so much", "Hey this is the worst support ever"]
+    assert normalize_for_dedup(texts[0]) == "hello i love this product so much"
+    unique, slots = Deduplicator().representatives(texts)
+    assert slots == [0, 1, 0, 1]
+
+
+def test_greeting_with_a_short_name_is_stripped():
+    assert normalize_for_dedup("Hi Anna, my parcel is late") == normalize_for_dedup("Hello Mr. Brown: my parcel is late")
+
+
+def test_ratings_are_not_masked():
+    assert normalize_for_dedup("I rate it 1/10") != normalize_for_dedup("I rate it 10/10")
+    assert cluster_texts(["I rate it 1/10", "I rate it 10/10"]) == [0, 1]
+
+
+def test_ids_and_templates_cluster_together():
+    texts = [f"Hi {name}, your order #{number} has shipped and will arrive within 2 days. Track it at https://x.io/{number}"
+             for name, number in [("Anna", 48213), ("Bob", 99120), ("Chen", 10442)]]
+    texts.append("My order arrived broken and nobody answers my emails.")
+    assert cluster_texts(texts) == [0, 0, 0, 3]
+
+
+def test_near_duplicates_join_only_above_threshold():
+    base = "the export to csv fails every time with a timeout error on large projects since the last update"
+    near = base.replace("every time", "each time")
+    other = "love the new dark theme, it looks great and the app feels faster than before overall"
+    assert cluster_texts([base, near, other], threshold=0.5) == [0, 0, 2]
+    assert cluster_texts([base, near, other], threshold=1.0) == [0, 1, 2]
+
+
+def test_disabled_deduplicator_classifies_everything():
+    unique, slots = Deduplicator(enabled=False).representatives(["a", "a"])
+    assert unique == [0, 1] and slots == [0, 1]
@@ -0,0 +1,33 @@
+from email_packages.email_cleaner import EmailCleaner, local_clean
+
+
+def test_body_mentions_of_unsubscribe_are_kept():
+    text = "I asked you to unsubscribe me five times and you keep spamming me. This is outrageous.\n\nStop now."
+    assert local_clean(text) == (text, False)
+
+
+def test_single_line_complaint_is_kept():
+    text = "Your privacy policy change is unacceptable, I am closing my account."
+    assert local_clean(text)[0] == text
+
+
+def test_trailing_footer_is_stripped():
+    text = ("My invoice for March was charged twice.\nPlease refund one of them.\n\n"
+            "You are receiving this email because you signed up.\n"
+            "Unsubscribe | Manage preferences\n\n"
+            "© 2024 Acme Inc. All rights reserved.\n")
+    assert local_clean(text) == ("My invoice for March was charged twice. Please refund one of them.", False)
+
+
+def test_reply_and_quoted_text_are_trimmed():
+    text = "Thanks, that fixed it.\n\nOn Mon, 3 Jun 2024 at 10:00, Support <help@acme.com> wrote:\n> Try again"
+    assert local_clean(text)[0] == "Thanks, that fixed it."
+
+
+def test_only_messy_leftovers_reach_the_llm():
+    sent = []
+    cleaner = EmailCleaner(lambda text: sent.append(text) or 'cleaned')
+    results = cleaner.clean_many(["Plain complaint about delivery.", "See attachment " + "QUJD" * 30], max_workers=1)
+    assert results == ["Plain complaint about delivery.", 'cleaned']
+    assert len(sent) == 1
+    assert cleaner.stats() == {'local': 1, 'llm': 1, 'llm_calls_avoided': 1, 'avoided_rate': 0.5}
@@ -0,0 +1,72 @@
+import time
+import pytest
+from fake_services import FakeGmailService
+from email_packages import fetch_email
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, 'sleep', lambda seconds: slept.append(seconds) if seconds > 0 else None)
+    return slept
+
+
+def test_list_follows_next_page_token(corpus):
+    service = FakeGmailService(corpus, total=1200, latency=0)
+    ids = fetch_email.list_message_ids(service, max_results=1100)
+    assert ids == [f"m{i}" for i in range(1100)]
+    assert service.round_trips == 3
+
+
+def test_batch_retries_rate_limited_gets(corpus, waits):
+    service = FakeGmailService(corpus, total=120, latency=0, rate_limited=3)
+    ids = fetch_email.list_message_ids(service, max_results=120)
+    messages = fetch_email.fetch_messages_batched(service, ids, batch_size=50)
+    assert [message['id'] for message in messages] == ids
+    assert service.gets == 123
+    assert len(waits) == 1  # the three 429s were retried together after one backoff
+
+
+def test_batch_gives_up_after_max_retries(corpus, waits):
+    service = FakeGmailService(corpus, total=10, latency=0, rate_limited=1000)
+    with pytest.raises(RuntimeError):
+        fetch_email.fetch_messages_batched(service, [f"m{i}" for i in range(10)], max_retries=2)
+    assert len(waits) == 2
+
+
+
+def test_deleted_messages_are_skipped(corpus):
+    service = FakeGmailService(corpus, total=5, latency=0, deleted={'m1'})
+    missing = []
+    messages = list(fetch_email.iter_messages_batched(service, [f"m{i}" for i in range(5)], missing=missing))
+    assert [message['id'] for message in messages] == ['m0', 'm2', 'm3', 'm4']
+    assert missing == ['m1']
+
+
+def test_first_sync_lists_newest_then_follows_history(corpus):
+    service = FakeGmailService(corpus, total=5, latency=0, history=['m5', 'm6'])
+    state = {'history_id': None, 'processed_ids': []}
+    first = list(fetch_email.iter_sync_emails(service, state, max_results=5))
+    assert len(first) == 5 and state['history_id'] == '1'
+
+    service.total = 7
+    second = list(fetch_email.iter_sync_emails(service, state, max_results=5))
+    assert len(second) == 2
+    assert state['history_id'] == '2'
+    assert state['processed_ids'][-2:] == ['m5', 'm6']
+
+
+def test_sync_records_deleted_messages_and_advances(corpus):
+    service = FakeGmailService(corpus, total=10, latency=0, deleted={'m3'}, history=['m2', 'm3', 'm4'])
+    state = {'history_id': '1', 'processed_ids': []}
+    rows = list(fetch_email.iter_sync_emails(service, state))
+    assert len(rows) == 2
+    assert 'm3' in state['processed_ids']
+    assert state['history_id'] == '2'
+
+
+def test_sync_state_round_trip(workdir):
+    path = str(workdir / 'state.json')
+    fetch_email.save_sync_state({'history_id': '7', 'processed_ids': ['a', 'b']}, path)
+    assert fetch_email.load_sync_state(path) == {'history_id': '7', 'processed_ids': ['a', 'b']}
+    assert fetch_email.load_sync_state(str(workdir / 'missing.json'))['history_id'] is None
@@ -0,0 +1,78 @@
+import time
+import pytest
+from fake_services import FakeGitHubServer
+from ticket.github_issues import GitHubIssueFetcher, issue_to_row
+
+
+@pytest.fixture
+def github(corpus):
+    servers = []
+
+    def start(**kwargs):
+        server = FakeGitHubServer(corpus, latency=0, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def make_fetcher(server, **kwargs):
+    return GitHubIssueFetcher('octo/repo', api_url=server.url, **{'cache_file': None, **kwargs})
+
+
+def test_follows_link_pagination(github):
+    server = github(total=250)
+    issues = make_fetcher(server).fetch_issues()
+    assert [issue['number'] for issue in issues] == list(range(1, 251))
+    assert server.counters['pages'] == 3
+
+
+def test_max_issues_stops_paging(github):
+    server = github(total=250)
+    issues = make_fetcher(server, per_page=100).fetch_issues(max_issues=30)
+    assert len(issues) == 30
+    assert server.counters['pages'] == 1
+
+
+def test_unchanged_pages_replay_from_304(github):
+    server = github(total=250)
+    fetcher = make_fetcher(server)
+    first = fetcher.fetch_issues()
+    second = fetcher.fetch_issues()
+    assert server.counters['pages'] == 3
+    assert server.counters['not_modified'] == 3
+    assert [issue_to_row(issue) for issue in second] == [issue_to_row(issue) for issue in first]
+
+
+def test_etag_cache_is_persisted(github, workdir):
+    server = github(total=250)
+    cache_file = str(workdir / 'etags.json')
+    make_fetcher(server, cache_file=cache_file).fetch_issues()
+
+    assert len(make_fetcher(server, cache_file=cache_file).fetch_issues()) == 250
+    assert server.counters['not_modified'] == 3
+
+
+def test_etag_cache_keeps_only_what_a_replay_needs(github, workdir):
+    server = github(total=250)
+    cache_file = str(workdir / 'etags.json')
+    make_fetcher(server, cache_file=cache_file, max_cached_pages=2).fetch_issues()
+
+    reloaded = make_fetcher(server, cache_file=cache_file, max_cached_pages=2)
+    assert len(reloaded.cache) == 2
+    for page in reloaded.cache.values():
+        assert all(set(issue) <= {'id', 'number', 'title', 'body', 'created_at', 'state', 'html_url'}
+                   for issue in page['body'])
+
+
+def test_waits_for_rate_limit_reset(github, monkeypatch):
+    waits = []
+    monkeypatch.setattr(time, 'sleep', lambda seconds: waits.append(seconds))
+    server = github(total=50, rate_limited=1, reset_after=30)
+    issues = make_fetcher(server).fetch_issues()
+    assert len(issues) == 50
+    assert server.counters['rate_limited'] == 1
+    waits = [seconds for seconds in waits if seconds > 0]
+    assert len(waits) == 1 and 29 <= waits[0] <= 32
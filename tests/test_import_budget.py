@@ -0,0 +1,7 @@
+import import_budget
+
+
+def test_main_imports_within_budget():
+    seconds, packages = import_budget.measure()
+    assert not set(import_budget.LAZY_MODULES) & packages
+    assert seconds <= import_budget.IMPORT_BUDGET_SECONDS
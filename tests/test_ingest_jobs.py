@@ -0,0 +1,65 @@
+import threading
+import time
+from ingest_jobs import IngestScheduler, RefreshJob, process_lock
+
+
+def wait_idle(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_process_lock_is_exclusive(workdir):
+    with process_lock('refresh-x', 'locks') as first:
+        with process_lock('refresh-x', 'locks') as second:
+            assert (first, second) == (True, False)
+    with process_lock('refresh-x', 'locks') as again:
+        assert again
+
+
+def test_triggers_during_a_run_are_folded_into_it(workdir):
+    release = threading.Event()
+    job = RefreshJob('emails', lambda: release.wait(5) and {'rows': 3}, lock_dir='locks')
+    assert job.trigger()
+    assert not job.trigger() and not job.trigger()
+    release.set()
+    wait_idle(job)
+    status = job.status()
+    assert (status['runs'], status['deduplicated_triggers'], status['last_result']) == (1, 2, {'rows': 3})
+
+
+def test_a_refresh_held_by_another_process_is_skipped(workdir):
+    calls = []
+    job = RefreshJob('tickets', lambda: calls.append(1), lock_dir='locks')
+    with process_lock('refresh-tickets', 'locks'):
+        job.trigger()
+        wait_idle(job)
+    assert calls == [] and job.status()['deduplicated_triggers'] == 1
+
+
+def test_failures_are_recorded_and_cleared(workdir):
+    outcomes = [RuntimeError('github down'), {'rows': 1}]
+
+    def refresh():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    job = RefreshJob('tickets', refresh, lock_dir='locks')
+    job.trigger()
+    wait_idle(job)
+    assert job.status()['state'] == 'failed' and job.status()['last_error'] == 'RuntimeError: github down'
+    job.trigger()
+    wait_idle(job)
+    status = job.status()
+    assert (status['state'], status['failures'], status['last_error']) == ('idle', 1, None)
+
+
+def test_only_due_jobs_run():
+    manual = RefreshJob('manual', lambda: None, interval=0)
+    scheduled = RefreshJob('scheduled', lambda: None, interval=60)
+    assert not manual.due(time.time()) and scheduled.due(time.time())
+    scheduled.last_started = time.time()
+    assert not scheduled.due(time.time()) and scheduled.due(time.time() + 61)
+    assert set(IngestScheduler([manual, scheduled]).status()) == {'manual', 'scheduled'}
@@ -0,0 +1,32 @@
+from batch_sentiment import estimate_tokens
+from input_budget import aggregate_labels, chunk_text, fit_to_budget, prepare_text, strip_noise
+
+FILLER = "The build runs on the usual machine with the default settings. "
+
+
+def test_short_texts_are_untouched():
+    assert fit_to_budget("Crashes on start.", budget=50) == "Crashes on start."
+
+
+def test_fit_keeps_the_opening_and_the_strongest_segments_in_order():
+    text = "Export to CSV stopped working. " + FILLER * 20 + "This is terrible and I am really disappointed!"
+    fitted = fit_to_budget(text, budget=30)
+    assert estimate_tokens(fitted) <= 31
+    assert fitted.startswith("Export to CSV stopped working.")
+    assert fitted.endswith("This is terrible and I am really disappointed!")
+
+
+def test_issue_noise_is_stripped():
+    text = ("It fails every time!\n\n```\nlong code\n```\n<!-- template -->\n"
+            "Traceback (most recent call last):\n  File \"app.py\", line 3, in main\n"
+            "2024-05-01 10:00:00 ERROR boom\n> quoted reply\nPlease help.")
+    assert strip_noise(text) == "It fails every time!\n\nPlease help."
+    assert prepare_text("```only code```", strip=True) == ["```only code```"]  # nothing left: keep the original
+
+
+def test_map_reduce_chunks_and_aggregates():
+    text = "First problem here. " * 10 + "Second problem here. " * 10
+    chunks = chunk_text(text, budget=30, max_chunks=3)
+    assert len(chunks) == 3 and all(estimate_tokens(chunk) <= 31 for chunk in chunks)
+    rows = [['Anger', 'Negative', 'a'], ['Anger', 'Very Negative', 'b'], ['Joy', 'Positive', 'c']]
+    assert aggregate_labels(rows) == ['Anger', 'Negative', 'a']
@@ -0,0 +1,59 @@
+import time
+import pytest
+import llm_cache
+from llm_cache import LLMCache, cached, make_key
+
+
+@pytest.fixture
+def cache(workdir, monkeypatch):
+    cache = LLMCache('cache.sqlite')
+    monkeypatch.setattr(llm_cache, '_cache', cache)
+    return cache
+
+
+def test_cached_calls_hit_on_whitespace_variants(cache):
+    calls = []
+
+    @cached('sentiment', 'model-a', 0.0, wrap=tuple)
+    def classify(text):
+        calls.append(text)
+        return ['Joy', 'Positive', 'ok']
+
+    assert classify("great  app\n") == ['Joy', 'Positive', 'ok']
+    assert classify(" great app") == ('Joy', 'Positive', 'ok')
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_invalid_results_are_not_cached(cache):
+    calls = []
+
+    @cached('sentiment', 'model-a', 0.0, valid=lambda value: value[0] != 'Unknown')
+    def classify(text):
+        calls.append(text)
+        return ['Unknown', 'Unknown', '']
+
+    classify('garbled'), classify('garbled')
+    assert len(calls) == 2 and cache.stats()['entries'] == 0
+
+
+def test_keys_change_with_the_prompt_version():
+    assert make_key('s', 'text', 'm', '1', 0) != make_key('s', 'text', 'm', '2', 0)
+    assert make_key('s', 'a  b', 'm', '1', 0) == make_key('s', 'a b', 'm', '1', 0.0)
+
+
+def test_expired_entries_miss(workdir):
+    cache = LLMCache('cache.sqlite', max_age_days=1)
+    cache.put('k', 'v')
+    cache._conn.execute("UPDATE llm_cache SET created = ?", (time.time() - 2 * 86400,))
+    assert cache.get('k') is None and cache.stats()['entries'] == 0
+
+
+def test_evict_keeps_the_most_recently_used(workdir):
+    cache = LLMCache('cache.sqlite', max_entries=2)
+    for key in 'abc':
+        cache.put(key, key)
+        time.sleep(0.01)
+    cache.get('a')
+    cache.evict()
+    assert [cache.get(key) for key in 'abc'] == ['a', None, 'c']
@@ -0,0 +1,53 @@
+import pytest
+import llm_client
+from llm_scheduler import RateLimitScheduler, estimate_message_tokens, get_scheduler
+
+
+class Usage:
+    total_tokens = 120
+
+
+class Response:
+    usage = Usage()
+
+
+def test_success_settles_to_reported_usage():
+    scheduler = RateLimitScheduler(rpm=10, tpm=10_000)
+    assert scheduler.run(lambda: Response(), 900, lambda e: None).usage.total_tokens == 120
+    assert scheduler.stats()['tokens_in_window'] == 120
+
+
+def test_failed_attempts_release_their_tokens(monkeypatch):
+    scheduler = RateLimitScheduler(rpm=10, tpm=10_000, max_retries=1)
+    monkeypatch.setattr(scheduler, 'pause', lambda seconds: None)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('reset')
+        return Response()
+
+    scheduler.run(flaky, 900, lambda e: 0)
+    stats = scheduler.stats()
+    assert (stats['requests'], stats['retries'], stats['tokens_in_window']) == (2, 1, 120)
+
+    with pytest.raises(ValueError):
+        scheduler.run(lambda: (_ for _ in ()).throw(ValueError('bad request')), 900, lambda e: None)
+    assert scheduler.stats()['tokens_in_window'] == 120
+
+
+def test_stream_settles_its_reservation(groq_server):
+    messages = [{'role': 'user', 'content': 'Where is my order?'}]
+    reply = ''.join(llm_client.stream(messages, temperature=0.5, max_tokens=512))
+    assert reply == groq_server.reply(messages)
+    counters = groq_server.counters
+    assert get_scheduler().stats()['tokens_in_window'] == counters['prompt_tokens'] + counters['completion_tokens']
+
+
+def test_interrupted_stream_settles_to_what_was_streamed(groq_server):
+    messages = [{'role': 'user', 'content': 'Where is my order?'}]
+    tokens = llm_client.stream(messages, temperature=0.5, max_tokens=512)
+    first = next(tokens)
+    tokens.close()
+    assert get_scheduler().stats()['tokens_in_window'] == estimate_message_tokens(messages) + len(first) // 4 + 1
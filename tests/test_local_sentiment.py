@@ -0,0 +1,84 @@
+import pandas as pd
+from batch_sentiment import SENTIMENT_COLUMNS
+from local_sentiment import (HashedLinearModel, LexiconClassifier, TieredClassifier, agreement,
+                             load_local_classifier, load_training_data, train)
+
+
+def test_lexicon_labels_clear_cases_confidently():
+    frame = LexiconClassifier().predict(["I love it, amazing and wonderful support", "terrible, awful, horrible app"])
+    assert list(frame['fine_grained_sentiment']) == ['Very Positive', 'Very Negative']
+    assert list(frame['emotion_sentiment']) == ['Joy', 'Disgust']
+    assert (frame['confidence'] > 0.8).all()
+
+
+def test_negation_flips_valence():
+    frame = LexiconClassifier().predict(["not happy at all", "happy"])
+    assert list(frame['fine_grained_sentiment']) == ['Negative', 'Very Positive']
+
+
+def test_unknown_scripts_always_escalate():
+    frame = LexiconClassifier().predict(["Это ужасно, верните деньги", "ひどいサービスです", "🔥🔥🔥"])
+    assert (frame['confidence'] == 0).all()
+
+
+def test_shortcuts_answer_greetings_and_empty_inputs():
+    frame = LexiconClassifier().predict(["Hi, thanks!", "?", "Привет"])
+    assert list(frame['thinking'][:2]) == ["Local lexicon: greeting or acknowledgement.",
+                                           "Local lexicon: no meaningful content."]
+    assert frame['confidence'].tolist() == [1.0, 1.0, 0.0]  # a one-word non-Latin message is not "empty"
+
+
+def test_tiered_classifier_escalates_only_unsure_items():
+    sent = []
+
+    def llm(texts):
+        sent.extend(texts)
+        return pd.DataFrame([['Anger', 'Negative', 'llm']] * len(texts), columns=SENTIMENT_COLUMNS)
+
+    tiered = TieredClassifier(llm, threshold=0.8, local=LexiconClassifier())
+    result = tiered.classify(pd.Series(["amazing, wonderful, love it", "Это ужасно"], index=[10, 11]))
+    assert sent == ["Это ужасно"]
+    assert list(result.index) == [10, 11]
+    assert result.loc[11, 'thinking'] == 'llm'
+    assert tiered.stats()['escalated'] == 1
+
+
+def labelled(n):
+    rows = []
+    for i in range(n):
+        if i % 2:
+            rows.append((f"order {i} arrived broken, terrible refund process", 'Negative', 'Anger'))
+        else:
+            rows.append((f"ticket {i} solved quickly, great helpful team", 'Positive', 'Joy'))
+    return pd.DataFrame(rows, columns=['text', 'fine_grained_sentiment', 'emotion_sentiment'])
+
+
+def test_distilled_model_learns_and_round_trips(workdir):
+    data = labelled(60)
+    model = HashedLinearModel(dim=1024).fit(data['text'], data['fine_grained_sentiment'], data['emotion_sentiment'])
+    assert agreement(model, data) == {'fine_grained_sentiment': 1.0, 'emotion_sentiment': 1.0}
+    model.agreement = 0.9
+    model.save('model.npz')
+    loaded = HashedLinearModel.load('model.npz')
+    assert loaded.agreement == 0.9
+    assert list(loaded.predict(["great helpful team"])['emotion_sentiment']) == ['Joy']
+
+
+def test_models_below_the_agreement_gate_are_ignored(workdir):
+    model = HashedLinearModel(dim=64)
+    model.agreement = 0.5
+    model.save('model.npz')
+    assert isinstance(load_local_classifier('model.npz', min_agreement=0.7), LexiconClassifier)
+    assert isinstance(load_local_classifier('model.npz', min_agreement=0.4), HashedLinearModel)
+
+
+def test_training_data_skips_locally_labelled_rows(workdir):
+    from storage import append_table
+    append_table('tickets', pd.DataFrame({
+        'Description': ['crashes on start', 'love it'], 'Created At': ['2024-05-01T00:00:00Z'] * 2,
+        'emotion_sentiment': ['anger', 'Joy'], 'fine_grained_sentiment': ['Negative', 'Positive'],
+        'thinking': ['user is upset', 'Local lexicon: 1 sentiment words, mean valence 3.00.']}))
+    data = load_training_data([('tickets', ['Description'])])
+    assert data.to_dict('records') == [{'text': 'crashes on start', 'fine_grained_sentiment': 'Negative',
+                                        'emotion_sentiment': 'Anger'}]
+    assert train(path='model.npz') is None  # too few rows to hold any out
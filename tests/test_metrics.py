@@ -0,0 +1,54 @@
+import json
+import pytest
+from flask import Flask
+from metrics import MetricsRegistry, instrument_app
+
+
+def test_counters_histograms_and_collectors_render(workdir):
+    registry = MetricsRegistry(buckets=(0.1, 1.0), trace_path=None)
+    registry.inc('cache_hits_total', cache='llm')
+    registry.inc('cache_hits_total', 2, cache='llm')
+    registry.observe('stage_seconds', 0.05, stage='classify')
+    registry.observe('stage_seconds', 5.0, stage='classify')
+    registry.add_collector(lambda: [('queue_depth', 'gauge', {'key': 'a"b'}, 4)])
+    registry.add_collector(lambda: 1 / 0)  # a broken collector does not break the scrape
+
+    lines = registry.render().splitlines()
+    assert 'cache_hits_total{cache="llm"} 3' in lines
+    assert 'queue_depth{key="a\\"b"} 4' in lines
+    assert 'stage_seconds_bucket{stage="classify",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="classify",le="1.0"} 1' in lines
+    assert 'stage_seconds_bucket{stage="classify",le="+Inf"} 2' in lines
+    assert 'stage_seconds_count{stage="classify"} 2' in lines
+
+
+def test_spans_count_rows_errors_and_trace_parents(workdir):
+    registry = MetricsRegistry(trace_path='trace.jsonl')
+    with registry.span('stage_seconds', stage='pipeline') as span:
+        with registry.span('stage_seconds', stage='store') as inner:
+            inner['rows'] = 7
+        span['rows'] = 7
+    with pytest.raises(ValueError):
+        with registry.span('outbound_seconds', errors='outbound_errors_total', operation='send'):
+            raise ValueError('boom')
+
+    text = registry.render()
+    assert 'rows_total{stage="store"} 7' in text
+    assert 'outbound_errors_total{operation="send"} 1' in text
+    records = [json.loads(line) for line in open('trace.jsonl')]
+    assert [(record['stage'] if 'stage' in record else record['operation'], record['parent'], record['status'])
+            for record in records] == [('store', 'pipeline', 'ok'), ('pipeline', None, 'ok'), ('send', None, 'ValueError')]
+
+
+def test_instrumented_apps_serve_metrics():
+    app = Flask(__name__)
+    instrument_app(app)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    client = app.test_client()
+    client.get('/ping')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_seconds_count{endpoint="ping",method="GET",status="200"}' in body
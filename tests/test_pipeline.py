@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from chat_jobs import chat_text
+from ingest_jobs import process_lock
+from pipeline import ChatLogSource, run_source
+from storage import read_table
+
+
+def write_chats(path, start, count):
+    rows = [{'timestamp': f"2024-05-01 10:{minute:02d}:00", 'user_input': f"Question {minute} about my refund",
+             'bot_response': f"Answer {minute}", 'model_used': 'Groq'} for minute in range(start, start + count)]
+    pd.DataFrame(rows).to_csv(path, mode='a', header=start == 0, index=False)
+
+
+@pytest.fixture
+def chat_file(workdir, groq_server):
+    path = str(workdir / 'export.csv')
+    write_chats(path, 0, 5)
+    return path
+
+
+def test_chat_import_follows_a_watermark(chat_file):
+    first = run_source(ChatLogSource(chat_file))
+    assert first['records'] == first['rows'] == 5
+    assert first['dedup']['items'] == 5
+
+    assert run_source(ChatLogSource(chat_file))['records'] == 0
+    write_chats(chat_file, 5, 3)
+    second = run_source(ChatLogSource(chat_file))
+    assert second['records'] == 3
+    assert second['dedup']['items'] == 3  # this run's share, not the process total
+    assert len(read_table('chat_logs')) == 8
+
+
+def test_chat_import_classifies_the_whole_turn(chat_file):
+    records = list(ChatLogSource(chat_file).fetch(limit=2))
+    assert [record['text'] for record in records] == [chat_text(f"Question {n} about my refund", f"Answer {n}")
+                                                      for n in range(2)]
+
+
+def test_run_source_skips_while_another_process_refreshes(chat_file):
+    with process_lock('refresh-chat') as acquired:
+        assert acquired
+        with pytest.raises(RuntimeError):
+            run_source(ChatLogSource(chat_file))
+    assert run_source(ChatLogSource(chat_file))['rows'] == 5
+
+
+def test_github_source_replaces_the_tickets_table(workdir, groq_server, corpus):
+    from fake_services import FakeGitHubServer
+    from pipeline import GitHubSource
+    from ticket.github_issues import GitHubIssueFetcher
+    server = FakeGitHubServer(corpus, total=40, latency=0).start()
+    try:
+        fetcher = GitHubIssueFetcher('octo/repo', api_url=server.url, cache_file=None)
+        assert run_source(GitHubSource(fetcher), 30)['rows'] == 30
+        assert run_source(GitHubSource(fetcher), 12)['rows'] == 12
+    finally:
+        server.stop()
+    assert len(read_table('tickets')) == 12
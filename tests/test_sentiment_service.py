@@ -0,0 +1,43 @@
+import pandas as pd
+from batch_sentiment import SENTIMENT_COLUMNS
+from dedup import Deduplicator
+from input_budget import TOKEN_COLUMNS
+from sentiment_service import SentimentService
+
+
+class Backend:
+    def __init__(self):
+        self.batches = []
+
+    def classify(self, texts):
+        self.batches.append(list(texts))
+        return pd.DataFrame([['Anger' if 'broken' in text else 'Joy', 'Neutral', text] for text in texts],
+                            columns=SENTIMENT_COLUMNS)
+
+
+def test_duplicates_are_classified_once_and_fanned_out():
+    backend = Backend()
+    service = SentimentService('email', backend, dedup=Deduplicator(enabled=True))
+    texts = pd.Series(["my order arrived broken", "great service", "my order arrived broken"], index=[5, 6, 7])
+    result = service.classify(texts, with_tokens=True)
+    assert backend.batches == [["my order arrived broken", "great service"]]
+    assert list(result.index) == [5, 6, 7]
+    assert list(result['emotion_sentiment']) == ['Anger', 'Joy', 'Anger']
+    assert list(result.columns) == SENTIMENT_COLUMNS + TOKEN_COLUMNS
+
+
+def test_long_inputs_are_cut_to_the_budget():
+    backend = Backend()
+    service = SentimentService('ticket', backend, budget=20, dedup=Deduplicator(enabled=False))
+    text = "Export is broken. " + "The report has the usual columns and rows. " * 30 + "```\ntrace\n```"
+    result = service.classify([text], with_tokens=True)
+    assert result.loc[0, 'prompt_tokens'] <= 21 < result.loc[0, 'input_tokens']
+    assert backend.batches[0][0].startswith("Export is broken.") and 'trace' not in backend.batches[0][0]
+
+
+def test_map_reduce_aggregates_chunk_labels():
+    backend = Backend()
+    service = SentimentService('ticket', backend, budget=10, map_reduce=True, dedup=Deduplicator(enabled=False))
+    text = "It is broken again. It is broken again. Otherwise a great tool overall."
+    assert service.classify_one(text)[0] == 'Anger'
+    assert len(backend.batches[0]) > 1
@@ -0,0 +1,109 @@
+import os
+import time
+import pandas as pd
+import pytest
+import storage
+
+
+def chats(start, count, day='2024-05-01'):
+    return pd.DataFrame({'timestamp': [f"{day} 10:{minute:02d}:00" for minute in range(start, start + count)],
+                         'user_input': [f"q{minute}" for minute in range(start, start + count)],
+                         'fine_grained_sentiment': ['Negative' if minute % 2 else 'Positive'
+                                                    for minute in range(start, start + count)]})
+
+
+def test_query_table_filters_sorts_and_pages(workdir):
+    storage.append_table('chat_logs', chats(0, 6))
+    storage.append_table('chat_logs', chats(0, 2, day='2024-05-03'))
+
+    page, total = storage.query_table('chat_logs', columns=['user_input'], where={'fine_grained_sentiment': 'Negative'},
+                                      sort='timestamp', descending=True, per_page=2)
+    assert total == 4
+    assert list(page['user_input']) == ['q1', 'q5']
+    page, total = storage.query_table('chat_logs', columns=['user_input'], date_from='2024-05-02', sort='timestamp')
+    assert (list(page['user_input']), total) == (['q0', 'q1'], 2)
+    with pytest.raises(ValueError):
+        storage.query_table('chat_logs', sort='nope')
+
+
+def test_query_table_rebuilds_an_index_left_stale_by_compaction(workdir, monkeypatch):
+    for start in range(0, 6, 2):
+        storage.append_table('chat_logs', chats(start, 2))
+    old_version = storage.table_version('chat_logs')
+    storage.query_table('chat_logs', sort='timestamp')
+    storage.compact_table('chat_logs', min_parts=2)
+
+    versions = iter([old_version])  # the first lookup still sees the pre-compaction version
+    real_version = storage.table_version
+    monkeypatch.setattr(storage, 'table_version', lambda name: next(versions, None) or real_version(name))
+    page, total = storage.query_table('chat_logs', columns=['user_input'], sort='timestamp')
+    assert total == 6 and list(page['user_input']) == [f"q{n}" for n in range(6)]
+
+
+def test_compaction_keeps_the_merged_part_before_newer_appends(workdir):
+    for start in range(0, 6, 2):
+        storage.append_table('chat_logs', chats(start, 2))
+    oldest = min(storage.table_parts('chat_logs'))
+    assert storage.compact_table('chat_logs', min_parts=2) == 3
+    storage.append_table('chat_logs', chats(6, 1))
+    merged, newer = sorted(storage.table_parts('chat_logs'))
+    assert os.path.basename(merged).split('-')[1] == os.path.basename(oldest).split('-')[1]
+    assert list(storage.read_table('chat_logs')['user_input']) == [f"q{n}" for n in range(7)]
+
+
+def test_append_partitions_by_day_and_reads_typed_columns(workdir):
+    rows = chats(0, 2)
+    rows.loc[1, 'timestamp'] = 'not a date'
+    rows['extra'] = 'dropped'
+    assert storage.append_table('chat_logs', rows) == 2
+    assert sorted(storage.part_day(part) for part in storage.table_parts('chat_logs')) == ['2024-05-01', storage.UNKNOWN_DAY]
+
+    df = storage.read_table('chat_logs', columns=['user_input', 'model_used'])
+    assert sorted(df['user_input']) == ['q0', 'q1']
+    assert list(df.columns) == ['user_input', 'model_used'] and df['model_used'].isna().all()
+    assert len(storage.read_table('chat_logs', filters=[('day', '=', '2024-05-01')])) == 1
+
+
+def test_staged_table_replaces_only_on_publish(workdir):
+    storage.append_table('tickets', pd.DataFrame({'Issue ID': [1], 'Created At': ['2024-05-01T00:00:00Z']}))
+    with pytest.raises(RuntimeError):
+        with storage.StagedTable('tickets') as staged:
+            staged.append(pd.DataFrame({'Issue ID': [2], 'Created At': ['2024-05-02T00:00:00Z']}))
+            raise RuntimeError('fetch failed')
+    assert list(storage.read_table('tickets')['Issue ID']) == [1]
+
+    storage.write_table('tickets', pd.DataFrame({'Issue ID': [3, 4], 'Created At': ['2024-05-03T00:00:00Z'] * 2}))
+    assert list(storage.read_table('tickets')['Issue ID']) == [3, 4]
+    assert os.listdir(storage.STORE_DIR) == ['tickets']  # no staging or retired directories left behind
+
+
+def test_migrate_csvs_loads_each_table_once(workdir):
+    os.makedirs('data')
+    chats(0, 3).to_csv(storage.TABLES['chat_logs']['csv'], index=False)
+    storage.migrate_csvs()
+    storage.migrate_csvs()
+    assert len(storage.read_table('chat_logs')) == 3
+
+
+def test_undated_rows_stay_out_of_date_bounded_queries(workdir):
+    rows = chats(0, 3)
+    rows.loc[2, 'timestamp'] = None
+    storage.append_table('chat_logs', rows)
+    assert storage.query_table('chat_logs', date_from='2024-01-01')[1] == 2
+    assert storage.query_table('chat_logs', date_to='2099-12-31')[1] == 2
+    page, total = storage.query_table('chat_logs', columns=['user_input'], sort='timestamp')
+    assert total == 3 and list(page['user_input']) == ['q0', 'q1', 'q2']  # undated rows sort last
+
+
+def test_paging_reuses_the_index_until_the_table_changes(workdir):
+    storage.append_table('chat_logs', chats(0, 5))
+    storage._row_index.cache_clear()
+    pages = [list(storage.query_table('chat_logs', columns=['user_input'], sort='timestamp', page=page,
+                                      per_page=2)[0]['user_input']) for page in (1, 2, 3)]
+    assert pages == [['q0', 'q1'], ['q2', 'q3'], ['q4']]
+    assert storage._row_index.cache_info().misses == 1
+
+    time.sleep(0.01)
+    storage.append_table('chat_logs', chats(5, 1))
+    assert storage.query_table('chat_logs', sort='timestamp')[1] == 6
+    assert storage._row_index.cache_info().misses == 2
@@ -1,34 +1,164 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from metrics import outbound, inc
 
-# ✅ Configure repository and number of issues
-repo = "microsoft/vscode"  # Example repo (you can change this)
-per_page = 10  # Number of issues to fetch
-
-# ✅ GitHub API endpoint
-url = f"https://api.github.com/repos/{repo}/issues?state=all&per_page={per_page}"
-
-response = requests.get(url)
-
-if response.status_code == 200:
-    issues = response.json()
-    # ✅ Filter out Pull Requests (issues only)
-    issues = [issue for issue in issues if 'pull_request' not in issue]
-
-    # ✅ Create DataFrame with selected fields
-    df = pd.DataFrame([
-        {
-            'Issue ID': issue['id'],
-            'Title': issue['title'],
-            'Description': issue.get('body', ''),
-            'Created At': issue['created_at'],
-            'State': issue['state'],
-            'Issue URL': issue['html_url']
-        }
-        for issue in issues
-    ])
-
-    df.to_csv(r"data\github_issues.csv", index=False)
-    print(f"✅ Saved {len(df)} issues to github_issues.csv")
-else:
-    print(f"❌ Failed to fetch issues: {response.status_code} - {response.text}")
+# ✅ GitHub API settings (GITHUB_API_URL lets tests point at a local mock server)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+ETAG_CACHE_FILE = os.path.join('data', 'github_etag_cache.json')
+MAX_RATE_LIMIT_WAIT = 900  # never sleep longer than this for a rate-limit reset (seconds)
+# ✅ ETag cache bounds: pages kept (least recently used dropped) and the issue fields kept per page
+MAX_CACHED_PAGES = int(os.getenv("GITHUB_ETAG_CACHE_PAGES", "50"))
+CACHED_ISSUE_FIELDS = ('id', 'number', 'title', 'body', 'created_at', 'state', 'html_url')
+
+
+class GitHubIssueFetcher:
+    """Paginated GitHub issue client with ETag caching and rate-limit handling."""
+
+    def __init__(self, repo, token=None, api_url=GITHUB_API_URL, per_page=100,
+                 cache_file=ETAG_CACHE_FILE, session=None, max_cached_pages=MAX_CACHED_PAGES):
+        self.repo = repo
+        self.api_url = api_url.rstrip('/')
+        self.per_page = per_page
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+
+        # ✅ One pooled session reused for every page
+        self.session = session or requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        token = token or os.getenv("GITHUB_TOKEN")
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+        self.max_cached_pages = max_cached_pages
+        self.cache = OrderedDict()
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.cache.update(json.load(f))
+            self._trim_cache()
+
+    def _trim_cache(self):
+        while len(self.cache) > self.max_cached_pages:
+            self.cache.popitem(last=False)
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(dict(self.cache), f)
+            os.replace(tmp_file, self.cache_file)
+
+    # ✅ Sleep until the rate-limit window resets when it is exhausted
+    def _wait_for_rate_limit(self, response):
+        if response.headers.get('X-RateLimit-Remaining') != '0':
+            return False
+        reset = int(response.headers.get('X-RateLimit-Reset', time.time()))
+        wait = min(MAX_RATE_LIMIT_WAIT, max(0, reset - time.time()) + 1)
+        print(f"⏳ GitHub rate limit reached, waiting {wait:.0f}s")
+        time.sleep(wait)
+        return True
+
+    # ✅ Conditional GET: returns (body, next_url), cached body on 304
+    def _get_page(self, url, params=None):
+        key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        with self._lock:
+            cached = self.cache.get(key)
+            if cached:
+                self.cache.move_to_end(key)
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+
+        while True:
+            with outbound('github', 'issues.list'):
+                response = self.session.get(url, params=params, headers=headers, timeout=30)
+            if response.status_code == 304:
+                inc('cache_hits_total', cache='github_etag')
+                return cached['body'], cached['next']
+            inc('cache_misses_total', cache='github_etag')
+            if response.status_code in (403, 429) and self._wait_for_rate_limit(response):
+                continue
+            response.raise_for_status()
+            break
+
+        body = response.json()
+        next_url = response.links.get('next', {}).get('url')
+        if response.headers.get('ETag'):
+            # Only what a 304 replay needs: the issue fields we read, pull requests already dropped
+            slim = [{field: issue.get(field) for field in CACHED_ISSUE_FIELDS}
+                    for issue in body if 'pull_request' not in issue]
+            with self._lock:
+                self.cache[key] = {'etag': response.headers['ETag'], 'body': slim, 'next': next_url}
+                self.cache.move_to_end(key)
+                self._trim_cache()
+        self._wait_for_rate_limit(response)
+        return body, next_url
+
+    def iter_issues(self, state='all', max_issues=None):
+        """Follow Link pagination and yield issues (pull requests excluded) page by page.
+
+        Only one page is held at a time; the ETag cache is saved once the
+        listing is exhausted or max_issues is reached.
+        """
+        url = f"{self.api_url}/repos/{self.repo}/issues"
+        params = {'state': state, 'per_page': min(self.per_page, max_issues or self.per_page)}
+
+        count = 0
+        while url:
+            body, url = self._get_page(url, params)
+            params = None  # the Link header URL already carries the query
+            for issue in body:
+                if 'pull_request' in issue:
+                    continue
+                yield issue
+                count += 1
+                if max_issues and count >= max_issues:
+                    url = None
+                    break
+
+        self.save_cache()
+
+    def fetch_issues(self, state='all', max_issues=None):
+        """Return the issues of iter_issues as a list."""
+        return list(self.iter_issues(state, max_issues))
+
+
+# ✅ Selected fields of one issue
+ISSUE_COLUMNS = ['Issue ID', 'Title', 'Description', 'Created At', 'State', 'Issue URL']
+
+def issue_to_row(issue):
+    return {
+        'Issue ID': issue['id'],
+        'Title': issue['title'],
+        'Description': issue.get('body', ''),
+        'Created At': issue['created_at'],
+        'State': issue['state'],
+        'Issue URL': issue['html_url']
+    }
+
+
+# ✅ Create DataFrame with selected fields
+def issues_to_dataframe(issues):
+    return pd.DataFrame([issue_to_row(issue) for issue in issues], columns=ISSUE_COLUMNS)
+
+
+if __name__ == '__main__':
+    # ✅ Configure repository and number of issues
+    repo = "microsoft/vscode"  # Example repo (you can change this)
+    per_page = 10  # Number of issues to fetch
+
+    try:
+        issues = GitHubIssueFetcher(repo).fetch_issues(max_issues=per_page)
+        df = issues_to_dataframe(issues)
+        df.to_csv(r"data\github_issues.csv", index=False)
+        print(f"✅ Saved {len(df)} issues to github_issues.csv")
+    except requests.RequestException as e:
+        print(f"❌ Failed to fetch issues: {e}")